@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+
+from app.db import SessionLocal, session_runner
+from app.services import archive, events, idempotency_keys, stats_service
+
+
+def rebuild_stats(args: argparse.Namespace) -> None:
+    db = SessionLocal()
+    try:
+        stats_service.rebuild(db, args.user or None)
+        db.commit()
+    finally:
+        db.close()
+    print("stats rebuilt")
+
+
+def prune_events(args: argparse.Namespace) -> None:
+    db = SessionLocal()
+    try:
+        deleted = events.prune(db, args.older_than_hours)
+        db.commit()
+    finally:
+        db.close()
+    print(f"{deleted} events pruned")
+
+
+def prune_idempotency_keys(args: argparse.Namespace) -> None:
+    db = SessionLocal()
+    try:
+        deleted = idempotency_keys.prune(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"{deleted} idempotency keys pruned")
+
+
+async def _archive(args: argparse.Namespace) -> int:
+    # каждая пачка — отдельная транзакция: блокировки и WAL ограничены пачкой;
+    # DbRunner повторяет пачку при deadlock/serialization failure
+    total = batches = 0
+    async with session_runner() as run:
+        while not args.max_batches or batches < args.max_batches:
+            moved = await run(
+                archive.archive_batch, args.older_than_days, args.batch_size
+            )
+            total += moved
+            batches += 1
+            if moved < args.batch_size:
+                break
+    return total
+
+
+def archive_prs(args: argparse.Namespace) -> None:
+    total = asyncio.run(_archive(args))
+    print(f"{total} pull requests archived")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser(
+        "rebuild-stats", help="пересчитать счётчики статистики по базовым таблицам"
+    )
+    p.add_argument("--user", action="append", help="только для этих user_id")
+    p.set_defaults(func=rebuild_stats)
+
+    p = commands.add_parser(
+        "prune-events", help="удалить старые события review_events"
+    )
+    p.add_argument("--older-than-hours", type=float, default=72.0)
+    p.set_defaults(func=prune_events)
+
+    p = commands.add_parser(
+        "prune-idempotency-keys",
+        help="удалить ключи идемпотентности старше IDEMPOTENCY_TTL",
+    )
+    p.set_defaults(func=prune_idempotency_keys)
+
+    p = commands.add_parser(
+        "archive-prs",
+        help="перенести старые MERGED PR в pull_requests_archive",
+    )
+    p.add_argument("--older-than-days", type=float, default=archive.ARCHIVE_AFTER_DAYS)
+    p.add_argument("--batch-size", type=int, default=archive.ARCHIVE_BATCH_SIZE)
+    p.add_argument("--max-batches", type=int, default=0, help="0 — пока есть что переносить")
+    p.set_defaults(func=archive_prs)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
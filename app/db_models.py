@@ -2,9 +2,13 @@ from sqlalchemy import (
     Column,
     Text,
     Boolean,
+    Integer,
+    BigInteger,
     ForeignKey,
     DateTime,
+    func,
 )
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -14,10 +18,23 @@ class TeamModel(Base):
     __tablename__ = "teams"
 
     team_name = Column(Text, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
 
     members = relationship("UserModel", back_populates="team")
 
 
+class TeamStatsModel(Base):
+    __tablename__ = "team_stats"
+
+    team_name = Column(
+        Text, ForeignKey("teams.team_name", ondelete="CASCADE"), primary_key=True
+    )
+    open_review_count = Column(Integer, nullable=False, default=0)
+    review_count = Column(Integer, nullable=False, default=0)
+    authored_pr_count = Column(Integer, nullable=False, default=0)
+    merged_pr_count = Column(Integer, nullable=False, default=0)
+
+
 class UserModel(Base):
     __tablename__ = "users"
 
@@ -25,6 +42,11 @@ class UserModel(Base):
     username = Column(Text, nullable=False)
     team_name = Column(Text, ForeignKey("teams.team_name"), nullable=False)
     is_active = Column(Boolean, nullable=False, default=True)
+    open_review_count = Column(Integer, nullable=False, default=0)
+    review_count = Column(Integer, nullable=False, default=0)
+    authored_pr_count = Column(Integer, nullable=False, default=0)
+    merged_pr_count = Column(Integer, nullable=False, default=0)
+    reviews_version = Column(BigInteger, nullable=False, default=0)
 
     team = relationship("TeamModel", back_populates="members")
     authored_prs = relationship("PullRequestModel", back_populates="author")
@@ -56,6 +78,46 @@ class PullRequestReviewerModel(Base):
         Text, ForeignKey("pull_requests.pull_request_id"), primary_key=True
     )
     reviewer_id = Column(Text, ForeignKey("users.user_id"), primary_key=True)
+    # копии полей PR для keyset /users/getReview; меняются вместе с PR
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    status = Column(Text, nullable=False)  # OPEN | MERGED
 
     pull_request = relationship("PullRequestModel", back_populates="reviewers")
     reviewer = relationship("UserModel", back_populates="review_prs")
+
+
+class PullRequestArchiveModel(Base):
+    __tablename__ = "pull_requests_archive"
+
+    pull_request_id = Column(Text, primary_key=True)
+    pull_request_name = Column(Text, nullable=False)
+    author_id = Column(Text, ForeignKey("users.user_id"), nullable=False)
+    status = Column(Text, nullable=False)  # всегда MERGED
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    merged_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class PullRequestReviewerArchiveModel(Base):
+    __tablename__ = "pull_request_reviewers_archive"
+
+    pull_request_id = Column(
+        Text,
+        ForeignKey("pull_requests_archive.pull_request_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    reviewer_id = Column(Text, ForeignKey("users.user_id"), primary_key=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class ReviewEventModel(Base):
+    __tablename__ = "review_events"
+
+    # xid (XID8) заполняется сервером и читается только сырым SQL в events
+    event_id = Column(BigInteger, primary_key=True)
+    event_type = Column(Text, nullable=False)
+    pull_request_id = Column(Text, nullable=False)
+    team_name = Column(Text)
+    user_ids = Column(ARRAY(Text), nullable=False)
+    data = Column(JSONB, nullable=False, default=dict)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -0,0 +1,146 @@
+"""
+Idempotency-Key для пишущих эндпоинтов PR: повтор с тем же ключом и телом
+получает сохранённый ответ первого запроса, работа не выполняется заново.
+"""
+
+import hashlib
+import json
+
+from app.db import session_runner
+from app.services import idempotency_keys
+
+IDEMPOTENT_PATHS = {
+    "/pullRequest/create",
+    "/pullRequest/createBatch",
+    "/pullRequest/merge",
+    "/pullRequest/reassign",
+}
+MAX_KEY_LENGTH = 255
+
+_ERRORS = {
+    "mismatch": (
+        422,
+        "IDEMPOTENCY_KEY_REUSED",
+        "idempotency key was used with a different request",
+    ),
+    "in_progress": (
+        409,
+        "IDEMPOTENCY_IN_PROGRESS",
+        "request with this idempotency key is in progress",
+    ),
+}
+
+
+async def _send_json(send, status_code: int, content: dict) -> None:
+    body = json.dumps(content, separators=(",", ":")).encode()
+    await _send_response(send, status_code, b"application/json", body)
+
+
+async def _send_response(send, status_code: int, content_type, body: bytes, extra=()) -> None:
+    headers = [(b"content-length", str(len(body)).encode()), *extra]
+    if content_type:
+        headers.append((b"content-type", content_type))
+    await send({"type": "http.response.start", "status": status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in IDEMPOTENT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+        key = dict(scope["headers"]).get(b"idempotency-key")
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        key = key.decode("latin-1")
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _send_json(
+                send,
+                400,
+                {"detail": "Idempotency-Key must be 1-255 characters"},
+            )
+            return
+
+        # тело читается целиком: оно входит в хэш и потом отдаётся приложению
+        chunks = []
+        more = True
+        while more:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            more = message.get("more_body", False)
+        body = b"".join(chunks)
+        request_hash = hashlib.sha256(
+            scope["path"].encode() + b"\0" + scope["query_string"] + b"\0" + body
+        ).hexdigest()
+        endpoint = scope["path"]
+
+        async with session_runner() as run:
+            status, stored = await run(
+                idempotency_keys.reserve, endpoint, key, request_hash
+            )
+        if status == "replay":
+            status_code, content_type, stored_body = stored
+            await _send_response(
+                send,
+                status_code,
+                content_type.encode() if content_type else None,
+                stored_body,
+                extra=[(b"idempotent-replayed", b"true")],
+            )
+            return
+        if status in _ERRORS:
+            status_code, code, message = _ERRORS[status]
+            await _send_json(
+                send, status_code, {"detail": {"error": {"code": code, "message": message}}}
+            )
+            return
+
+        replayed = False
+
+        async def replay_receive():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        response = {"status": 500, "content_type": None, "body": []}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["content_type"] = dict(message.get("headers", [])).get(
+                    b"content-type"
+                )
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        finally:
+            # 5xx и исключения не запоминаются: повтор выполнит запрос заново
+            async with session_runner() as run:
+                if response["status"] < 500:
+                    content_type = response["content_type"]
+                    await run(
+                        idempotency_keys.complete,
+                        endpoint,
+                        key,
+                        request_hash,
+                        response["status"],
+                        content_type.decode("latin-1") if content_type else None,
+                        b"".join(response["body"]),
+                    )
+                else:
+                    await run(idempotency_keys.release, endpoint, key, request_hash)
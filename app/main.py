@@ -1,13 +1,81 @@
-from fastapi import FastAPI
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI
+
+from app import db, metrics as app_metrics, profiling, replica
+from app.idempotency import IdempotencyMiddleware
+from app.routers import (
+    events,
+    export,
+    health,
+    imports,
+    metrics,
+    pull_requests,
+    stats,
+    teams,
+    users,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    try:
+        if not db.MEMORY_STORAGE:
+            await db.warm_up()
+    except Exception:
+        # недоступная при старте БД не роняет процесс: это покажет /health/ready
+        logger.exception("connection pool warm-up failed")
+    yield
+    for engine in (db.async_engine, db.async_read_engine):
+        if engine is not None:
+            await engine.dispose()
 
-from app.routers import teams, users, pull_requests, health
 
 app = FastAPI(
     title="PR Reviewer Assignment Service (Test Task, Fall 2025)",
     version="1.0.0",
+    lifespan=lifespan,
+    dependencies=[Depends(app_metrics.track_in_flight)],
 )
 
 app.include_router(teams.router)
 app.include_router(users.router)
 app.include_router(pull_requests.router)
-app.include_router(health.router)
\ No newline at end of file
+app.include_router(stats.router)
+app.include_router(events.router)
+app.include_router(export.router)
+app.include_router(imports.router)
+app.include_router(health.router)
+app.include_router(metrics.router)
+
+app.add_middleware(IdempotencyMiddleware)
+if db.read_engine is not None and replica.READ_STICKY_SECONDS > 0:
+    app.add_middleware(replica.StickyReadsMiddleware)
+app.add_middleware(app_metrics.MetricsMiddleware)
+
+pools = {"sync": db.engine.pool}
+app_metrics.instrument_engine(db.engine)
+if db.async_engine is not None:
+    pools["async"] = db.async_engine.pool
+    app_metrics.instrument_engine(db.async_engine.sync_engine)
+if db.read_engine is not None:
+    pools["read"] = db.read_engine.pool
+    app_metrics.instrument_engine(db.read_engine)
+if db.async_read_engine is not None:
+    pools["read_async"] = db.async_read_engine.pool
+    app_metrics.instrument_engine(db.async_read_engine.sync_engine)
+app_metrics.register_pools(pools)
+
+if profiling.ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+    profiling.instrument_engine(db.engine)
+    if db.async_engine is not None:
+        profiling.instrument_engine(db.async_engine.sync_engine)
+    if db.read_engine is not None:
+        profiling.instrument_engine(db.read_engine)
+    if db.async_read_engine is not None:
+        profiling.instrument_engine(db.async_read_engine.sync_engine)
+    profiling.instrument_orm()
@@ -0,0 +1,185 @@
+"""
+Метрики Prometheus: HTTP по шаблону маршрута, SQL по маршруту
+(события engine) и состояние пула соединений.
+"""
+
+import contextvars
+import time
+from typing import Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily, REGISTRY
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.requests import Request
+
+# ASGI scope текущего запроса: роутер дописывает в него scope["route"],
+# SQL вне запроса (CLI, прогрев) помечается "-"
+_current_scope: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar(
+    "metrics_scope", default=None
+)
+
+
+def current_route() -> str:
+    scope = _current_scope.get()
+    if scope is None:
+        return "-"
+    route = scope.get("route")
+    # неизвестные пути сводятся в одну метку, чтобы не раздувать кардинальность
+    return getattr(route, "path", None) or "unmatched"
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP-запросы",
+    ["method", "route", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_progress",
+    "Запросы в обработке",
+    ["method", "route"],
+)
+DB_STATEMENTS = Counter(
+    "db_statements_total",
+    "SQL-операторы",
+    ["route"],
+)
+DB_STATEMENT_LATENCY = Histogram(
+    "db_statement_duration_seconds",
+    "Время выполнения SQL-оператора",
+    ["route"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Ожидание соединения из пула",
+    ["pool"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5, 30),
+)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool, замеряющий ожидание свободного соединения."""
+
+    metrics_name = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.labels(self.metrics_name).observe(time.perf_counter() - started)
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    metrics_name = "async"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.labels(self.metrics_name).observe(time.perf_counter() - started)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    route = current_route()
+    DB_STATEMENTS.labels(route).inc()
+    DB_STATEMENT_LATENCY.labels(route).observe(time.perf_counter() - started)
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+
+
+def instrument_engine(engine) -> None:
+    """Подписывает engine (sync или AsyncEngine.sync_engine) на события SQL."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class PoolCollector:
+    """Размер пула, выданные соединения и overflow снимаются в момент scrape."""
+
+    def __init__(self, pools: dict) -> None:
+        self.pools = pools
+
+    def collect(self):
+        size = GaugeMetricFamily("db_pool_size", "Постоянные соединения пула", labels=["pool"])
+        checked_out = GaugeMetricFamily(
+            "db_pool_checked_out", "Выданные соединения", labels=["pool"]
+        )
+        overflow = GaugeMetricFamily(
+            "db_pool_overflow", "Соединения сверх pool_size", labels=["pool"]
+        )
+        for name, pool in self.pools.items():
+            size.add_metric([name], pool.size())
+            checked_out.add_metric([name], pool.checkedout())
+            overflow.add_metric([name], max(pool.overflow(), 0))
+        yield size
+        yield checked_out
+        yield overflow
+
+
+def register_pools(pools: dict) -> None:
+    REGISTRY.register(PoolCollector(pools))
+
+
+async def track_in_flight(request: Request):
+    """
+    Зависимость приложения: выполняется после маршрутизации, поэтому запрос
+    в обработке помечен тем же шаблоном пути, что и латентность. Выход из
+    yield — после отправки ответа, включая потоковые (SSE, выгрузка).
+    """
+    in_flight = HTTP_IN_FLIGHT.labels(request.method, current_route())
+    in_flight.inc()
+    try:
+        yield
+    finally:
+        in_flight.dec()
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware. Метка маршрута — шаблон пути из scope["route"];
+    запросы в обработке считает track_in_flight уже после маршрутизации.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        token = _current_scope.set(scope)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = current_route()
+            HTTP_LATENCY.labels(method, route).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(method, route, str(status["code"])).inc()
+            _current_scope.reset(token)
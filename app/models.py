@@ -1,5 +1,5 @@
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import AwareDatetime, BaseModel, Field, model_validator
 from typing import List, Optional, Literal
 
 
@@ -16,6 +16,12 @@ class ErrorInfo(BaseModel):
         "NOT_ASSIGNED",
         "NO_CANDIDATE",
         "NOT_FOUND",
+        "INVALID_CURSOR",
+        "INVALID_EVENT_ID",
+        "IDEMPOTENCY_KEY_REUSED",
+        "IDEMPOTENCY_IN_PROGRESS",
+        "INVALID_ROW",
+        "MEMBER_CONFLICT",
     ]
     message: str
 
@@ -35,6 +41,64 @@ class Team(BaseModel):
 class TeamResponse(BaseModel):
     team: Team
 
+class TeamImportRequest(BaseModel):
+    teams: List[Team]
+
+class TeamImportResponse(BaseModel):
+    teams_created: List[str]
+    teams_updated: List[str]
+    members_upserted: int
+
+class TeamMemberUpdate(BaseModel):
+    user_id: str
+    username: Optional[str] = None
+    is_active: Optional[bool] = None
+
+
+class TeamMembersDelta(BaseModel):
+    team_name: str
+    add: List[TeamMember] = []
+    update: List[TeamMemberUpdate] = []
+    remove: List[str] = []
+
+
+class TeamMembersPatchRequest(BaseModel):
+    teams: List[TeamMembersDelta] = Field(max_length=1000)
+    reassign_removed: bool = False
+
+    @model_validator(mode="after")
+    def _check_unique(self) -> "TeamMembersPatchRequest":
+        # перенос — remove в старой команде и add в новой; иначе пользователь
+        # встречается в запросе один раз
+        names = [delta.team_name for delta in self.teams]
+        if len(set(names)) != len(names):
+            raise ValueError("team_name is listed more than once")
+        changed = [
+            user_id
+            for delta in self.teams
+            for user_id in (
+                *(m.user_id for m in delta.add),
+                *(m.user_id for m in delta.update),
+            )
+        ]
+        removed = [user_id for delta in self.teams for user_id in delta.remove]
+        if len(set(changed)) != len(changed) or len(set(removed)) != len(removed):
+            raise ValueError("user_id is listed more than once")
+        for delta in self.teams:
+            if set(delta.remove) & {
+                m.user_id for m in (*delta.add, *delta.update)
+            }:
+                raise ValueError("user_id is both removed and kept in one team")
+        return self
+
+
+class TeamMembersResult(BaseModel):
+    team_name: str
+    added: List[str]
+    updated: List[str]
+    removed: List[str]
+    not_members: List[str]
+
 class User(BaseModel):
     user_id: str
     username: str
@@ -44,6 +108,21 @@ class User(BaseModel):
 class UserResponse(BaseModel):
     user: User
 
+class UserStats(BaseModel):
+    user_id: str
+    team_name: str
+    open_reviews: int
+    total_reviews: int
+    authored_prs: int
+    merged_prs: int
+
+class TeamStats(BaseModel):
+    team_name: str
+    open_reviews: int
+    total_reviews: int
+    authored_prs: int
+    merged_prs: int
+
 class PullRequest(BaseModel):
     pull_request_id: str
     pull_request_name: str
@@ -66,12 +145,62 @@ class SetUserActiveRequest(BaseModel):
     is_active: bool
 
 
+class DeactivateBatchRequest(BaseModel):
+    user_ids: List[str] = Field(max_length=1000)
+
+
+class ReviewerReplacement(BaseModel):
+    pull_request_id: str
+    old_user_id: str
+    new_user_id: str
+
+
+class UnreplacedAssignment(BaseModel):
+    pull_request_id: str
+    user_id: str
+
+
+class DeactivateBatchResponse(BaseModel):
+    deactivated: List[str]
+    not_found: List[str]
+    replaced: List[ReviewerReplacement]
+    unreplaced: List[UnreplacedAssignment]
+
+
 class CreatePRRequest(BaseModel):
     pull_request_id: str
     pull_request_name: str
     author_id: str
 
 
+class CreatePRBatchRequest(BaseModel):
+    pull_requests: List[CreatePRRequest] = Field(max_length=1000)
+
+
+class ImportPRRecord(BaseModel):
+    """Строка NDJSON для /import/pullRequests: PR с уже известной историей."""
+
+    pull_request_id: str = Field(min_length=1)
+    pull_request_name: str
+    author_id: str
+    status: Literal["OPEN", "MERGED"]
+    assigned_reviewers: List[str] = []
+    createdAt: AwareDatetime
+    mergedAt: Optional[AwareDatetime] = None
+
+    @model_validator(mode="after")
+    def _check_history(self) -> "ImportPRRecord":
+        if len(set(self.assigned_reviewers)) != len(self.assigned_reviewers):
+            raise ValueError("duplicate reviewer")
+        if self.author_id in self.assigned_reviewers:
+            raise ValueError("author cannot be a reviewer")
+        if (self.status == "MERGED") != (self.mergedAt is not None):
+            raise ValueError("mergedAt is required for MERGED and not allowed for OPEN")
+        if self.mergedAt is not None and self.mergedAt < self.createdAt:
+            raise ValueError("mergedAt is earlier than createdAt")
+        return self
+
+
 class MergePRRequest(BaseModel):
     pull_request_id: str
 
@@ -83,10 +212,43 @@ class ReassignPRRequest(BaseModel):
 class UserReviewsResponse(BaseModel):
     user_id: str
     pull_requests: List[PullRequestShort]
+    next_cursor: Optional[str] = None
 
 class PRResponse(BaseModel):
     pr: PullRequest
 
+class CreatePRBatchItem(BaseModel):
+    pull_request_id: str
+    pr: Optional[PullRequest] = None
+    error: Optional[ErrorInfo] = None
+
+class CreatePRBatchResponse(BaseModel):
+    results: List[CreatePRBatchItem]
+
+class ImportPRError(BaseModel):
+    line: int
+    pull_request_id: Optional[str] = None
+    error: ErrorInfo
+
+class ImportPRResponse(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ImportPRError]
+
+class TeamMembersPatchResponse(BaseModel):
+    teams: List[TeamMembersResult]
+    replaced: List[ReviewerReplacement]
+    unreplaced: List[UnreplacedAssignment]
+
 class PRReassignResponse(BaseModel):
     pr: PullRequest
-    replaced_by: str
\ No newline at end of file
+    replaced_by: str
+
+class ReviewEvent(BaseModel):
+    event_id: int
+    type: Literal["assigned", "reassigned", "merged"]
+    pull_request_id: str
+    team_name: Optional[str] = None
+    user_ids: List[str]
+    data: dict
+    created_at: datetime
@@ -0,0 +1,214 @@
+"""
+Отладочное профилирование запросов.
+
+DEBUG_TIMING=1 — заголовок Server-Timing у каждого ответа: parse (до первого
+обращения к БД), sql-N (каждый оператор), orm (гидратация объектов), dto
+(построение DTO), serialize (от конца работы с БД до начала ответа), total.
+SLOW_REQUEST_MS>0 — запросы дольше порога пишутся в лог app.slow со списком
+операторов; SLOW_REQUEST_EXPLAIN=1 добавляет EXPLAIN ANALYZE для SELECT.
+"""
+
+import contextvars
+import functools
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+DEBUG_TIMING = os.getenv("DEBUG_TIMING", "0") == "1"
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+SLOW_REQUEST_EXPLAIN = os.getenv("SLOW_REQUEST_EXPLAIN", "0") == "1"
+ENABLED = DEBUG_TIMING or SLOW_REQUEST_MS > 0
+
+# в заголовок попадают первые операторы, остальные только суммой в sql
+MAX_TIMING_STATEMENTS = 20
+
+logger = logging.getLogger("app.slow")
+
+T = TypeVar("T")
+
+
+class RequestProfile:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.handler_started: Optional[float] = None
+        self.handler_finished: Optional[float] = None
+        self.response_started: Optional[float] = None
+        self.statements: List[Tuple[str, object, float]] = []
+        self.orm = 0.0
+        self.dto = 0.0
+
+    @property
+    def sql(self) -> float:
+        return sum(duration for _, _, duration in self.statements)
+
+    def server_timing(self) -> str:
+        end = self.response_started or time.perf_counter()
+        handler_started = self.handler_started or end
+        handler_finished = self.handler_finished or handler_started
+        parts = [_metric("parse", handler_started - self.started)]
+        for i, (_, _, duration) in enumerate(self.statements[:MAX_TIMING_STATEMENTS], 1):
+            parts.append(_metric(f"sql-{i}", duration))
+        parts.append(_metric("sql", self.sql, f"{len(self.statements)} statements"))
+        # время ORM включает выполнение операторов, здесь только гидратация
+        parts.append(_metric("orm", max(self.orm - self.sql, 0.0)))
+        parts.append(_metric("dto", self.dto))
+        parts.append(_metric("serialize", end - handler_finished))
+        parts.append(_metric("total", end - self.started))
+        return ", ".join(parts)
+
+
+def _metric(name: str, seconds: float, desc: Optional[str] = None) -> str:
+    value = f"{name};dur={seconds * 1000:.2f}"
+    if desc:
+        value += f';desc="{desc}"'
+    return value
+
+
+_profile: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar(
+    "request_profile", default=None
+)
+
+
+@contextmanager
+def handler():
+    """Граница работы обработчика с БД (DbRunner)."""
+    profile = _profile.get()
+    if profile is not None and profile.handler_started is None:
+        profile.handler_started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.handler_finished = time.perf_counter()
+
+
+def timed_dto(fn: Callable[..., T]) -> Callable[..., T]:
+    """Учитывает время fn в фазе dto текущего запроса."""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = _profile.get()
+        if profile is None:
+            return fn(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.dto += time.perf_counter() - started
+
+    return wrapper
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _profile.get() is not None:
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _profile.get()
+    if profile is not None and conn.info.get("profile_started"):
+        started = conn.info["profile_started"].pop()
+        profile.statements.append(
+            (statement, None if executemany else parameters, time.perf_counter() - started)
+        )
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("profile_started"):
+        conn.info["profile_started"].pop()
+
+
+def _do_orm_execute(orm_execute_state):
+    profile = _profile.get()
+    if profile is None or not orm_execute_state.is_select:
+        return None
+    options = orm_execute_state.execution_options
+    if options.get("yield_per") or options.get("stream_results"):
+        return None
+    # freeze() выбирает и гидратирует все строки сразу, их время и есть orm
+    started = time.perf_counter()
+    frozen = orm_execute_state.invoke_statement().freeze()
+    profile.orm += time.perf_counter() - started
+    return frozen()
+
+
+def instrument_engine(engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def instrument_orm() -> None:
+    event.listen(Session, "do_orm_execute", _do_orm_execute)
+
+
+def _explain(statements: List[Tuple[str, object, float]]) -> List[str]:
+    # EXPLAIN ANALYZE выполняет оператор, поэтому только для чтения
+    from app.db import engine
+
+    plans = []
+    with engine.connect() as conn:
+        for statement, parameters, _ in statements:
+            if not statement.lstrip().upper().startswith("SELECT"):
+                continue
+            try:
+                rows = conn.exec_driver_sql(
+                    "EXPLAIN ANALYZE " + statement, parameters or ()
+                ).all()
+            except Exception as exc:
+                conn.rollback()
+                plans.append(f"{statement}\n  EXPLAIN failed: {exc}")
+                continue
+            plans.append(statement + "\n" + "\n".join("  " + row[0] for row in rows))
+        conn.rollback()
+    return plans
+
+
+async def _log_slow(scope, profile: RequestProfile, total: float) -> None:
+    lines = [
+        f"slow request {scope['method']} {scope['path']}: {total * 1000:.1f} ms, "
+        f"{len(profile.statements)} statements, sql {profile.sql * 1000:.1f} ms"
+    ]
+    for statement, parameters, duration in profile.statements:
+        lines.append(f"  {duration * 1000:.2f} ms: {' '.join(statement.split())} {parameters!r}")
+    if SLOW_REQUEST_EXPLAIN:
+        lines.extend(await run_in_threadpool(_explain, profile.statements))
+    logger.warning("\n".join(lines))
+
+
+class ProfilingMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.response_started = time.perf_counter()
+                if DEBUG_TIMING:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", profile.server_timing().encode("latin-1"))
+                    ]
+            await send(message)
+
+        token = _profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _profile.reset(token)
+
+        total = time.perf_counter() - profile.started
+        if SLOW_REQUEST_MS > 0 and total * 1000 >= SLOW_REQUEST_MS:
+            await _log_slow(scope, profile, total)
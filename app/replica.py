@@ -0,0 +1,210 @@
+"""
+Чтение GET-эндпоинтов с реплики (READ_DATABASE_URL).
+
+Клиент, только что выполнивший запись, READ_STICKY_SECONDS читает из основной
+БД (cookie), чтобы видеть свои изменения. Реплика, которая не отвечает или
+отстаёт больше READ_MAX_LAG секунд, не используется до следующей проверки.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import Request
+from prometheus_client import Counter
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from app import db
+
+READ_STICKY_SECONDS = float(os.getenv("READ_STICKY_SECONDS", "5"))
+READ_MAX_LAG = float(os.getenv("READ_MAX_LAG", "5"))
+READ_CHECK_INTERVAL = float(os.getenv("READ_CHECK_INTERVAL", "1"))
+READ_CHECK_TIMEOUT = float(os.getenv("READ_CHECK_TIMEOUT", "1"))
+STICKY_COOKIE = "read_primary_until"
+
+# receive = replay значит, что реплика догнала основную БД, даже если последняя
+# транзакция была давно, — но только при работающем WAL receiver: у остановленного
+# эти LSN тоже совпадают. Без него запрос возвращает NULL (отставание неизвестно);
+# status receiver видит роль с pg_read_all_stats, остальным достаточно его наличия.
+_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver
+            WHERE coalesce(status, 'streaming') = 'streaming'
+        ) THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+DB_READS = Counter(
+    "db_reads_total",
+    "Чтения GET-эндпоинтов по источнику",
+    ["target", "reason"],
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _lag_seconds(value) -> float:
+    # NULL: реплика не получает WAL — считаем отставание бесконечным
+    return math.inf if value is None else float(value)
+
+
+def _replica_lag_sync() -> float:
+    with db.read_engine.connect() as conn:
+        return _lag_seconds(conn.execute(_LAG_SQL).scalar_one())
+
+
+async def _replica_lag() -> float:
+    if db.async_read_engine is not None:
+        async with db.async_read_engine.connect() as conn:
+            return _lag_seconds((await conn.execute(_LAG_SQL)).scalar_one())
+    return await run_in_threadpool(_replica_lag_sync)
+
+
+class ReplicaMonitor:
+    """
+    Состояние реплики, обновляемое не чаще раза в check_interval фоновой
+    проверкой: запросы не ждут её и до первого результата читают из основной БД.
+    """
+
+    def __init__(
+        self,
+        max_lag: float = READ_MAX_LAG,
+        check_interval: float = READ_CHECK_INTERVAL,
+    ) -> None:
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+        self._checked_at = float("-inf")
+        self._task: Optional[asyncio.Task] = None
+
+    def healthy(self) -> bool:
+        return self.lag is not None and self.lag <= self.max_lag
+
+    def refresh(self) -> None:
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return
+        self._checked_at = time.monotonic()
+        self._task = asyncio.ensure_future(self.check())
+
+    async def check(self) -> None:
+        try:
+            self.lag = await asyncio.wait_for(_replica_lag(), READ_CHECK_TIMEOUT)
+            self.error = None
+        except Exception as exc:
+            if self.error is None:
+                logger.warning("read replica check failed: %r", exc)
+            self.lag = None
+            self.error = type(exc).__name__
+
+    def receiving(self) -> bool:
+        return self.lag is None or math.isfinite(self.lag)
+
+    def stats(self) -> dict:
+        return {
+            "healthy": self.healthy(),
+            "lag_seconds": self.lag if self.receiving() else None,
+            "wal_receiver": self.receiving() if self.lag is not None else None,
+            "max_lag_seconds": self.max_lag,
+            "error": self.error,
+        }
+
+
+replica_monitor = ReplicaMonitor()
+
+
+def _sticky(request: Request) -> bool:
+    value = request.cookies.get(STICKY_COOKIE)
+    try:
+        return value is not None and float(value) > time.time()
+    except ValueError:
+        return False
+
+
+def _read_target(request: Request) -> str:
+    if db.read_engine is None:
+        reason = "no_replica"
+    elif _sticky(request):
+        reason = "sticky"
+    elif replica_monitor.error is not None:
+        reason = "unhealthy"
+    elif replica_monitor.lag is None:
+        reason = "unchecked"
+    elif not replica_monitor.receiving():
+        reason = "no_wal_receiver"
+    elif not replica_monitor.healthy():
+        reason = "lagging"
+    else:
+        DB_READS.labels("replica", "ok").inc()
+        return "replica"
+    DB_READS.labels("primary", reason).inc()
+    return "primary"
+
+
+async def get_read_runner(request: Request):
+    """DbRunner для GET-эндпоинтов: реплика, если она здорова и клиент не писал."""
+    if db.read_engine is not None:
+        replica_monitor.refresh()
+    if _read_target(request) == "primary":
+        async with db.session_runner() as run:
+            yield run
+        return
+
+    if db.AsyncReadSessionLocal is not None:
+        async with db.AsyncReadSessionLocal() as session:
+            yield db.DbRunner(session)
+        return
+    session = db.ReadSessionLocal()
+    try:
+        yield db.DbRunner(session)
+    finally:
+        await run_in_threadpool(session.close)
+
+
+# get_read_runner вне зависимостей FastAPI (потоковые ответы)
+read_runner = asynccontextmanager(get_read_runner)
+
+
+class StickyReadsMiddleware:
+    """
+    После успешного небезопасного запроса ставит cookie, по которой чтения
+    клиента READ_STICKY_SECONDS идут в основную БД (read-your-writes).
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self.max_age = math.ceil(READ_STICKY_SECONDS)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + READ_STICKY_SECONDS
+                cookie = (
+                    f"{STICKY_COOKIE}={until:.3f}; Max-Age={self.max_age}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (b"set-cookie", cookie.encode("latin-1")),
+                    ],
+                }
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,113 @@
+import asyncio
+import os
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.db import session_runner
+from app.models import ReviewEvent
+from app.services import events
+from app.services.event_broker import EVENTS_BATCH, event_broker
+
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+# пауза браузера перед переподключением после обрыва, не связана с heartbeat
+EVENTS_RETRY = float(os.getenv("EVENTS_RETRY", "2"))
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+
+def _sse(event: ReviewEvent) -> str:
+    return f"id: {event.event_id}\nevent: {event.type}\ndata: {event.model_dump_json()}\n\n"
+
+
+async def _stream(
+    user_id: Optional[str], team_name: Optional[str], after: Optional[events.Position]
+) -> AsyncIterator[str]:
+    # подписка до чтения хвоста из БД: события между ними не теряются,
+    # повторы отсекаются по позиции
+    subscription, live_from = await event_broker.subscribe(user_id, team_name)
+    try:
+        yield f"retry: {int(EVENTS_RETRY * 1000)}\n\n"
+        sent = after or live_from
+        if after is not None:
+            while True:
+                async with session_runner() as run:
+                    backlog = await run(
+                        events.read_after, sent, user_id, team_name, EVENTS_BATCH
+                    )
+                for position, event in backlog:
+                    sent = position
+                    yield _sse(event)
+                if len(backlog) < EVENTS_BATCH:
+                    break
+
+        while not subscription.overflowed:
+            try:
+                position, event = await asyncio.wait_for(
+                    subscription.queue.get(), EVENTS_HEARTBEAT
+                )
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if position <= sent:
+                continue
+            sent = position
+            yield _sse(event)
+        # клиент не успевал читать: переподключение с Last-Event-ID дочитает из БД
+    finally:
+        event_broker.unsubscribe(subscription)
+
+
+@router.get(
+    "/stream",
+    summary="Поток событий назначения ревьюверов (Server-Sent Events)",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "text/event-stream: assigned, reassigned, merged",
+            "content": {"text/event-stream": {}},
+        },
+        400: {
+            "description": "Last-Event-ID неизвестен или уже удалён",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "$ref": "#/components/schemas/ErrorResponse"
+                    },
+                }
+            },
+        },
+    },
+)
+async def stream(
+    user_id: Optional[str] = Query(None, description="события, затрагивающие пользователя"),
+    team_name: Optional[str] = Query(None),
+    last_event_id: Optional[str] = Query(
+        None, description="для клиентов, которые не могут передать заголовок"
+    ),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    # без DbRunner-зависимости: её сессия жила бы, пока открыт поток
+    resume_from = last_event_id_header or last_event_id
+    after = None
+    if resume_from:
+        if resume_from.isdigit():
+            async with session_runner() as run:
+                after = await run(events.position_of, int(resume_from))
+        if after is None:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "error": {
+                        "code": "INVALID_EVENT_ID",
+                        "message": "last event id is unknown or expired",
+                    }
+                },
+            )
+
+    return StreamingResponse(
+        _stream(user_id, team_name, after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,85 @@
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Literal, Optional
+
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.replica import read_runner
+from app.services import export
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+async def _batches(request: Request, *args) -> AsyncIterator[list]:
+    # runner открывается в самом потоке: зависимость закрылась бы раньше,
+    # чем StreamingResponse дочитает пачки
+    async with read_runner(request) as run:
+        async for batch in export.pull_request_batches(run, *args):
+            yield batch
+
+
+async def _encode(batches: AsyncIterator[list], format: str) -> AsyncIterator[bytes]:
+    if format == "csv":
+        yield export.csv_header()
+    encode = export.to_csv if format == "csv" else export.to_ndjson
+    async for batch in batches:
+        yield encode(batch)
+
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    if not accept_encoding:
+        return False
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        if coding.strip().lower() == "gzip":
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+@router.get(
+    "/pullRequests",
+    summary="Потоковая выгрузка PR с ревьюверами (NDJSON или CSV)",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "Строка на PR в порядке (createdAt, pull_request_id); "
+            "в CSV ревьюверы через ';'. С Accept-Encoding: gzip ответ сжимается.",
+            "content": {"application/x-ndjson": {}, "text/csv": {}},
+        },
+    },
+)
+async def export_pull_requests(
+    request: Request,
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    status: Optional[Literal["OPEN", "MERGED"]] = Query(None),
+    created_from: Optional[datetime] = Query(None, description="createdAt >= created_from"),
+    created_to: Optional[datetime] = Query(None, description="createdAt < created_to"),
+    include_archived: bool = Query(False, description="включая PR, перенесённые в архив"),
+    accept_encoding: Optional[str] = Header(None),
+):
+    body = _encode(
+        _batches(request, status, created_from, created_to, include_archived), format
+    )
+    headers = {
+        "Content-Disposition": f'attachment; filename="pull_requests.{format}"',
+        "Vary": "Accept-Encoding",
+    }
+    if _accepts_gzip(accept_encoding):
+        body = _gzip(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=_MEDIA_TYPES[format], headers=headers)
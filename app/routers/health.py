@@ -1,7 +1,67 @@
+import asyncio
+import os
+
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app import db
+from app.replica import replica_monitor
+from app.services.roster_cache import roster_cache
+
+# доля занятых соединений (pool_size + max_overflow), с которой инстанс не готов
+READY_MAX_POOL_SATURATION = float(os.getenv("READY_MAX_POOL_SATURATION", "0.9"))
+READY_DB_TIMEOUT = float(os.getenv("READY_DB_TIMEOUT", "2"))
 
 router = APIRouter(tags=["Health"])
 
 @router.get("/health")
 def health():
     return {"status": "ok"}
+
+
+@router.get(
+    "/health/ready",
+    summary="Готовность принимать трафик: доступность БД и загрузка пула",
+    responses={503: {"description": "БД недоступна или пул соединений исчерпан"}},
+)
+async def ready():
+    if db.MEMORY_STORAGE:
+        return JSONResponse(
+            content={"status": "ready", "checks": {"storage": "memory"}}
+        )
+    pool = db.serving_pool()
+    capacity = db.DB_POOL_SIZE + db.DB_MAX_OVERFLOW
+    checked_out = pool.checkedout()
+    saturation = checked_out / capacity if capacity > 0 else 0.0
+    checks = {
+        "pool": {
+            "size": pool.size(),
+            "checked_out": checked_out,
+            "overflow": max(pool.overflow(), 0),
+            "saturation": round(saturation, 3),
+        }
+    }
+    ok = saturation < READY_MAX_POOL_SATURATION
+    if ok:
+        # при насыщенном пуле проверка БД сама встала бы в очередь за соединением
+        try:
+            await asyncio.wait_for(db.ping(), READY_DB_TIMEOUT)
+            checks["database"] = "ok"
+        except Exception as exc:
+            checks["database"] = f"error: {type(exc).__name__}"
+            ok = False
+    else:
+        checks["database"] = "skipped"
+    # недоступная реплика не мешает готовности: чтения уходят в основную БД
+    if db.read_engine is not None:
+        checks["replica"] = replica_monitor.stats()
+
+    return JSONResponse(
+        status_code=200 if ok else 503,
+        content={"status": "ready" if ok else "not_ready", "checks": checks},
+    )
+
+
+@router.get("/health/cache")
+def cache_stats():
+    return {"roster": roster_cache.stats()}
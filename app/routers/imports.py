@@ -0,0 +1,94 @@
+from typing import AsyncIterator, List, Tuple
+
+from fastapi import APIRouter, Depends, Request
+from starlette.concurrency import run_in_threadpool
+
+from app.db import DbRunner, get_runner
+from app.models import ImportPRRecord, ImportPRResponse
+from app.services import pr_import
+
+router = APIRouter(prefix="/import", tags=["Import"])
+
+
+async def _lines(request: Request) -> AsyncIterator[Tuple[int, bytes]]:
+    """Непустые строки тела по мере прихода, с номерами строк (с 1)."""
+    number = 0
+    tail = b""
+    async for chunk in request.stream():
+        *lines, tail = (tail + chunk).split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line
+    if tail.strip():
+        yield number + 1, tail
+
+
+@router.post(
+    "/pullRequests",
+    summary="Загрузить исторические PR из NDJSON (ревьюверы, статус и время из записей)",
+    response_model=ImportPRResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/x-ndjson": {
+                    "schema": ImportPRRecord.model_json_schema(),
+                    "example": '{"pull_request_id": "pr-1", "pull_request_name": "Init", '
+                    '"author_id": "u1", "status": "MERGED", "assigned_reviewers": ["u2"], '
+                    '"createdAt": "2023-01-10T09:00:00Z", "mergedAt": "2023-01-11T15:30:00Z"}',
+                }
+            },
+        }
+    },
+    responses={
+        200: {
+            "description": "Итог загрузки; ошибки по строкам (первые IMPORT_MAX_ERRORS)",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "imported": 2,
+                        "failed": 2,
+                        "errors": [
+                            {
+                                "line": 3,
+                                "pull_request_id": None,
+                                "error": {
+                                    "code": "INVALID_ROW",
+                                    "message": "mergedAt is required for MERGED "
+                                    "and not allowed for OPEN",
+                                },
+                            },
+                            {
+                                "line": 4,
+                                "pull_request_id": "pr-1",
+                                "error": {
+                                    "code": "PR_EXISTS",
+                                    "message": "PR id already exists",
+                                },
+                            },
+                        ],
+                    },
+                }
+            },
+        },
+    },
+)
+async def import_pull_requests(request: Request, run: DbRunner = Depends(get_runner)):
+    # тело читается потоком: в памяти не больше IMPORT_CHUNK_SIZE строк
+    report = pr_import.ImportReport()
+    lines: List[Tuple[int, bytes]] = []
+
+    async def flush() -> None:
+        records, invalid = await run_in_threadpool(pr_import.parse_lines, lines)
+        outcomes = await run(pr_import.import_prs, [record for _, record in records])
+        report.add_chunk(records, outcomes, invalid)
+
+    async for number, line in _lines(request):
+        lines.append((number, line))
+        if len(lines) >= pr_import.IMPORT_CHUNK_SIZE:
+            await flush()
+            lines = []
+    if lines:
+        await flush()
+    return report.as_dict()
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-
-from app.db import get_db
+from app.db import DbRunner, get_runner
 from app.models import (
+    CreatePRBatchRequest,
+    CreatePRBatchResponse,
     CreatePRRequest,
     MergePRRequest,
     ReassignPRRequest,
@@ -68,9 +68,9 @@ router = APIRouter(prefix="/pullRequest", tags=["PullRequests"])
         },
     },
 )
-def create_pr(body: CreatePRRequest, db: Session = Depends(get_db)):
-    status_code, pr = pr_service.create_pr(
-        db,
+async def create_pr(body: CreatePRRequest, run: DbRunner = Depends(get_runner)):
+    status_code, pr = await run(
+        pr_service.create_pr,
         pr_id=body.pull_request_id,
         name=body.pull_request_name,
         author_id=body.author_id,
@@ -98,6 +98,67 @@ def create_pr(body: CreatePRRequest, db: Session = Depends(get_db)):
     return {"pr": pr}
 
 
+_CREATE_ERRORS = {
+    "pr_exists": {"code": "PR_EXISTS", "message": "PR id already exists"},
+    "author_not_found": {"code": "NOT_FOUND", "message": "resource not found"},
+    "team_not_found": {"code": "NOT_FOUND", "message": "resource not found"},
+}
+
+
+@router.post(
+    "/createBatch",
+    summary = "Создать пачку PR одной транзакцией (результат и ошибка по каждому PR)",
+    response_model=CreatePRBatchResponse,
+    responses={
+        200: {
+            "description": "Результаты в порядке запроса",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "results": [
+                            {
+                                "pull_request_id": "pr-1001",
+                                "pr": {
+                                    "pull_request_id": "pr-1001",
+                                    "pull_request_name": "Add search",
+                                    "author_id": "u1",
+                                    "status": "OPEN",
+                                    "assigned_reviewers": ["u2", "u3"],
+                                },
+                                "error": None,
+                            },
+                            {
+                                "pull_request_id": "pr-1002",
+                                "pr": None,
+                                "error": {
+                                    "code": "PR_EXISTS",
+                                    "message": "PR id already exists",
+                                },
+                            },
+                        ]
+                    },
+                }
+            },
+        },
+    },
+)
+async def create_pr_batch(
+    body: CreatePRBatchRequest,
+    run: DbRunner = Depends(get_runner),
+):
+    outcomes = await run(pr_service.create_prs_batch, body.pull_requests)
+    return {
+        "results": [
+            {
+                "pull_request_id": item.pull_request_id,
+                "pr": pr,
+                "error": _CREATE_ERRORS.get(status_code),
+            }
+            for item, (status_code, pr) in zip(body.pull_requests, outcomes)
+        ]
+    }
+
+
 @router.post(
     "/merge",
     summary = "Пометить PR как MERGED (идемпотентная операция)",
@@ -136,8 +197,8 @@ def create_pr(body: CreatePRRequest, db: Session = Depends(get_db)):
         },
     },
 )
-def merge_pr(body: MergePRRequest, db: Session = Depends(get_db)):
-    status_code, pr = pr_service.merge_pr(db, body.pull_request_id)
+async def merge_pr(body: MergePRRequest, run: DbRunner = Depends(get_runner)):
+    status_code, pr = await run(pr_service.merge_pr, body.pull_request_id)
     if status_code == "not_found":
         raise HTTPException(
             status_code=404,
@@ -230,9 +291,9 @@ def merge_pr(body: MergePRRequest, db: Session = Depends(get_db)):
         },
     },
 )
-def reassign_pr(body: ReassignPRRequest, db: Session = Depends(get_db)):
-    status_code, pr, replaced_by = pr_service.reassign_reviewer(
-        db, body.pull_request_id, body.old_user_id
+async def reassign_pr(body: ReassignPRRequest, run: DbRunner = Depends(get_runner)):
+    status_code, pr, replaced_by = await run(
+        pr_service.reassign_reviewer, body.pull_request_id, body.old_user_id
     )
 
     if status_code in ("pr_not_found", "user_not_found"):
@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.db import DbRunner
+from app.replica import get_read_runner
+from app.models import TeamStats, UserStats
+from app.services import stats_service
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+
+@router.get(
+    "/user",
+    summary="Статистика пользователя: открытые и все ревью, авторские и смёрженные PR",
+    response_model=UserStats,
+    responses={
+        404: {
+            "description": "Пользователь не найден",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "$ref": "#/components/schemas/ErrorResponse"
+                    },
+                }
+            },
+        },
+    },
+)
+async def user_stats(user_id: str = Query(...), run: DbRunner = Depends(get_read_runner)):
+    stats = await run(stats_service.get_user_stats, user_id)
+    if stats is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"error": {"code": "NOT_FOUND", "message": "resource not found"}},
+        )
+    return stats
+
+
+@router.get(
+    "/team",
+    summary="Статистика команды (сумма по текущим участникам)",
+    response_model=TeamStats,
+    responses={
+        404: {
+            "description": "Команда не найдена",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "$ref": "#/components/schemas/ErrorResponse"
+                    },
+                }
+            },
+        },
+    },
+)
+async def team_stats(team_name: str = Query(...), run: DbRunner = Depends(get_read_runner)):
+    stats = await run(stats_service.get_team_stats, team_name)
+    if stats is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"error": {"code": "NOT_FOUND", "message": "resource not found"}},
+        )
+    return stats
@@ -1,10 +1,20 @@
 # app/routers/teams.py
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from typing import Optional
 
-from app.db import get_db
-from app.models import Team, TeamResponse, ErrorResponse
-from app.services import team_service
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from app import serialization
+from app.db import DbRunner, get_runner
+from app.replica import get_read_runner
+from app.models import (
+    Team,
+    TeamResponse,
+    TeamImportRequest,
+    TeamImportResponse,
+    TeamMembersPatchRequest,
+    TeamMembersPatchResponse,
+    ErrorResponse,
+)
+from app.services import team_service, versions
 
 router = APIRouter(prefix="/team", tags=["Teams"])
 
@@ -64,8 +74,8 @@ router = APIRouter(prefix="/team", tags=["Teams"])
         },
     },
 )
-def add_team(team: Team, db: Session = Depends(get_db)):
-    created = team_service.create_team(db, team)
+async def add_team(team: Team, run: DbRunner = Depends(get_runner)):
+    created = await run(team_service.create_team, team)
     if created is None:
         raise HTTPException(
             status_code=400,
@@ -79,6 +89,112 @@ def add_team(team: Team, db: Session = Depends(get_db)):
     return {"team": created}
 
 
+@router.post(
+    "/import",
+    summary="Импорт множества команд: создаёт недостающие, upsert'ит всех участников",
+    response_model=TeamImportResponse,
+    responses={
+        200: {
+            "description": "Итог импорта",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "teams_created": ["payments"],
+                        "teams_updated": ["backend"],
+                        "members_upserted": 2,
+                    }
+                }
+            },
+        },
+    },
+)
+async def import_teams(body: TeamImportRequest, run: DbRunner = Depends(get_runner)):
+    return await run(team_service.import_teams, body.teams)
+
+
+@router.patch(
+    "/members",
+    summary="Изменить составы команд дельтами add / update / remove одной транзакцией",
+    response_model=TeamMembersPatchResponse,
+    responses={
+        200: {
+            "description": "Изменения применены; remove деактивирует участника",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "teams": [
+                            {
+                                "team_name": "backend",
+                                "added": ["u7"],
+                                "updated": ["u2"],
+                                "removed": ["u3"],
+                                "not_members": [],
+                            }
+                        ],
+                        "replaced": [
+                            {
+                                "pull_request_id": "pr-1001",
+                                "old_user_id": "u3",
+                                "new_user_id": "u7",
+                            }
+                        ],
+                        "unreplaced": [],
+                    }
+                }
+            },
+        },
+        404: {
+            "description": "Одна из команд не найдена",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "$ref": "#/components/schemas/ErrorResponse"
+                    },
+                }
+            },
+        },
+        409: {
+            "description": "add активного участника другой команды без remove из неё",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "$ref": "#/components/schemas/ErrorResponse"
+                    },
+                    "example": {
+                        "error": {
+                            "code": "MEMBER_CONFLICT",
+                            "message": "user is an active member of another team",
+                        }
+                    },
+                }
+            },
+        },
+    },
+)
+async def patch_members(
+    body: TeamMembersPatchRequest, run: DbRunner = Depends(get_runner)
+):
+    status_code, result = await run(
+        team_service.update_members, body.teams, body.reassign_removed
+    )
+    if status_code == "team_not_found":
+        raise HTTPException(
+            status_code=404,
+            detail={"error": {"code": "NOT_FOUND", "message": "resource not found"}},
+        )
+    if status_code == "member_conflict":
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "error": {
+                    "code": "MEMBER_CONFLICT",
+                    "message": "user is an active member of another team",
+                }
+            },
+        )
+    return result
+
+
 @router.get(
     "/get",
     summary="Получить команду с участниками",
@@ -107,6 +223,7 @@ def add_team(team: Team, db: Session = Depends(get_db)):
                 }
             },
         },
+        304: {"description": "Команда не изменилась с версии из If-None-Match"},
         404: {
             "description": "Команда не найдена",
             "content": {
@@ -119,8 +236,24 @@ def add_team(team: Team, db: Session = Depends(get_db)):
         },
     },
 )
-def get_team(team_name: str = Query(...), db: Session = Depends(get_db)):
-    team = team_service.get_team(db, team_name)
+async def get_team(
+    response: Response,
+    team_name: str = Query(...),
+    if_none_match: Optional[str] = Header(None),
+    run: DbRunner = Depends(get_read_runner),
+):
+    # версия читается до данных: при гонке тег окажется старше ответа,
+    # и клиент просто перезапросит, но не закэширует устаревшие данные
+    etag = None
+    version = await run(versions.team_version, team_name)
+    if version is not None:
+        etag = versions.make_etag("team", team_name, version)
+        if versions.etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+
+    get = team_service.get_team_raw if serialization.FAST_JSON else team_service.get_team
+    team = await run(get, team_name)
     if team is None:
         raise HTTPException(
             status_code=404,
@@ -131,4 +264,8 @@ def get_team(team_name: str = Query(...), db: Session = Depends(get_db)):
                 }
             },
         )
+    if serialization.FAST_JSON:
+        return serialization.json_response(
+            team, headers={"ETag": etag} if etag else None
+        )
     return team
@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from typing import Literal, Optional
 
-from app.db import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from app import serialization
+from app.db import DbRunner, get_runner
+from app.replica import get_read_runner
 from app.models import (
+    DeactivateBatchRequest,
+    DeactivateBatchResponse,
     SetUserActiveRequest,
     UserResponse,
     UserReviewsResponse,
 )
-from app.services import user_service
+from app.services import user_service, versions
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -49,8 +53,11 @@ router = APIRouter(prefix="/users", tags=["Users"])
         },
     },
 )
-def set_is_active(body: SetUserActiveRequest, db: Session = Depends(get_db)):
-    user = user_service.set_user_active(db, body.user_id, body.is_active)
+async def set_is_active(
+    body: SetUserActiveRequest,
+    run: DbRunner = Depends(get_runner),
+):
+    user = await run(user_service.set_user_active, body.user_id, body.is_active)
     if user is None:
         raise HTTPException(
             status_code=404,
@@ -64,6 +71,39 @@ def set_is_active(body: SetUserActiveRequest, db: Session = Depends(get_db)):
     return {"user": user}
 
 
+@router.post(
+    "/deactivateBatch",
+    summary = "Деактивировать пользователей и переназначить их открытые ревью",
+    response_model=DeactivateBatchResponse,
+    responses={
+        200: {
+            "description": "Итог деактивации и переназначений",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "deactivated": ["u2"],
+                        "not_found": [],
+                        "replaced": [
+                            {
+                                "pull_request_id": "pr-1001",
+                                "old_user_id": "u2",
+                                "new_user_id": "u5",
+                            }
+                        ],
+                        "unreplaced": [],
+                    }
+                }
+            },
+        },
+    },
+)
+async def deactivate_batch(
+    body: DeactivateBatchRequest,
+    run: DbRunner = Depends(get_runner),
+):
+    return await run(user_service.deactivate_users, body.user_ids)
+
+
 @router.get(
     "/getReview",
     summary = "Получить PR'ы, где пользователь назначен ревьювером",
@@ -84,6 +124,11 @@ def set_is_active(body: SetUserActiveRequest, db: Session = Depends(get_db)):
                                     "$ref": "#/components/schemas/PullRequestShort"
                                 },
                             },
+                            "next_cursor": {
+                                "type": "string",
+                                "nullable": True,
+                                "description": "cursor следующей страницы",
+                            },
                         },
                     },
                     "example": {
@@ -96,12 +141,74 @@ def set_is_active(body: SetUserActiveRequest, db: Session = Depends(get_db)):
                                 "status": "OPEN",
                             }
                         ],
+                        "next_cursor": "WyIyMDI1LTEwLTI0VDEyOjM0OjU2KzAwOjAwIiwgInByLTEwMDEiXQ",
+                    },
+                }
+            },
+        },
+        304: {"description": "Список не изменился с версии из If-None-Match"},
+        400: {
+            "description": "Некорректный cursor",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "$ref": "#/components/schemas/ErrorResponse"
                     },
                 }
             },
-        }
+        },
     },
 )
-def get_review(user_id: str = Query(...), db: Session = Depends(get_db)):
-    prs = user_service.get_user_reviews(db, user_id)
-    return {"user_id": user_id, "pull_requests": prs}
+async def get_review(
+    response: Response,
+    user_id: str = Query(...),
+    status: Optional[Literal["OPEN", "MERGED"]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    include_archived: bool = Query(False, description="включая PR, перенесённые в архив"),
+    if_none_match: Optional[str] = Header(None),
+    run: DbRunner = Depends(get_read_runner),
+):
+    etag = None
+    version = await run(versions.reviews_version, user_id)
+    if version is not None:
+        etag = versions.make_etag(
+            "reviews", user_id, version, status, limit, cursor, include_archived
+        )
+        if versions.etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+
+    if serialization.FAST_JSON:
+        status_code, body = await run(
+            user_service.get_user_reviews_raw,
+            user_id,
+            status,
+            limit,
+            cursor,
+            include_archived,
+        )
+    else:
+        status_code, prs, next_cursor = await run(
+            user_service.get_user_reviews,
+            user_id,
+            status,
+            limit,
+            cursor,
+            include_archived,
+        )
+    if status_code == "invalid_cursor":
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": {
+                    "code": "INVALID_CURSOR",
+                    "message": "cursor is malformed",
+                }
+            },
+        )
+    if serialization.FAST_JSON:
+        return serialization.json_response(
+            body, headers={"ETag": etag} if etag else None
+        )
+    return {"user_id": user_id, "pull_requests": prs, "next_cursor": next_cursor}
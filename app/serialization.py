@@ -0,0 +1,36 @@
+"""
+Быстрый путь ответов (FAST_JSON=1) для больших списков: сервис строит dict
+прямо из кортежей строк, ответ кодируется orjson без pydantic-моделей и
+повторной проверки по response_model. Байты совпадают с обычным путём:
+компактный JSON, UTF-8 без экранирования, datetime в UTC с суффиксом Z.
+"""
+
+import os
+from typing import Any, Mapping, Optional
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+FAST_JSON = os.getenv("FAST_JSON", "0") == "1"
+
+if FAST_JSON and orjson is None:
+    raise RuntimeError("FAST_JSON=1 requires the orjson package")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+def json_response(
+    content: Any, status_code: int = 200, headers: Optional[Mapping[str, str]] = None
+) -> Response:
+    return Response(
+        dumps(content),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
@@ -0,0 +1,87 @@
+import os
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# MERGED PR старше стольких дней уходят из горячих таблиц
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+
+# Перенос пачки одним оператором. PR, заблокированные merge/reassign, пропускаются
+# до следующего запуска. Из списков ревью по умолчанию архивные PR пропадают,
+# поэтому reviews_version ревьюверов растёт (ETag /users/getReview).
+_ARCHIVE_SQL = """
+WITH batch AS (
+    SELECT pull_request_id
+    FROM pull_requests
+    WHERE status = 'MERGED'
+      AND merged_at < now() - make_interval(secs => :seconds)
+    ORDER BY merged_at, pull_request_id
+    LIMIT :limit
+    FOR UPDATE SKIP LOCKED
+),
+moved_reviewers AS (
+    DELETE FROM pull_request_reviewers r
+    USING batch b
+    WHERE r.pull_request_id = b.pull_request_id
+    RETURNING r.pull_request_id, r.reviewer_id, r.created_at
+),
+moved_prs AS (
+    DELETE FROM pull_requests p
+    USING batch b
+    WHERE p.pull_request_id = b.pull_request_id
+    RETURNING p.*
+),
+archived_prs AS (
+    INSERT INTO pull_requests_archive
+        (pull_request_id, pull_request_name, author_id, status, created_at, merged_at)
+    SELECT pull_request_id, pull_request_name, author_id, status, created_at, merged_at
+    FROM moved_prs
+    RETURNING pull_request_id
+),
+archived_reviewers AS (
+    INSERT INTO pull_request_reviewers_archive (pull_request_id, reviewer_id, created_at)
+    SELECT pull_request_id, reviewer_id, created_at FROM moved_reviewers
+    RETURNING reviewer_id
+)
+SELECT
+    (SELECT count(*) FROM archived_prs) AS prs,
+    coalesce(
+        (SELECT array_agg(DISTINCT reviewer_id) FROM archived_reviewers),
+        ARRAY[]::text[]
+    ) AS reviewers
+"""
+
+# Блокировка в порядке ключа отдельным оператором, как в stats_service.apply:
+# UPDATE в том же операторе видел бы устаревшие версии строк и получал deadlock
+# с create/merge/reassign, которые блокируют тех же пользователей.
+_LOCK_USERS_SQL = """
+SELECT user_id FROM users
+WHERE user_id = ANY(:ids)
+ORDER BY user_id
+FOR NO KEY UPDATE
+"""
+
+_BUMP_USERS_SQL = """
+UPDATE users SET reviews_version = reviews_version + 1
+WHERE user_id = ANY(:ids)
+"""
+
+
+def archive_batch(
+    db: Session,
+    older_than_days: float = ARCHIVE_AFTER_DAYS,
+    limit: int = ARCHIVE_BATCH_SIZE,
+) -> int:
+    """
+    Переносит до limit MERGED PR с их ревьюверами в архивные таблицы
+    и коммитит пачку. Возвращает число перенесённых PR.
+    """
+    row = db.execute(
+        text(_ARCHIVE_SQL), {"seconds": older_than_days * 86400, "limit": limit}
+    ).one()
+    if row.reviewers:
+        db.execute(text(_LOCK_USERS_SQL), {"ids": row.reviewers})
+        db.execute(text(_BUMP_USERS_SQL), {"ids": row.reviewers})
+    db.commit()
+    return row.prs
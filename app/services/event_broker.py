@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import os
+from typing import Optional, Set, Tuple
+
+from app.db import session_runner
+from app.models import ReviewEvent
+from app.services import events
+
+EVENTS_POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", "1"))
+# отставший подписчик отключается и догоняет по Last-Event-ID из БД
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "1000"))
+EVENTS_BATCH = 500
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    def __init__(self, user_id: Optional[str], team_name: Optional[str]) -> None:
+        self.user_id = user_id
+        self.team_name = team_name
+        self.queue: "asyncio.Queue[Tuple[events.Position, ReviewEvent]]" = asyncio.Queue(
+            EVENTS_QUEUE_SIZE
+        )
+        self.overflowed = False
+
+    def matches(self, event: ReviewEvent) -> bool:
+        if self.user_id is not None and self.user_id not in event.user_ids:
+            return False
+        if self.team_name is not None and self.team_name != event.team_name:
+            return False
+        return True
+
+    def offer(self, position: events.Position, event: ReviewEvent) -> None:
+        if self.overflowed or not self.matches(event):
+            return
+        try:
+            self.queue.put_nowait((position, event))
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class EventBroker:
+    """
+    Один опрос review_events на процесс, пока есть подписчики; новые события
+    раздаются подписчикам из памяти с фильтрацией по пользователю и команде.
+    """
+
+    def __init__(self, poll_interval: float = EVENTS_POLL_INTERVAL) -> None:
+        self.poll_interval = poll_interval
+        self._subscribers: Set[Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._position: Optional[events.Position] = None
+        self._start_lock = asyncio.Lock()
+
+    async def subscribe(
+        self, user_id: Optional[str] = None, team_name: Optional[str] = None
+    ) -> Tuple[Subscription, events.Position]:
+        """
+        Возвращает подписку и позицию, после которой она получает события:
+        всё до неё поток дочитывает из БД сам.
+        """
+        async with self._start_lock:
+            if self._task is None:
+                async with session_runner() as run:
+                    self._position = await run(events.horizon)
+                self._task = asyncio.create_task(self._poll())
+        subscription = Subscription(user_id, team_name)
+        self._subscribers.add(subscription)
+        return subscription, self._position
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _poll(self) -> None:
+        batch: list = []
+        while True:
+            # полная пачка — за ней есть ещё, читаем без паузы
+            if len(batch) < EVENTS_BATCH:
+                await asyncio.sleep(self.poll_interval)
+            try:
+                async with session_runner() as run:
+                    batch = await run(
+                        events.read_after, self._position, limit=EVENTS_BATCH
+                    )
+            except Exception:
+                logger.exception("review events poll failed")
+                batch = []
+                continue
+            for position, event in batch:
+                self._position = position
+                for subscription in list(self._subscribers):
+                    subscription.offer(position, event)
+
+
+event_broker = EventBroker()
@@ -0,0 +1,121 @@
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from app.db_models import ReviewEventModel
+from app.models import ReviewEvent
+
+ASSIGNED = "assigned"
+REASSIGNED = "reassigned"
+MERGED = "merged"
+
+# позиция в потоке: (xid, event_id) записавшей транзакции
+Position = Tuple[int, int]
+
+
+def record(
+    db: Session,
+    event_type: str,
+    pr_id: str,
+    team_name: Optional[str],
+    user_ids: Sequence[str],
+    data: dict,
+) -> None:
+    """Событие пишется в транзакции изменения; коммит делает вызывающий."""
+    record_many(db, [(event_type, pr_id, team_name, user_ids, data)])
+
+
+def record_many(
+    db: Session, events: Iterable[Tuple[str, str, Optional[str], Sequence[str], dict]]
+) -> None:
+    rows = [
+        {
+            "event_type": event_type,
+            "pull_request_id": pr_id,
+            "team_name": team_name,
+            "user_ids": list(user_ids),
+            "data": data,
+        }
+        for event_type, pr_id, team_name, user_ids, data in events
+    ]
+    if rows:
+        db.execute(insert(ReviewEventModel), rows)
+
+
+def horizon(db: Session) -> Position:
+    """Позиция, до которой все транзакции завершены: отсюда начинается живой поток."""
+    xmin = db.execute(
+        text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+    ).scalar_one()
+    return xmin, 0
+
+
+def position_of(db: Session, event_id: int) -> Optional[Position]:
+    row = db.execute(
+        text("SELECT xid::text::bigint FROM review_events WHERE event_id = :event_id"),
+        {"event_id": event_id},
+    ).first()
+    return (row[0], event_id) if row else None
+
+
+_READ_AFTER_SQL = """
+SELECT event_id, xid::text::bigint AS xid, event_type, pull_request_id,
+       team_name, user_ids, data, created_at
+FROM review_events
+WHERE (xid, event_id) > (CAST(CAST(:xid AS text) AS xid8), :event_id)
+  AND xid < pg_snapshot_xmin(pg_current_snapshot())
+  {filters}
+ORDER BY xid, event_id
+LIMIT :limit
+"""
+
+
+def read_after(
+    db: Session,
+    position: Position,
+    user_id: Optional[str] = None,
+    team_name: Optional[str] = None,
+    limit: int = 500,
+) -> List[Tuple[Position, ReviewEvent]]:
+    """
+    События после position в порядке (xid, event_id). Транзакции, ещё не
+    завершённые на момент чтения, не отдаются вместе со всем, что за ними.
+    """
+    filters = []
+    params = {"xid": position[0], "event_id": position[1], "limit": limit}
+    if user_id is not None:
+        filters.append("AND user_ids @> ARRAY[CAST(:user_id AS text)]")
+        params["user_id"] = user_id
+    if team_name is not None:
+        filters.append("AND team_name = :team_name")
+        params["team_name"] = team_name
+    rows = db.execute(
+        text(_READ_AFTER_SQL.format(filters="\n  ".join(filters))), params
+    ).all()
+    return [
+        (
+            (row.xid, row.event_id),
+            ReviewEvent(
+                event_id=row.event_id,
+                type=row.event_type,
+                pull_request_id=row.pull_request_id,
+                team_name=row.team_name,
+                user_ids=row.user_ids,
+                data=row.data,
+                created_at=row.created_at,
+            ),
+        )
+        for row in rows
+    ]
+
+
+def prune(db: Session, older_than_hours: float) -> int:
+    result = db.execute(
+        text(
+            "DELETE FROM review_events "
+            "WHERE created_at < now() - make_interval(secs => :seconds)"
+        ),
+        {"seconds": older_than_hours * 3600},
+    )
+    return result.rowcount
@@ -0,0 +1,202 @@
+"""
+Потоковая выгрузка PR с ревьюверами для аналитики: строки читаются keyset-
+страницами по (created_at, pull_request_id) размером EXPORT_BATCH_SIZE через
+DbRunner/MemoryRunner и сразу кодируются в NDJSON или CSV.
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple
+
+from sqlalchemy import func, literal_column, select, tuple_, union_all
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Session
+
+from app.db_models import (
+    PullRequestArchiveModel,
+    PullRequestModel,
+    PullRequestReviewerArchiveModel,
+    PullRequestReviewerModel,
+)
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+COLUMNS = (
+    "pull_request_id",
+    "pull_request_name",
+    "author_id",
+    "status",
+    "assigned_reviewers",
+    "createdAt",
+    "mergedAt",
+)
+
+# позиция в выгрузке: (createdAt, pull_request_id) последней отданной строки
+Position = Tuple[datetime, str]
+
+
+def _select(prs, reviewers, status, created_from, created_to, after, limit):
+    # коррелированный подзапрос по PK ревьюверов вместо GROUP BY: строки идут
+    # по индексу created_at с первой же, без сортировки всей таблицы
+    assigned = (
+        select(
+            func.coalesce(
+                func.array_agg(
+                    aggregate_order_by(reviewers.reviewer_id, reviewers.reviewer_id)
+                ),
+                literal_column("ARRAY[]::text[]"),
+            )
+        )
+        .where(reviewers.pull_request_id == prs.pull_request_id)
+        .scalar_subquery()
+    )
+    q = select(
+        prs.pull_request_id,
+        prs.pull_request_name,
+        prs.author_id,
+        prs.status,
+        assigned.label("assigned_reviewers"),
+        prs.created_at,
+        prs.merged_at,
+    )
+    if status is not None:
+        q = q.where(prs.status == status)
+    if created_from is not None:
+        q = q.where(prs.created_at >= created_from)
+    if created_to is not None:
+        q = q.where(prs.created_at < created_to)
+    if after is not None:
+        q = q.where(tuple_(prs.created_at, prs.pull_request_id) > tuple_(*after))
+    return q.order_by(prs.created_at, prs.pull_request_id).limit(limit)
+
+
+def export_query(
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    include_archived: bool = False,
+    after: Optional[Position] = None,
+    limit: int = EXPORT_BATCH_SIZE,
+):
+    q = _select(
+        PullRequestModel,
+        PullRequestReviewerModel,
+        status,
+        created_from,
+        created_to,
+        after,
+        limit,
+    )
+    if include_archived and status != "OPEN":
+        # обе ветки идут по своему индексу created_at и отдают не больше limit
+        archived = _select(
+            PullRequestArchiveModel,
+            PullRequestReviewerArchiveModel,
+            status,
+            created_from,
+            created_to,
+            after,
+            limit,
+        )
+        both = union_all(q.subquery().select(), archived.subquery().select()).subquery()
+        return (
+            select(both)
+            .order_by(both.c.created_at, both.c.pull_request_id)
+            .limit(limit)
+        )
+    return q
+
+
+def read_page(
+    db: Session,
+    status: Optional[str],
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+    include_archived: bool,
+    after: Optional[Position],
+    limit: int,
+) -> List[tuple]:
+    """Следующие limit строк после after в порядке COLUMNS."""
+    stmt = export_query(status, created_from, created_to, include_archived, after, limit)
+    return [tuple(row) for row in db.execute(stmt)]
+
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    # границы без часового пояса считаются UTC: так их понимают оба хранилища
+    # (Postgres иначе взял бы TimeZone сессии, а память падала бы на сравнении)
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+
+async def pull_request_batches(
+    run: Callable[..., Any],
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    include_archived: bool = False,
+    size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[list]:
+    """
+    Пачки строк в порядке COLUMNS; run — DbRunner (с реплики, если выбрана)
+    или MemoryRunner. Каждая пачка — отдельный вызов: соединение не держится
+    между пачками, строка с одной позицией не повторяется и не пропадает.
+    """
+    created_from, created_to = _aware(created_from), _aware(created_to)
+    after: Optional[Position] = None
+    while True:
+        batch = await run(
+            read_page, status, created_from, created_to, include_archived, after, size
+        )
+        if batch:
+            yield batch
+        if len(batch) < size:
+            return
+        last = batch[-1]
+        after = (last[COLUMNS.index("createdAt")], last[0])
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[str]:
+    # тот же вид, что в ответах API: UTC с суффиксом Z
+    if value is None:
+        return None
+    return value.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def to_ndjson(rows: List[tuple]) -> bytes:
+    lines = []
+    for row in rows:
+        record = dict(zip(COLUMNS, row))
+        record["assigned_reviewers"] = list(record["assigned_reviewers"])
+        record["createdAt"] = _timestamp(record["createdAt"])
+        record["mergedAt"] = _timestamp(record["mergedAt"])
+        lines.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        lines.append("\n")
+    return "".join(lines).encode()
+
+
+def csv_header() -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(COLUMNS)
+    return buffer.getvalue().encode()
+
+
+def to_csv(rows: List[tuple]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for pr_id, name, author_id, status, reviewers, created_at, merged_at in rows:
+        writer.writerow(
+            (
+                pr_id,
+                name,
+                author_id,
+                status,
+                ";".join(reviewers),
+                _timestamp(created_at),
+                _timestamp(merged_at) or "",
+            )
+        )
+    return buffer.getvalue().encode()
@@ -0,0 +1,117 @@
+import os
+from typing import Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# сколько хранится ответ для повторов
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+# через сколько незавершённую запись (упавший процесс) может перехватить повтор
+IDEMPOTENCY_LEASE = float(os.getenv("IDEMPOTENCY_LEASE", "60"))
+
+_RESERVE_SQL = """
+INSERT INTO idempotency_keys (endpoint, idempotency_key, request_hash)
+VALUES (:endpoint, :key, :request_hash)
+ON CONFLICT (endpoint, idempotency_key) DO UPDATE
+SET request_hash = excluded.request_hash,
+    status_code = NULL,
+    content_type = NULL,
+    body = NULL,
+    created_at = now()
+WHERE idempotency_keys.created_at < now() - make_interval(secs => :ttl)
+   OR (idempotency_keys.status_code IS NULL
+       AND idempotency_keys.created_at < now() - make_interval(secs => :lease))
+RETURNING 1
+"""
+
+
+def reserve(
+    db: Session, endpoint: str, key: str, request_hash: str
+) -> Tuple[str, Optional[Tuple[int, Optional[str], bytes]]]:
+    """
+    Возвращает кортеж (status, stored):
+      - "reserved": ключ свободен, запрос выполняет вызывающий
+      - "replay": stored = (status_code, content_type, body) первого ответа
+      - "in_progress": первый запрос с этим ключом ещё выполняется
+      - "mismatch": ключ уже использован с другим телом запроса
+    """
+    params = {
+        "endpoint": endpoint,
+        "key": key,
+        "request_hash": request_hash,
+        "ttl": IDEMPOTENCY_TTL,
+        "lease": IDEMPOTENCY_LEASE,
+    }
+    reserved = db.execute(text(_RESERVE_SQL), params).first()
+    db.commit()
+    if reserved:
+        return "reserved", None
+
+    row = db.execute(
+        text(
+            "SELECT request_hash, status_code, content_type, body FROM idempotency_keys "
+            "WHERE endpoint = :endpoint AND idempotency_key = :key"
+        ),
+        params,
+    ).first()
+    db.commit()
+    if row is None:
+        # запись успели удалить между операторами
+        return reserve(db, endpoint, key, request_hash)
+    if row.request_hash != request_hash:
+        return "mismatch", None
+    if row.status_code is None:
+        return "in_progress", None
+    return "replay", (row.status_code, row.content_type, bytes(row.body))
+
+
+def complete(
+    db: Session,
+    endpoint: str,
+    key: str,
+    request_hash: str,
+    status_code: int,
+    content_type: Optional[str],
+    body: bytes,
+) -> None:
+    db.execute(
+        text(
+            "UPDATE idempotency_keys "
+            "SET status_code = :status_code, content_type = :content_type, body = :body "
+            "WHERE endpoint = :endpoint AND idempotency_key = :key "
+            "AND request_hash = :request_hash AND status_code IS NULL"
+        ),
+        {
+            "endpoint": endpoint,
+            "key": key,
+            "request_hash": request_hash,
+            "status_code": status_code,
+            "content_type": content_type,
+            "body": body,
+        },
+    )
+    db.commit()
+
+
+def release(db: Session, endpoint: str, key: str, request_hash: str) -> None:
+    """Снимает резерв после 5xx: повтор выполнит запрос заново."""
+    db.execute(
+        text(
+            "DELETE FROM idempotency_keys "
+            "WHERE endpoint = :endpoint AND idempotency_key = :key "
+            "AND request_hash = :request_hash AND status_code IS NULL"
+        ),
+        {"endpoint": endpoint, "key": key, "request_hash": request_hash},
+    )
+    db.commit()
+
+
+def prune(db: Session) -> int:
+    result = db.execute(
+        text(
+            "DELETE FROM idempotency_keys "
+            "WHERE created_at < now() - make_interval(secs => :ttl)"
+        ),
+        {"ttl": IDEMPOTENCY_TTL},
+    )
+    return result.rowcount
@@ -0,0 +1,784 @@
+"""
+In-memory хранилище (STORAGE_BACKEND=memory): те же функции сервисов, что
+вызывают роутеры через DbRunner, над индексированными dict/set без Postgres.
+
+Интерфейс хранилища — функции сервисов с сигнатурой fn(db, ...) из
+STORAGE_INTERFACE: SQL-реализация в самих модулях сервисов, in-memory
+реализация регистрируется здесь через @implements. Без реализации хотя бы одной
+из них MemoryStore не создаётся — ошибка при старте, а не в запросе.
+
+Один процесс, без персистентности: для single-node развёртываний, где важна
+задержка, и для быстрых прогонов. Все вызовы выполняются на event loop без
+await внутри, поэтому каждый из них атомарен.
+"""
+
+import bisect
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from app.models import (
+    CreatePRRequest,
+    DeactivateBatchResponse,
+    ImportPRRecord,
+    PullRequest,
+    PullRequestShort,
+    ReviewerReplacement,
+    ReviewEvent,
+    Team,
+    TeamImportResponse,
+    TeamMember,
+    TeamMembersDelta,
+    TeamMembersPatchResponse,
+    TeamStats,
+    UnreplacedAssignment,
+    User,
+    UserStats,
+)
+from app.services import (
+    events,
+    export,
+    idempotency_keys,
+    pr_import,
+    pr_service,
+    reviewer_selection,
+    stats_service,
+    team_service,
+    user_service,
+    versions,
+)
+
+# сколько последних событий хранится для SSE и Last-Event-ID
+EVENTS_KEPT = 100_000
+
+# функция сервиса -> метод MemoryStore с той же сигнатурой без db
+IMPLEMENTATIONS: Dict[Callable, Callable] = {}
+
+# всё, что роутеры, middleware и фоновые задачи передают runner'у
+STORAGE_INTERFACE: Tuple[Callable, ...] = (
+    team_service.create_team,
+    team_service.import_teams,
+    team_service.update_members,
+    team_service.get_team,
+    team_service.get_team_raw,
+    versions.team_version,
+    versions.reviews_version,
+    user_service.set_user_active,
+    user_service.deactivate_users,
+    user_service.get_user_reviews,
+    user_service.get_user_reviews_raw,
+    pr_service.create_pr,
+    pr_service.create_prs_batch,
+    pr_service.merge_pr,
+    pr_service.reassign_reviewer,
+    pr_import.import_prs,
+    stats_service.get_user_stats,
+    stats_service.get_team_stats,
+    export.read_page,
+    events.horizon,
+    events.position_of,
+    events.read_after,
+    idempotency_keys.reserve,
+    idempotency_keys.complete,
+    idempotency_keys.release,
+)
+
+
+def implements(service_fn: Callable) -> Callable[[Callable], Callable]:
+    def register(method: Callable) -> Callable:
+        IMPLEMENTATIONS[service_fn] = method
+        return method
+
+    return register
+
+
+class _User:
+    def __init__(
+        self, user_id: str, username: str, team_name: str, is_active: bool
+    ) -> None:
+        self.user_id = user_id
+        self.username = username
+        self.team_name = team_name
+        self.is_active = is_active
+        self.open_review_count = 0
+        self.review_count = 0
+        self.authored_pr_count = 0
+        self.merged_pr_count = 0
+        self.reviews_version = 0
+
+
+class _PullRequest:
+    def __init__(self, pr_id: str, name: str, author_id: str, created_at: datetime) -> None:
+        self.pull_request_id = pr_id
+        self.pull_request_name = name
+        self.author_id = author_id
+        self.status = "OPEN"
+        self.created_at = created_at
+        self.merged_at: Optional[datetime] = None
+        self.reviewers: List[str] = []
+
+
+def _check_coverage() -> None:
+    missing = [fn for fn in STORAGE_INTERFACE if fn not in IMPLEMENTATIONS]
+    if missing:
+        names = ", ".join(f"{fn.__module__}.{fn.__qualname__}" for fn in missing)
+        raise RuntimeError(f"no in-memory implementation: {names}")
+
+
+class MemoryStore:
+    def __init__(self) -> None:
+        _check_coverage()
+        self.team_versions: Dict[str, int] = {}
+        # team -> все участники / только активные (кандидаты в ревьюверы)
+        self.members: Dict[str, Set[str]] = {}
+        self.active_members: Dict[str, Set[str]] = {}
+        self.users: Dict[str, _User] = {}
+        self.prs: Dict[str, _PullRequest] = {}
+        # reviewer -> PR, где он назначен; status -> PR
+        self.reviews: Dict[str, Set[str]] = {}
+        self.by_status: Dict[str, Set[str]] = {"OPEN": set(), "MERGED": set()}
+        self.events: Deque[Tuple[int, ReviewEvent]] = deque(maxlen=EVENTS_KEPT)
+        self._event_ids = itertools.count(1)
+        self._round_robin: Dict[str, str] = {}
+        # (endpoint, key) -> [request_hash, status_code, content_type, body, created_at]
+        self.idempotency: Dict[Tuple[str, str], list] = {}
+
+    # --- внутренние операции -------------------------------------------------
+
+    def _upsert_member(
+        self, user_id: str, username: str, team_name: str, is_active: bool
+    ) -> Optional[str]:
+        """Возвращает прежнюю команду пользователя."""
+        user = self.users.get(user_id)
+        previous = None
+        if user is None:
+            user = self.users[user_id] = _User(user_id, username, team_name, is_active)
+        else:
+            previous = user.team_name
+            self.members[previous].discard(user_id)
+            self.active_members[previous].discard(user_id)
+            user.username = username
+            user.team_name = team_name
+            user.is_active = is_active
+        self.members[team_name].add(user_id)
+        if is_active:
+            self.active_members[team_name].add(user_id)
+        return previous
+
+    def _set_active(self, user: _User, is_active: bool) -> None:
+        user.is_active = is_active
+        if is_active:
+            self.active_members[user.team_name].add(user.user_id)
+        else:
+            self.active_members[user.team_name].discard(user.user_id)
+
+    def _bump_teams(self, team_names) -> None:
+        for name in set(team_names):
+            if name in self.team_versions:
+                self.team_versions[name] += 1
+
+    def _sync_teams(self, teams: List[Team]) -> Tuple[Set[str], int]:
+        # повтор user_id: побеждает последнее вхождение, как в team_service
+        rows: Dict[str, Tuple[str, str, bool]] = {}
+        for team_data in teams:
+            for member in team_data.members:
+                rows[member.user_id] = (
+                    member.username,
+                    team_data.team_name,
+                    member.is_active,
+                )
+        affected: Set[str] = set()
+        for user_id in sorted(rows):
+            previous = self._upsert_member(user_id, *rows[user_id])
+            if previous is not None:
+                affected.add(previous)
+        return affected, len(rows)
+
+    def _add_team(self, team_name: str) -> None:
+        self.team_versions[team_name] = 0
+        self.members[team_name] = set()
+        self.active_members[team_name] = set()
+
+    def _select(self, team_name: str, exclude: Set[str], limit: int) -> List[str]:
+        """Стратегии REVIEWER_STRATEGY над активными участниками команды."""
+        pool = [
+            uid for uid in self.active_members.get(team_name, ()) if uid not in exclude
+        ]
+        strategy = reviewer_selection.get_selector().name
+        if strategy == "random":
+            random.shuffle(pool)
+            return pool[:limit]
+        if strategy == "round_robin":
+            members = sorted(self.active_members.get(team_name, ()))
+            cursor = self._round_robin.get(team_name)
+            start = bisect.bisect_right(members, cursor) if cursor is not None else 0
+            ordered = members[start:] + members[:start]
+            picked = [uid for uid in ordered if uid not in exclude][:limit]
+            if picked:
+                self._round_robin[team_name] = picked[-1]
+            return picked
+        return heapq.nsmallest(
+            limit, pool, key=lambda uid: (self.users[uid].open_review_count, uid)
+        )
+
+    def _assign(self, pr: _PullRequest, user_id: str) -> None:
+        pr.reviewers.append(user_id)
+        self.reviews.setdefault(user_id, set()).add(pr.pull_request_id)
+        user = self.users[user_id]
+        user.open_review_count += 1
+        user.review_count += 1
+        user.reviews_version += 1
+
+    def _unassign(self, pr: _PullRequest, user_id: str) -> None:
+        pr.reviewers.remove(user_id)
+        self.reviews[user_id].discard(pr.pull_request_id)
+        user = self.users[user_id]
+        user.open_review_count -= 1
+        user.review_count -= 1
+        user.reviews_version += 1
+
+    def _record(self, event_type: str, pr_id: str, team_name, user_ids, data: dict) -> None:
+        event_id = next(self._event_ids)
+        self.events.append(
+            (
+                event_id,
+                ReviewEvent(
+                    event_id=event_id,
+                    type=event_type,
+                    pull_request_id=pr_id,
+                    team_name=team_name,
+                    user_ids=list(user_ids),
+                    data=data,
+                    created_at=datetime.now(timezone.utc),
+                ),
+            )
+        )
+
+    def _create(
+        self, item: CreatePRRequest, created_at: datetime
+    ) -> Tuple[str, Optional[PullRequest]]:
+        if item.pull_request_id in self.prs:
+            return "pr_exists", None
+        author = self.users.get(item.author_id)
+        if author is None:
+            return "author_not_found", None
+
+        pr = _PullRequest(
+            item.pull_request_id, item.pull_request_name, author.user_id, created_at
+        )
+        self.prs[pr.pull_request_id] = pr
+        self.by_status["OPEN"].add(pr.pull_request_id)
+        for user_id in self._select(author.team_name, {author.user_id}, 2):
+            self._assign(pr, user_id)
+        author.authored_pr_count += 1
+        if pr.reviewers:
+            self._record(
+                events.ASSIGNED,
+                pr.pull_request_id,
+                author.team_name,
+                pr.reviewers,
+                {"author_id": author.user_id},
+            )
+        return "ok", self._pr_dto(pr)
+
+    def _mark_merged(self, pr: _PullRequest, merged_at: datetime) -> None:
+        self.by_status[pr.status].discard(pr.pull_request_id)
+        pr.status = "MERGED"
+        pr.merged_at = merged_at
+        self.by_status["MERGED"].add(pr.pull_request_id)
+        for user_id in pr.reviewers:
+            user = self.users[user_id]
+            user.open_review_count -= 1
+            user.reviews_version += 1
+        self.users[pr.author_id].merged_pr_count += 1
+
+    @staticmethod
+    def _pr_dto(pr: _PullRequest) -> PullRequest:
+        return PullRequest(
+            pull_request_id=pr.pull_request_id,
+            pull_request_name=pr.pull_request_name,
+            author_id=pr.author_id,
+            status=pr.status,
+            assigned_reviewers=list(pr.reviewers),
+            createdAt=pr.created_at,
+            mergedAt=pr.merged_at,
+        )
+
+    def _team_dto(self, team_name: str) -> Team:
+        return Team(
+            team_name=team_name,
+            members=[
+                TeamMember(user_id=u.user_id, username=u.username, is_active=u.is_active)
+                for u in (self.users[uid] for uid in sorted(self.members[team_name]))
+            ],
+        )
+
+    def _review_rows(
+        self, user_id, status, limit, cursor
+    ) -> Tuple[str, list, Optional[str]]:
+        after = None
+        if cursor is not None:
+            after = user_service.decode_review_cursor(cursor)
+            if after is None:
+                return "invalid_cursor", [], None
+        prs = (self.prs[pr_id] for pr_id in self.reviews.get(user_id, ()))
+        if status is not None:
+            prs = (pr for pr in prs if pr.status == status)
+        if after is not None:
+            prs = (pr for pr in prs if (pr.created_at, pr.pull_request_id) < after)
+        rows = sorted(prs, key=lambda pr: (pr.created_at, pr.pull_request_id), reverse=True)
+
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = user_service.encode_review_cursor(
+                rows[-1].created_at, rows[-1].pull_request_id
+            )
+        return "ok", rows, next_cursor
+
+    # --- команды --------------------------------------------------------------
+
+    @implements(team_service.create_team)
+    def create_team(self, team_data: Team) -> Optional[Team]:
+        if team_data.team_name in self.team_versions:
+            return None
+        self._add_team(team_data.team_name)
+        affected, _ = self._sync_teams([team_data])
+        self._bump_teams(affected | {team_data.team_name})
+        return self._team_dto(team_data.team_name)
+
+    @implements(team_service.import_teams)
+    def import_teams(self, teams: List[Team]) -> TeamImportResponse:
+        names = list(dict.fromkeys(t.team_name for t in teams))
+        created = [name for name in names if name not in self.team_versions]
+        for name in created:
+            self._add_team(name)
+        affected, upserted = self._sync_teams(teams)
+        self._bump_teams(affected | set(names))
+        created_set = set(created)
+        return TeamImportResponse(
+            teams_created=created,
+            teams_updated=[n for n in names if n not in created_set],
+            members_upserted=upserted,
+        )
+
+    @implements(team_service.update_members)
+    def update_members(
+        self, deltas: List[TeamMembersDelta], reassign_removed: bool = False
+    ) -> Tuple[str, Optional[TeamMembersPatchResponse]]:
+        if any(delta.team_name not in self.team_versions for delta in deltas):
+            return "team_not_found", None
+        current = {
+            user_id: (user.team_name, user.is_active)
+            for user_id, user in self.users.items()
+        }
+        changes = team_service.plan_member_changes(deltas, current)
+        if changes is None:
+            return "member_conflict", None
+
+        for user_id in changes.removed:
+            self._set_active(self.users[user_id], False)
+        for row in changes.updates:
+            user = self.users[row["user_id"]]
+            user.username = row.get("username", user.username)
+            if "is_active" in row:
+                self._set_active(user, row["is_active"])
+        affected = changes.changed_teams
+        for row in changes.upserts:
+            self._upsert_member(**row)
+
+        replaced, unreplaced = [], []
+        if reassign_removed:
+            replaced, unreplaced = self.reassign_open_reviews(changes.leaving)
+        for row in changes.moves:
+            affected.add(self._upsert_member(**row))
+        self._bump_teams(affected)
+        return "ok", changes.response(replaced, unreplaced)
+
+    @implements(team_service.get_team)
+    def get_team(self, team_name: str) -> Optional[Team]:
+        if team_name not in self.team_versions:
+            return None
+        return self._team_dto(team_name)
+
+    @implements(team_service.get_team_raw)
+    def get_team_raw(self, team_name: str) -> Optional[dict]:
+        team = self.get_team(team_name)
+        return team.model_dump() if team is not None else None
+
+    @implements(versions.team_version)
+    def team_version(self, team_name: str) -> Optional[int]:
+        return self.team_versions.get(team_name)
+
+    # --- пользователи -----------------------------------------------------------
+
+    @implements(versions.reviews_version)
+    def reviews_version(self, user_id: str) -> Optional[int]:
+        user = self.users.get(user_id)
+        return user.reviews_version if user is not None else None
+
+    @implements(user_service.set_user_active)
+    def set_user_active(self, user_id: str, is_active: bool) -> Optional[User]:
+        user = self.users.get(user_id)
+        if user is None:
+            return None
+        self._set_active(user, is_active)
+        self._bump_teams([user.team_name])
+        return User(
+            user_id=user.user_id,
+            username=user.username,
+            team_name=user.team_name,
+            is_active=user.is_active,
+        )
+
+    @implements(user_service.deactivate_users)
+    def deactivate_users(self, user_ids: List[str]) -> DeactivateBatchResponse:
+        user_ids = list(dict.fromkeys(user_ids))
+        found = [uid for uid in user_ids if uid in self.users]
+        for uid in found:
+            self._set_active(self.users[uid], False)
+        replaced, unreplaced = self.reassign_open_reviews(found)
+        self._bump_teams(self.users[uid].team_name for uid in found)
+        return DeactivateBatchResponse(
+            deactivated=found,
+            not_found=[uid for uid in user_ids if uid not in self.users],
+            replaced=replaced,
+            unreplaced=unreplaced,
+        )
+
+    @implements(user_service.get_user_reviews)
+    def get_user_reviews(
+        self, user_id, status=None, limit=None, cursor=None, include_archived=False
+    ) -> Tuple[str, List[PullRequestShort], Optional[str]]:
+        # архива в памяти нет: include_archived ничего не меняет
+        status_code, rows, next_cursor = self._review_rows(user_id, status, limit, cursor)
+        return (
+            status_code,
+            [
+                PullRequestShort(
+                    pull_request_id=pr.pull_request_id,
+                    pull_request_name=pr.pull_request_name,
+                    author_id=pr.author_id,
+                    status=pr.status,
+                )
+                for pr in rows
+            ],
+            next_cursor,
+        )
+
+    @implements(user_service.get_user_reviews_raw)
+    def get_user_reviews_raw(
+        self, user_id, status=None, limit=None, cursor=None, include_archived=False
+    ) -> Tuple[str, Optional[dict]]:
+        status_code, prs, next_cursor = self.get_user_reviews(
+            user_id, status, limit, cursor
+        )
+        if status_code != "ok":
+            return status_code, None
+        return "ok", {
+            "user_id": user_id,
+            "pull_requests": [pr.model_dump() for pr in prs],
+            "next_cursor": next_cursor,
+        }
+
+    # --- PR --------------------------------------------------------------------
+
+    @implements(pr_service.create_pr)
+    def create_pr(
+        self, pr_id: str, name: str, author_id: str
+    ) -> Tuple[str, Optional[PullRequest]]:
+        item = CreatePRRequest(
+            pull_request_id=pr_id, pull_request_name=name, author_id=author_id
+        )
+        return self._create(item, datetime.now(timezone.utc))
+
+    @implements(pr_service.create_prs_batch)
+    def create_prs_batch(
+        self, items: List[CreatePRRequest]
+    ) -> List[Tuple[str, Optional[PullRequest]]]:
+        created_at = datetime.now(timezone.utc)
+        return [self._create(item, created_at) for item in items]
+
+    @implements(pr_import.import_prs)
+    def import_prs(self, records: List[ImportPRRecord]) -> List[str]:
+        outcomes = []
+        for record in records:
+            if record.pull_request_id in self.prs:
+                outcomes.append("pr_exists")
+                continue
+            author = self.users.get(record.author_id)
+            if author is None:
+                outcomes.append("author_not_found")
+                continue
+            if any(user_id not in self.users for user_id in record.assigned_reviewers):
+                outcomes.append("reviewer_not_found")
+                continue
+            pr = _PullRequest(
+                record.pull_request_id,
+                record.pull_request_name,
+                author.user_id,
+                record.createdAt,
+            )
+            self.prs[pr.pull_request_id] = pr
+            self.by_status["OPEN"].add(pr.pull_request_id)
+            for user_id in record.assigned_reviewers:
+                self._assign(pr, user_id)
+            author.authored_pr_count += 1
+            if record.status == "MERGED":
+                self._mark_merged(pr, record.mergedAt)
+            outcomes.append("ok")
+        return outcomes
+
+    @implements(pr_service.get_pr_by_id)
+    def get_pr_by_id(self, pr_id: str) -> Optional[PullRequest]:
+        pr = self.prs.get(pr_id)
+        return self._pr_dto(pr) if pr is not None else None
+
+    @implements(pr_service.merge_pr)
+    def merge_pr(self, pr_id: str) -> Tuple[str, Optional[PullRequest]]:
+        pr = self.prs.get(pr_id)
+        if pr is None:
+            return "not_found", None
+        if pr.status != "MERGED":
+            self._mark_merged(pr, datetime.now(timezone.utc))
+            author = self.users[pr.author_id]
+            self._record(
+                events.MERGED,
+                pr_id,
+                author.team_name,
+                [*pr.reviewers, author.user_id],
+                {"author_id": author.user_id, "reviewers": list(pr.reviewers)},
+            )
+        return "ok", self._pr_dto(pr)
+
+    @implements(pr_service.reassign_reviewer)
+    def reassign_reviewer(
+        self, pr_id: str, old_user_id: str
+    ) -> Tuple[str, Optional[PullRequest], Optional[str]]:
+        pr = self.prs.get(pr_id)
+        if pr is None:
+            return "pr_not_found", None, None
+        old_user = self.users.get(old_user_id)
+        if old_user is None:
+            return "user_not_found", None, None
+        if pr.status == "MERGED":
+            return "merged", None, None
+        if old_user_id not in pr.reviewers:
+            return "not_assigned", None, None
+
+        picked = self._select(
+            old_user.team_name, {*pr.reviewers, old_user_id, pr.author_id}, 1
+        )
+        if not picked:
+            return "no_candidate", None, None
+        new_user_id = picked[0]
+        self._unassign(pr, old_user_id)
+        self._assign(pr, new_user_id)
+        self._record(
+            events.REASSIGNED,
+            pr_id,
+            old_user.team_name,
+            [old_user_id, new_user_id],
+            {"old_user_id": old_user_id, "new_user_id": new_user_id},
+        )
+        return "ok", self._pr_dto(pr), new_user_id
+
+    @implements(pr_service.reassign_open_reviews)
+    def reassign_open_reviews(
+        self, user_ids: List[str]
+    ) -> Tuple[List[ReviewerReplacement], List[UnreplacedAssignment]]:
+        assignments = sorted(
+            (pr_id, user_id)
+            for user_id in user_ids
+            for pr_id in self.reviews.get(user_id, ())
+            if pr_id in self.by_status["OPEN"]
+        )
+        replaced: List[ReviewerReplacement] = []
+        unreplaced: List[UnreplacedAssignment] = []
+        for pr_id, user_id in assignments:
+            pr = self.prs[pr_id]
+            team_name = self.users[user_id].team_name
+            picked = self._select(
+                team_name, {*user_ids, *pr.reviewers, pr.author_id}, 1
+            )
+            if not picked:
+                unreplaced.append(
+                    UnreplacedAssignment(pull_request_id=pr_id, user_id=user_id)
+                )
+                continue
+            self._unassign(pr, user_id)
+            self._assign(pr, picked[0])
+            replaced.append(
+                ReviewerReplacement(
+                    pull_request_id=pr_id, old_user_id=user_id, new_user_id=picked[0]
+                )
+            )
+            self._record(
+                events.REASSIGNED,
+                pr_id,
+                team_name,
+                [user_id, picked[0]],
+                {"old_user_id": user_id, "new_user_id": picked[0]},
+            )
+        return replaced, unreplaced
+
+    # --- статистика --------------------------------------------------------------
+
+    @implements(stats_service.get_user_stats)
+    def get_user_stats(self, user_id: str) -> Optional[UserStats]:
+        user = self.users.get(user_id)
+        if user is None:
+            return None
+        return UserStats(
+            user_id=user.user_id,
+            team_name=user.team_name,
+            open_reviews=user.open_review_count,
+            total_reviews=user.review_count,
+            authored_prs=user.authored_pr_count,
+            merged_prs=user.merged_pr_count,
+        )
+
+    @implements(stats_service.get_team_stats)
+    def get_team_stats(self, team_name: str) -> Optional[TeamStats]:
+        if team_name not in self.team_versions:
+            return None
+        users = [self.users[uid] for uid in self.members[team_name]]
+        return TeamStats(
+            team_name=team_name,
+            open_reviews=sum(u.open_review_count for u in users),
+            total_reviews=sum(u.review_count for u in users),
+            authored_prs=sum(u.authored_pr_count for u in users),
+            merged_prs=sum(u.merged_pr_count for u in users),
+        )
+
+    # --- выгрузка --------------------------------------------------------------
+
+    @implements(export.read_page)
+    def export_page(
+        self,
+        status: Optional[str],
+        created_from: Optional[datetime],
+        created_to: Optional[datetime],
+        include_archived: bool,
+        after: Optional[export.Position],
+        limit: int,
+    ) -> List[tuple]:
+        # архива в памяти нет: include_archived ничего не добавляет
+        prs = self.prs.values()
+        if status is not None:
+            prs = (self.prs[pr_id] for pr_id in self.by_status[status])
+        if created_from is not None:
+            prs = (pr for pr in prs if pr.created_at >= created_from)
+        if created_to is not None:
+            prs = (pr for pr in prs if pr.created_at < created_to)
+        if after is not None:
+            prs = (pr for pr in prs if (pr.created_at, pr.pull_request_id) > after)
+        page = heapq.nsmallest(
+            limit, prs, key=lambda pr: (pr.created_at, pr.pull_request_id)
+        )
+        return [
+            (
+                pr.pull_request_id,
+                pr.pull_request_name,
+                pr.author_id,
+                pr.status,
+                sorted(pr.reviewers),
+                pr.created_at,
+                pr.merged_at,
+            )
+            for pr in page
+        ]
+
+    # --- события -------------------------------------------------------------------
+
+    @implements(events.horizon)
+    def horizon(self) -> events.Position:
+        return (0, self.events[-1][0] if self.events else 0)
+
+    @implements(events.position_of)
+    def position_of(self, event_id: int) -> Optional[events.Position]:
+        if not self.events or not self.events[0][0] <= event_id <= self.events[-1][0]:
+            return None
+        return (0, event_id)
+
+    @implements(events.read_after)
+    def read_after(
+        self,
+        position: events.Position,
+        user_id: Optional[str] = None,
+        team_name: Optional[str] = None,
+        limit: int = 500,
+    ) -> List[Tuple[events.Position, ReviewEvent]]:
+        # event_id идут подряд: начало хвоста вычисляется без поиска
+        start = max(position[1] - self.events[0][0] + 1, 0) if self.events else 0
+        result = []
+        for event_id, event in itertools.islice(self.events, start, None):
+            if user_id is not None and user_id not in event.user_ids:
+                continue
+            if team_name is not None and team_name != event.team_name:
+                continue
+            result.append(((0, event_id), event))
+            if len(result) >= limit:
+                break
+        return result
+
+    # --- Idempotency-Key ---------------------------------------------------------------
+
+    @implements(idempotency_keys.reserve)
+    def reserve(
+        self, endpoint: str, key: str, request_hash: str
+    ) -> Tuple[str, Optional[Tuple[int, Optional[str], bytes]]]:
+        now = time.monotonic()
+        entry = self.idempotency.get((endpoint, key))
+        if (
+            entry is None
+            or entry[4] < now - idempotency_keys.IDEMPOTENCY_TTL
+            or (entry[1] is None and entry[4] < now - idempotency_keys.IDEMPOTENCY_LEASE)
+        ):
+            self.idempotency[(endpoint, key)] = [request_hash, None, None, None, now]
+            return "reserved", None
+        if entry[0] != request_hash:
+            return "mismatch", None
+        if entry[1] is None:
+            return "in_progress", None
+        return "replay", (entry[1], entry[2], entry[3])
+
+    @implements(idempotency_keys.complete)
+    def complete(
+        self,
+        endpoint: str,
+        key: str,
+        request_hash: str,
+        status_code: int,
+        content_type: Optional[str],
+        body: bytes,
+    ) -> None:
+        entry = self.idempotency.get((endpoint, key))
+        if entry is not None and entry[0] == request_hash and entry[1] is None:
+            entry[1:4] = [status_code, content_type, body]
+
+    @implements(idempotency_keys.release)
+    def release(self, endpoint: str, key: str, request_hash: str) -> None:
+        entry = self.idempotency.get((endpoint, key))
+        if entry is not None and entry[0] == request_hash and entry[1] is None:
+            del self.idempotency[(endpoint, key)]
+
+
+class MemoryRunner:
+    """
+    Аналог DbRunner: fn(db, ...) выполняется её in-memory реализацией.
+    Покрытие STORAGE_INTERFACE проверено при создании store.
+    """
+
+    def __init__(self, store: MemoryStore) -> None:
+        self.store = store
+
+    async def __call__(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return IMPLEMENTATIONS[fn](self.store, *args, **kwargs)
+
+
+memory_store = MemoryStore()
@@ -0,0 +1,248 @@
+"""
+Загрузка исторических PR при онбординге организации: ревьюверы, статус и время
+берутся из записей как есть, без выбора ревьюверов и без событий в outbox.
+
+Пачка записей копируется COPY во временные таблицы, проверяется одним UPDATE
+и переносится в pull_requests / pull_request_reviewers INSERT ... SELECT.
+Каждая пачка — отдельная транзакция; повторная загрузка того же файла
+безопасна: уже загруженные PR получают PR_EXISTS.
+"""
+
+import os
+from typing import List, Optional, Tuple
+
+import psycopg
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models import ImportPRRecord
+from app.services import stats_service
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+# сколько ошибок по строкам возвращать в ответе; failed считает все
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+
+_ERRORS = {
+    "pr_exists": {"code": "PR_EXISTS", "message": "PR id already exists"},
+    "author_not_found": {"code": "NOT_FOUND", "message": "author not found"},
+    "reviewer_not_found": {"code": "NOT_FOUND", "message": "reviewer not found"},
+}
+
+_CREATE_STAGING = (
+    """
+    CREATE TEMP TABLE import_prs (
+        pos INTEGER PRIMARY KEY,
+        pull_request_id TEXT NOT NULL,
+        pull_request_name TEXT NOT NULL,
+        author_id TEXT NOT NULL,
+        status TEXT NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL,
+        merged_at TIMESTAMPTZ,
+        outcome TEXT
+    ) ON COMMIT DROP
+    """,
+    """
+    CREATE TEMP TABLE import_reviewers (
+        pos INTEGER NOT NULL,
+        reviewer_id TEXT NOT NULL
+    ) ON COMMIT DROP
+    """,
+)
+
+_COPY_PRS = (
+    "COPY import_prs (pos, pull_request_id, pull_request_name, author_id, status,"
+    " created_at, merged_at) FROM STDIN"
+)
+_COPY_REVIEWERS = "COPY import_reviewers (pos, reviewer_id) FROM STDIN"
+
+_CHECK_SQL = """
+UPDATE import_prs s
+SET outcome = CASE
+    WHEN EXISTS (SELECT 1 FROM pull_requests p WHERE p.pull_request_id = s.pull_request_id)
+      OR EXISTS (
+          SELECT 1 FROM pull_requests_archive a WHERE a.pull_request_id = s.pull_request_id
+      )
+        THEN 'pr_exists'
+    WHEN NOT EXISTS (SELECT 1 FROM users u WHERE u.user_id = s.author_id)
+        THEN 'author_not_found'
+    WHEN EXISTS (
+        SELECT 1
+        FROM import_reviewers r
+        WHERE r.pos = s.pos
+          AND NOT EXISTS (SELECT 1 FROM users u WHERE u.user_id = r.reviewer_id)
+    )
+        THEN 'reviewer_not_found'
+    ELSE 'ok'
+END
+"""
+
+# PR, созданный параллельно после проверки, не роняет пачку, а становится pr_exists
+_INSERT_PRS_SQL = """
+WITH inserted AS (
+    INSERT INTO pull_requests
+        (pull_request_id, pull_request_name, author_id, status, created_at, merged_at)
+    SELECT pull_request_id, pull_request_name, author_id, status, created_at, merged_at
+    FROM import_prs
+    WHERE outcome = 'ok'
+    ORDER BY pull_request_id
+    ON CONFLICT (pull_request_id) DO NOTHING
+    RETURNING pull_request_id
+)
+UPDATE import_prs s
+SET outcome = 'pr_exists'
+WHERE s.outcome = 'ok'
+  AND s.pull_request_id NOT IN (SELECT pull_request_id FROM inserted)
+"""
+
+_INSERT_REVIEWERS_SQL = """
+INSERT INTO pull_request_reviewers (pull_request_id, reviewer_id, created_at, status)
+SELECT s.pull_request_id, r.reviewer_id, s.created_at, s.status
+FROM import_reviewers r
+JOIN import_prs s ON s.pos = r.pos
+WHERE s.outcome = 'ok'
+"""
+
+
+def _copy(db: Session, statement: str, rows: List[tuple]) -> None:
+    """
+    COPY через соединение сессии, в её транзакции. В async-режиме функция
+    выполняется в run_sync, драйвер асинхронный, и await делается через
+    run_async адаптера в том же greenlet.
+    """
+    connection = db.connection().connection
+    driver = connection.driver_connection
+    if isinstance(driver, psycopg.AsyncConnection):
+
+        async def copy_async(conn: psycopg.AsyncConnection) -> None:
+            async with conn.cursor() as cursor:
+                async with cursor.copy(statement) as copy:
+                    for row in rows:
+                        await copy.write_row(row)
+
+        connection.dbapi_connection.run_async(copy_async)
+        return
+
+    with driver.cursor() as cursor:
+        with cursor.copy(statement) as copy:
+            for row in rows:
+                copy.write_row(row)
+
+
+def import_prs(db: Session, records: List[ImportPRRecord]) -> List[str]:
+    """
+    Загружает пачку записей одной транзакцией. Возвращает статус по каждой
+    записи в порядке records: "ok", "pr_exists" (в том числе повтор id внутри
+    пачки), "author_not_found", "reviewer_not_found". Счётчики статистики
+    и reviews_version обновляются так же, как при create/merge.
+    """
+    if not records:
+        return []
+
+    outcomes: List[Optional[str]] = [None] * len(records)
+    staged: List[int] = []
+    seen = set()
+    for pos, record in enumerate(records):
+        if record.pull_request_id in seen:
+            outcomes[pos] = "pr_exists"
+            continue
+        seen.add(record.pull_request_id)
+        staged.append(pos)
+
+    for statement in _CREATE_STAGING:
+        db.execute(text(statement))
+    _copy(
+        db,
+        _COPY_PRS,
+        [
+            (
+                pos,
+                records[pos].pull_request_id,
+                records[pos].pull_request_name,
+                records[pos].author_id,
+                records[pos].status,
+                records[pos].createdAt,
+                records[pos].mergedAt,
+            )
+            for pos in staged
+        ],
+    )
+    _copy(
+        db,
+        _COPY_REVIEWERS,
+        [
+            (pos, reviewer_id)
+            for pos in staged
+            for reviewer_id in records[pos].assigned_reviewers
+        ],
+    )
+    db.execute(text(_CHECK_SQL))
+    db.execute(text(_INSERT_PRS_SQL))
+    db.execute(text(_INSERT_REVIEWERS_SQL))
+    for pos, outcome in db.execute(text("SELECT pos, outcome FROM import_prs")):
+        outcomes[pos] = outcome
+
+    delta = stats_service.StatsDelta()
+    for record, outcome in zip(records, outcomes):
+        if outcome != "ok":
+            continue
+        delta.pr_authored(record.author_id)
+        delta.reviews_assigned(record.assigned_reviewers)
+        if record.status == "MERGED":
+            delta.pr_merged(record.author_id)
+            delta.reviews_closed(record.assigned_reviewers)
+    stats_service.apply(db, delta)
+    db.commit()
+    return outcomes
+
+
+def parse_lines(
+    lines: List[Tuple[int, bytes]],
+) -> Tuple[List[Tuple[int, ImportPRRecord]], List[Tuple[int, str]]]:
+    """Строки NDJSON (номер, байты) -> валидные записи и ошибки (номер, сообщение)."""
+    records = []
+    invalid = []
+    for number, line in lines:
+        try:
+            records.append((number, ImportPRRecord.model_validate_json(line)))
+        except ValidationError as exc:
+            error = exc.errors(include_url=False)[0]
+            location = ".".join(str(part) for part in error["loc"])
+            message = error["msg"]
+            invalid.append((number, f"{location}: {message}" if location else message))
+    return records, invalid
+
+
+class ImportReport:
+    """Итог загрузки: число загруженных и отклонённых строк, первые ошибки."""
+
+    def __init__(self) -> None:
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    def _reject(self, line: int, pr_id: Optional[str], error: dict) -> None:
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "pull_request_id": pr_id, "error": error})
+
+    def add_chunk(
+        self,
+        records: List[Tuple[int, ImportPRRecord]],
+        outcomes: List[str],
+        invalid: List[Tuple[int, str]],
+    ) -> None:
+        rejected = [
+            (line, None, {"code": "INVALID_ROW", "message": message})
+            for line, message in invalid
+        ]
+        for (line, record), outcome in zip(records, outcomes):
+            if outcome == "ok":
+                self.imported += 1
+            else:
+                rejected.append((line, record.pull_request_id, _ERRORS[outcome]))
+        for line, pr_id, error in sorted(rejected, key=lambda item: item[0]):
+            self._reject(line, pr_id, error)
+
+    def as_dict(self) -> dict:
+        return {"imported": self.imported, "failed": self.failed, "errors": self.errors}
@@ -1,17 +1,39 @@
-from typing import Optional, Tuple, List
+from typing import Dict, List, Optional, Set, Tuple
 from datetime import datetime, timezone
 
-from sqlalchemy import func
+from sqlalchemy import (
+    DateTime,
+    Text,
+    column,
+    insert,
+    literal,
+    select,
+    text,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 from app.db_models import (
+    PullRequestArchiveModel,
     PullRequestModel,
+    PullRequestReviewerArchiveModel,
     PullRequestReviewerModel,
     UserModel,
 )
-from app.models import PullRequest
+from app.models import (
+    CreatePRRequest,
+    PullRequest,
+    ReviewerReplacement,
+    UnreplacedAssignment,
+)
+from app import profiling
+from app.services import events, reviewer_selection, stats_service
+from app.services.roster_cache import roster_cache
 
 
+@profiling.timed_dto
 def _pr_to_dto(pr: PullRequestModel, reviewers: List[str]) -> PullRequest:
     return PullRequest(
         pull_request_id=pr.pull_request_id,
@@ -33,6 +55,218 @@ def _get_reviewers_ids(db: Session, pr_id: str) -> List[str]:
     return [r[0] for r in rows]
 
 
+def _get_archived_pr(db: Session, pr_id: str) -> Optional[PullRequest]:
+    pr = db.query(PullRequestArchiveModel).filter_by(pull_request_id=pr_id).first()
+    if not pr:
+        return None
+    rows = (
+        db.query(PullRequestReviewerArchiveModel.reviewer_id)
+        .filter(PullRequestReviewerArchiveModel.pull_request_id == pr_id)
+        .all()
+    )
+    return _pr_to_dto(pr, [r[0] for r in rows])
+
+
+# Выбор ревьюверов может опираться на кэш составов, который в других воркерах
+# устаревает до ROSTER_CACHE_TTL. Поэтому запись перепроверяет, что выбранный
+# всё ещё активен и состоит в нужной команде; не прошедших вызывающий
+# выбирает заново по свежему составу.
+
+
+def _insert_reviewers(
+    db: Session, rows: List[Tuple[str, str, str]], created_at: datetime
+) -> Set[Tuple[str, str]]:
+    """
+    rows: (pr_id, reviewer_id, team_name).
+    Возвращает вставленные пары (pr_id, reviewer_id).
+    """
+    if not rows:
+        return set()
+    v = values(
+        column("pr_id", Text),
+        column("reviewer_id", Text),
+        column("team_name", Text),
+        name="v",
+    ).data(rows)
+    candidates = (
+        select(
+            v.c.pr_id,
+            v.c.reviewer_id,
+            literal(created_at, DateTime(timezone=True)),
+            literal("OPEN"),
+        )
+        .join(UserModel, UserModel.user_id == v.c.reviewer_id)
+        .where(UserModel.is_active == True, UserModel.team_name == v.c.team_name)
+    )
+    stmt = (
+        insert(PullRequestReviewerModel)
+        .from_select(
+            ["pull_request_id", "reviewer_id", "created_at", "status"], candidates
+        )
+        .returning(
+            PullRequestReviewerModel.pull_request_id,
+            PullRequestReviewerModel.reviewer_id,
+        )
+    )
+    return {(pr_id, reviewer_id) for pr_id, reviewer_id in db.execute(stmt)}
+
+
+def _replace_reviewers(
+    db: Session, rows: List[Tuple[str, str, str, str]]
+) -> Dict[Tuple[str, str], str]:
+    """
+    rows: (pr_id, old_id, new_id, team_name).
+    Возвращает {(pr_id, old_id): new_id} для выполненных замен.
+    """
+    if not rows:
+        return {}
+    v = values(
+        column("pr_id", Text),
+        column("old_id", Text),
+        column("new_id", Text),
+        column("team_name", Text),
+        name="v",
+    ).data(rows)
+    stmt = (
+        update(PullRequestReviewerModel)
+        .where(
+            PullRequestReviewerModel.pull_request_id == v.c.pr_id,
+            PullRequestReviewerModel.reviewer_id == v.c.old_id,
+            UserModel.user_id == v.c.new_id,
+            UserModel.is_active == True,
+            UserModel.team_name == v.c.team_name,
+        )
+        .values(reviewer_id=v.c.new_id)
+        .returning(PullRequestReviewerModel.pull_request_id, v.c.old_id, v.c.new_id)
+        .execution_options(synchronize_session=False)
+    )
+    return {(pr_id, old_id): new_id for pr_id, old_id, new_id in db.execute(stmt)}
+
+
+# Один round trip: проверка, автор, кандидаты, вставки, счётчики статистики
+# и событие назначения в outbox.
+# {candidates_order} подставляет create_pr.
+_CREATE_PR_SQL = """
+WITH existing AS (
+    SELECT 1 FROM pull_requests WHERE pull_request_id = :pr_id
+    UNION ALL
+    SELECT 1 FROM pull_requests_archive WHERE pull_request_id = :pr_id
+),
+author AS (
+    SELECT user_id, team_name FROM users WHERE user_id = :author_id
+),
+new_pr AS (
+    INSERT INTO pull_requests
+        (pull_request_id, pull_request_name, author_id, status, created_at)
+    SELECT :pr_id, :name, a.user_id, 'OPEN', now()
+    FROM author a
+    WHERE NOT EXISTS (SELECT 1 FROM existing)
+    ON CONFLICT (pull_request_id) DO NOTHING
+    RETURNING *
+),
+candidates AS (
+    SELECT u.user_id
+    FROM users u
+    JOIN author a ON u.team_name = a.team_name
+    WHERE EXISTS (SELECT 1 FROM new_pr)
+      AND u.is_active
+      AND u.user_id <> a.user_id
+    ORDER BY {candidates_order}
+    LIMIT :limit
+),
+new_reviewers AS (
+    INSERT INTO pull_request_reviewers (pull_request_id, reviewer_id, created_at, status)
+    SELECT p.pull_request_id, c.user_id, p.created_at, p.status
+    FROM candidates c
+    CROSS JOIN new_pr p
+    RETURNING reviewer_id
+),
+-- счётчики пользователей обновляются по одной строке в порядке user_id:
+-- каждый следующий UPDATE ждёт предыдущий через скалярный подзапрос.
+-- Отдельная блокировка FOR NO KEY UPDATE в этом же операторе не годится:
+-- UPDATE по снимку начала оператора снова встаёт в очередь за устаревшей
+-- версией уже заблокированной строки и получает deadlock с её ожидающими
+deltas AS (
+    SELECT user_id, sum(reviews) AS reviews, sum(authored) AS authored,
+           row_number() OVER (ORDER BY user_id) AS n
+    FROM (
+        SELECT reviewer_id AS user_id, 1 AS reviews, 0 AS authored FROM new_reviewers
+        UNION ALL
+        SELECT author_id, 0, 1 FROM new_pr
+    ) d
+    GROUP BY user_id
+),
+user_counter_1 AS (
+    UPDATE users u
+    SET open_review_count = u.open_review_count + d.reviews,
+        review_count = u.review_count + d.reviews,
+        authored_pr_count = u.authored_pr_count + d.authored,
+        reviews_version = u.reviews_version + d.reviews
+    FROM deltas d
+    WHERE u.user_id = d.user_id AND d.n = 1
+    RETURNING u.user_id
+),
+user_counter_2 AS (
+    UPDATE users u
+    SET open_review_count = u.open_review_count + d.reviews,
+        review_count = u.review_count + d.reviews,
+        authored_pr_count = u.authored_pr_count + d.authored,
+        reviews_version = u.reviews_version + d.reviews
+    FROM deltas d
+    WHERE u.user_id = d.user_id AND d.n = 2
+      AND (SELECT count(*) FROM user_counter_1) >= 0
+    RETURNING u.user_id
+),
+-- автор и до :limit ревьюверов: при limit 2 строк не больше трёх
+user_counter_3 AS (
+    UPDATE users u
+    SET open_review_count = u.open_review_count + d.reviews,
+        review_count = u.review_count + d.reviews,
+        authored_pr_count = u.authored_pr_count + d.authored,
+        reviews_version = u.reviews_version + d.reviews
+    FROM deltas d
+    WHERE u.user_id = d.user_id AND d.n >= 3
+      AND (SELECT count(*) FROM user_counter_2) >= 0
+    RETURNING u.user_id
+),
+team_counters AS (
+    INSERT INTO team_stats AS t
+        (team_name, open_review_count, review_count, authored_pr_count, merged_pr_count)
+    SELECT a.team_name, r.n, r.n, 1, 0
+    FROM author a
+    CROSS JOIN (SELECT count(*) AS n FROM new_reviewers) r
+    -- сначала users, потом team_stats: тот же порядок, что в stats_service.apply
+    WHERE EXISTS (SELECT 1 FROM new_pr)
+      AND (SELECT count(*) FROM user_counter_3) >= 0
+    ON CONFLICT (team_name) DO UPDATE
+    SET open_review_count = t.open_review_count + excluded.open_review_count,
+        review_count = t.review_count + excluded.review_count,
+        authored_pr_count = t.authored_pr_count + excluded.authored_pr_count
+    RETURNING t.team_name
+),
+review_event AS (
+    INSERT INTO review_events (event_type, pull_request_id, team_name, user_ids, data)
+    SELECT 'assigned', :pr_id, a.team_name, r.ids, jsonb_build_object('author_id', a.user_id)
+    FROM author a
+    CROSS JOIN (SELECT array_agg(reviewer_id) AS ids FROM new_reviewers) r
+    WHERE r.ids IS NOT NULL
+    RETURNING event_id
+)
+SELECT
+    EXISTS (SELECT 1 FROM existing) AS pr_exists,
+    EXISTS (SELECT 1 FROM author) AS author_found,
+    p.pull_request_id,
+    p.pull_request_name,
+    p.author_id,
+    p.status,
+    p.created_at,
+    p.merged_at,
+    ARRAY(SELECT reviewer_id FROM new_reviewers) AS reviewers
+FROM (SELECT 1) one
+LEFT JOIN new_pr p ON true
+"""
+
+
 def create_pr(
     db: Session, pr_id: str, name: str, author_id: str
 ) -> Tuple[str, Optional[PullRequest]]:
@@ -44,80 +278,276 @@ def create_pr(
         - "author_not_found"
         - "team_not_found"
     """
-    existing = (
-        db.query(PullRequestModel).filter_by(pull_request_id=pr_id).first()
-    )
-    if existing:
-        return "pr_exists", None
+    selector = reviewer_selection.get_selector()
+    params = {"pr_id": pr_id, "name": name, "author_id": author_id, "limit": 2}
+    author_team = None
+    if selector.sql_order is not None:
+        sql = _CREATE_PR_SQL.format(candidates_order=selector.sql_order)
+    else:
+        # стратегия работает по закэшированному составу команды, а кандидаты
+        # в SQL берутся из актуальной команды автора среди активных: выбранные
+        # идут первыми, ушедшие из команды или неактивные отбрасываются,
+        # и место добирают наименее загруженные
+        author_team = roster_cache.user_team(db, author_id)
+        params["preselected"] = (
+            selector.select(db, author_team, exclude={author_id}, limit=2)
+            if author_team
+            else []
+        )
+        sql = _CREATE_PR_SQL.format(
+            candidates_order="array_position(CAST(:preselected AS text[]), u.user_id)"
+            " NULLS LAST, u.open_review_count, u.user_id",
+        )
+
+    if not db.in_transaction():
+        # без BEGIN/COMMIT: оператор атомарен сам по себе
+        db.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+    row = db.execute(text(sql), params).one()
+    db.commit()
 
-    author = db.query(UserModel).filter_by(user_id=author_id).first()
-    if not author:
+    if row.pr_exists:
+        return "pr_exists", None
+    if not row.author_found:
         return "author_not_found", None
+    if row.pull_request_id is None:
+        # параллельная вставка того же id успела раньше
+        return "pr_exists", None
+    if author_team is not None and set(row.reviewers) != set(params["preselected"]):
+        # выбор сделан по устаревшему кэшу (другой воркер менял состав)
+        roster_cache.invalidate_teams([author_team])
+        roster_cache.invalidate_users([author_id])
+
+    return "ok", PullRequest(
+        pull_request_id=row.pull_request_id,
+        pull_request_name=row.pull_request_name,
+        author_id=row.author_id,
+        status=row.status,
+        assigned_reviewers=list(row.reviewers),
+        createdAt=row.created_at,
+        mergedAt=row.merged_at,
+    )
 
-    if not author.team_name:
-        return "team_not_found", None
 
-    candidates_q = (
-        db.query(UserModel.user_id)
-        .filter(
-            UserModel.team_name == author.team_name,
-            UserModel.is_active == True,
-            UserModel.user_id != author_id,
-        )
-        .order_by(func.random())
-        .limit(2)
+def create_prs_batch(
+    db: Session, items: List[CreatePRRequest]
+) -> List[Tuple[str, Optional[PullRequest]]]:
+    """
+    Пакетный create_pr: статусы те же, порядок результатов совпадает с items.
+    Повтор pull_request_id внутри пакета даёт "pr_exists".
+    """
+    if not items:
+        return []
+
+    ids = {item.pull_request_id for item in items}
+    taken = {
+        row[0]
+        for model in (PullRequestModel, PullRequestArchiveModel)
+        for row in db.query(model.pull_request_id)
+        .filter(model.pull_request_id.in_(ids))
+        .all()
+    }
+    author_ids = {item.author_id for item in items}
+    author_teams = dict(
+        db.query(UserModel.user_id, UserModel.team_name)
+        .filter(UserModel.user_id.in_(author_ids))
+        .all()
     )
-    candidates = [row[0] for row in candidates_q.all()]
 
-    pr = PullRequestModel(
-        pull_request_id=pr_id,
-        pull_request_name=name,
-        author_id=author_id,
-        status="OPEN",
-        created_at=datetime.now(timezone.utc), 
+    results: List[Tuple[str, Optional[PullRequest]]] = []
+    accepted: List[Tuple[int, CreatePRRequest]] = []
+    for item in items:
+        if item.pull_request_id in taken:
+            results.append(("pr_exists", None))
+            continue
+        team_name = author_teams.get(item.author_id)
+        if team_name is None:
+            results.append(("author_not_found", None))
+            continue
+        if not team_name:
+            results.append(("team_not_found", None))
+            continue
+        taken.add(item.pull_request_id)
+        accepted.append((len(results), item))
+        results.append(("ok", None))
+
+    if not accepted:
+        return results
+
+    # проверка выше без блокировок: id, занятый параллельным create, вставка
+    # пропускает и возвращает только свои строки — как ON CONFLICT в create_pr
+    created_at = datetime.now(timezone.utc)
+    created = set(
+        db.execute(
+            pg_insert(PullRequestModel)
+            .values(
+                [
+                    {
+                        "pull_request_id": item.pull_request_id,
+                        "pull_request_name": item.pull_request_name,
+                        "author_id": item.author_id,
+                        "status": "OPEN",
+                        "created_at": created_at,
+                    }
+                    for _, item in accepted
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=[PullRequestModel.pull_request_id])
+            .returning(PullRequestModel.pull_request_id)
+        ).scalars()
+    )
+    for pos, item in accepted:
+        if item.pull_request_id not in created:
+            results[pos] = ("pr_exists", None)
+    accepted = [(pos, item) for pos, item in accepted if item.pull_request_id in created]
+    if not accepted:
+        return results
+
+    selector = reviewer_selection.get_selector()
+    teams = [author_teams[item.author_id] for _, item in accepted]
+    picks = selector.select_batch(
+        db,
+        [(team, {item.author_id}) for team, (_, item) in zip(teams, accepted)],
+        limit=2,
     )
-    db.add(pr)
-    db.flush()
 
-    for c in candidates:
-        db.add(
-            PullRequestReviewerModel(
-                pull_request_id=pr_id,
-                reviewer_id=c,
+    inserted = _insert_reviewers(
+        db,
+        [
+            (item.pull_request_id, reviewer_id, team)
+            for team, (_, item), reviewers in zip(teams, accepted, picks)
+            for reviewer_id in reviewers
+        ],
+        created_at,
+    )
+    assigned = [
+        [uid for uid in reviewers if (item.pull_request_id, uid) in inserted]
+        for (_, item), reviewers in zip(accepted, picks)
+    ]
+    stale = [i for i, reviewers in enumerate(picks) if len(assigned[i]) < len(reviewers)]
+    if stale:
+        # выбраны по устаревшему кэшу: недостающих добирает свежий состав
+        roster_cache.invalidate_teams({teams[i] for i in stale})
+        extra = {
+            i: selector.select(
+                db,
+                teams[i],
+                exclude={accepted[i][1].author_id, *picks[i]},
+                limit=2 - len(assigned[i]),
             )
+            for i in stale
+        }
+        inserted = _insert_reviewers(
+            db,
+            [
+                (accepted[i][1].pull_request_id, reviewer_id, teams[i])
+                for i in stale
+                for reviewer_id in extra[i]
+            ],
+            created_at,
         )
+        for i in stale:
+            pr_id = accepted[i][1].pull_request_id
+            assigned[i] += [uid for uid in extra[i] if (pr_id, uid) in inserted]
 
+    delta = stats_service.StatsDelta().reviews_assigned(
+        reviewer_id for reviewers in assigned for reviewer_id in reviewers
+    )
+    for _, item in accepted:
+        delta.pr_authored(item.author_id)
+    stats_service.apply(db, delta)
+    events.record_many(
+        db,
+        (
+            (
+                events.ASSIGNED,
+                item.pull_request_id,
+                author_teams[item.author_id],
+                reviewers,
+                {"author_id": item.author_id},
+            )
+            for (_, item), reviewers in zip(accepted, assigned)
+            if reviewers
+        ),
+    )
     db.commit()
-    db.refresh(pr)
 
-    reviewers = _get_reviewers_ids(db, pr_id)
-    return "ok", _pr_to_dto(pr, reviewers)
+    for (pos, item), reviewers in zip(accepted, assigned):
+        results[pos] = (
+            "ok",
+            PullRequest(
+                pull_request_id=item.pull_request_id,
+                pull_request_name=item.pull_request_name,
+                author_id=item.author_id,
+                status="OPEN",
+                assigned_reviewers=reviewers,
+                createdAt=created_at,
+            ),
+        )
+    return results
+
+
+def _lock_pr(db: Session, pr_id: str) -> Optional[PullRequestModel]:
+    """
+    PR под FOR NO KEY UPDATE до конца транзакции: merge и reassign одного PR
+    выполняются по очереди и видят результат предыдущего. Режим совместим
+    с KEY SHARE от FK при вставке ревьюверов.
+    """
+    return (
+        db.query(PullRequestModel)
+        .filter_by(pull_request_id=pr_id)
+        .with_for_update(key_share=True)
+        .first()
+    )
 
 
 def merge_pr(db: Session, pr_id: str) -> Tuple[str, Optional[PullRequest]]:
-    pr = db.query(PullRequestModel).filter_by(pull_request_id=pr_id).first()
+    pr = _lock_pr(db, pr_id)
     if not pr:
-        return "not_found", None
+        # merge идемпотентен и для PR, уже перенесённого в архив
+        archived = _get_archived_pr(db, pr_id)
+        return ("ok", archived) if archived else ("not_found", None)
+
+    reviewers = _get_reviewers_ids(db, pr_id)
 
     if pr.status != "MERGED":
         pr.status = "MERGED"
         pr.merged_at = datetime.now(timezone.utc)
+        (
+            db.query(PullRequestReviewerModel)
+            .filter(PullRequestReviewerModel.pull_request_id == pr_id)
+            .update({"status": "MERGED"}, synchronize_session=False)
+        )
+        stats_service.apply(
+            db,
+            stats_service.StatsDelta()
+            .reviews_closed(reviewers)
+            .pr_merged(pr.author_id),
+        )
+        events.record(
+            db,
+            events.MERGED,
+            pr_id,
+            roster_cache.user_team(db, pr.author_id),
+            [*reviewers, pr.author_id],
+            {"author_id": pr.author_id, "reviewers": reviewers},
+        )
         db.commit()
         db.refresh(pr)
 
-    reviewers = _get_reviewers_ids(db, pr_id)
     return "ok", _pr_to_dto(pr, reviewers)
 
 
 def reassign_reviewer(
     db: Session, pr_id: str, old_user_id: str
 ) -> Tuple[str, Optional[PullRequest], Optional[str]]:
-    pr = db.query(PullRequestModel).filter_by(pull_request_id=pr_id).first()
+    pr = _lock_pr(db, pr_id)
     if not pr:
+        if _get_archived_pr(db, pr_id):
+            return "merged", None, None
         return "pr_not_found", None, None
 
-    user = db.query(UserModel).filter_by(user_id=old_user_id).first()
-    if not user:
+    user_team = roster_cache.user_team(db, old_user_id)
+    if user_team is None:
         return "user_not_found", None, None
 
     if pr.status == "MERGED":
@@ -133,30 +563,37 @@ def reassign_reviewer(
     if old_user_id not in reviewer_ids:
         return "not_assigned", None, None
 
-    candidates_q = (
-        db.query(UserModel.user_id)
-        .filter(
-            UserModel.team_name == user.team_name,
-            UserModel.is_active == True,
-            UserModel.user_id != old_user_id,
-            ~UserModel.user_id.in_(reviewer_ids),
-        )
-        .order_by(func.random())
-        .limit(1)
-    )
-    row = candidates_q.first()
-    if not row:
+    selector = reviewer_selection.get_selector()
+    exclude = reviewer_ids | {old_user_id, pr.author_id}
+    new_user_id = None
+    for _ in range(2):
+        picked = selector.select(db, user_team, exclude=set(exclude), limit=1)
+        if not picked:
+            break
+        if _replace_reviewers(db, [(pr_id, old_user_id, picked[0], user_team)]):
+            new_user_id = picked[0]
+            break
+        # выбран по устаревшему кэшу: команда и состав перечитываются из базы
+        roster_cache.invalidate_teams([user_team])
+        roster_cache.invalidate_users([old_user_id])
+        user_team = roster_cache.user_team(db, old_user_id)
+        exclude.add(picked[0])
+    if new_user_id is None:
         return "no_candidate", None, None
 
-    new_user_id = row[0]
-
-    (
-        db.query(PullRequestReviewerModel)
-        .filter(
-            PullRequestReviewerModel.pull_request_id == pr_id,
-            PullRequestReviewerModel.reviewer_id == old_user_id,
-        )
-        .update({"reviewer_id": new_user_id})
+    stats_service.apply(
+        db,
+        stats_service.StatsDelta()
+        .reviews_unassigned([old_user_id])
+        .reviews_assigned([new_user_id]),
+    )
+    events.record(
+        db,
+        events.REASSIGNED,
+        pr_id,
+        user_team,
+        [old_user_id, new_user_id],
+        {"old_user_id": old_user_id, "new_user_id": new_user_id},
     )
 
     db.commit()
@@ -166,6 +603,136 @@ def reassign_reviewer(
     return "ok", _pr_to_dto(pr, reviewers), new_user_id
 
 
+def reassign_open_reviews(
+    db: Session, user_ids: List[str]
+) -> Tuple[List[ReviewerReplacement], List[UnreplacedAssignment]]:
+    """
+    Переназначает все OPEN-ревью пользователей user_ids одним проходом.
+    Кандидаты выбираются по тем же правилам, что в reassign_reviewer;
+    сами user_ids кандидатами не считаются. Коммит делает вызывающий.
+    """
+    if not user_ids:
+        return [], []
+
+    assignments = (
+        db.query(
+            PullRequestReviewerModel.pull_request_id,
+            PullRequestReviewerModel.reviewer_id,
+            UserModel.team_name,
+            PullRequestModel.author_id,
+        )
+        .join(
+            PullRequestModel,
+            PullRequestModel.pull_request_id
+            == PullRequestReviewerModel.pull_request_id,
+        )
+        .join(UserModel, UserModel.user_id == PullRequestReviewerModel.reviewer_id)
+        .filter(
+            PullRequestReviewerModel.reviewer_id.in_(user_ids),
+            PullRequestModel.status == "OPEN",
+        )
+        .order_by(
+            PullRequestReviewerModel.pull_request_id,
+            PullRequestReviewerModel.reviewer_id,
+        )
+        # те же блокировки PR, что у merge_pr/reassign_reviewer, в порядке id
+        .with_for_update(of=PullRequestModel, key_share=True)
+        .all()
+    )
+    if not assignments:
+        return [], []
+
+    pr_ids = {a.pull_request_id for a in assignments}
+    excludes: dict = {}
+    for pr_id, reviewer_id in (
+        db.query(
+            PullRequestReviewerModel.pull_request_id,
+            PullRequestReviewerModel.reviewer_id,
+        )
+        .filter(PullRequestReviewerModel.pull_request_id.in_(pr_ids))
+        .all()
+    ):
+        excludes.setdefault(pr_id, set(user_ids)).add(reviewer_id)
+    for a in assignments:
+        excludes[a.pull_request_id].add(a.author_id)
+
+    selector = reviewer_selection.get_selector()
+    picks = selector.select_batch(
+        db,
+        [(a.team_name, excludes[a.pull_request_id]) for a in assignments],
+        limit=1,
+    )
+    done = _replace_reviewers(
+        db,
+        [
+            (a.pull_request_id, a.reviewer_id, picked[0], a.team_name)
+            for a, picked in zip(assignments, picks)
+            if picked
+        ],
+    )
+    stale = [
+        a
+        for a, picked in zip(assignments, picks)
+        if picked and (a.pull_request_id, a.reviewer_id) not in done
+    ]
+    if stale:
+        # выбраны по устаревшему кэшу: второй выбор по свежему составу
+        roster_cache.invalidate_teams({a.team_name for a in stale})
+        retry = []
+        for a in stale:
+            picked = selector.select(
+                db, a.team_name, exclude=excludes[a.pull_request_id], limit=1
+            )
+            if picked:
+                excludes[a.pull_request_id].add(picked[0])
+                retry.append((a.pull_request_id, a.reviewer_id, picked[0], a.team_name))
+        done.update(_replace_reviewers(db, retry))
+
+    replaced: List[ReviewerReplacement] = []
+    unreplaced: List[UnreplacedAssignment] = []
+    replaced_teams: List[str] = []
+    for a in assignments:
+        new_user_id = done.get((a.pull_request_id, a.reviewer_id))
+        if new_user_id is not None:
+            replaced_teams.append(a.team_name)
+            replaced.append(
+                ReviewerReplacement(
+                    pull_request_id=a.pull_request_id,
+                    old_user_id=a.reviewer_id,
+                    new_user_id=new_user_id,
+                )
+            )
+        else:
+            unreplaced.append(
+                UnreplacedAssignment(
+                    pull_request_id=a.pull_request_id, user_id=a.reviewer_id
+                )
+            )
+
+    if replaced:
+        stats_service.apply(
+            db,
+            stats_service.StatsDelta()
+            .reviews_unassigned(r.old_user_id for r in replaced)
+            .reviews_assigned(r.new_user_id for r in replaced),
+        )
+        events.record_many(
+            db,
+            (
+                (
+                    events.REASSIGNED,
+                    r.pull_request_id,
+                    team_name,
+                    [r.old_user_id, r.new_user_id],
+                    {"old_user_id": r.old_user_id, "new_user_id": r.new_user_id},
+                )
+                for r, team_name in zip(replaced, replaced_teams)
+            ),
+        )
+
+    return replaced, unreplaced
+
+
 def get_pr_by_id(db: Session, pr_id: str) -> Optional[PullRequest]:
     pr = db.query(PullRequestModel).filter_by(pull_request_id=pr_id).first()
     if not pr:
@@ -0,0 +1,155 @@
+import bisect
+import heapq
+import os
+import random
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.db_models import UserModel
+from app.services.roster_cache import roster_cache
+
+REVIEWER_STRATEGY = os.getenv("REVIEWER_STRATEGY", "least_loaded")
+
+
+def _candidates_query(db: Session, team_name: str, exclude: Set[str]):
+    q = db.query(UserModel.user_id).filter(
+        UserModel.team_name == team_name,
+        UserModel.is_active == True,
+    )
+    if exclude:
+        q = q.filter(~UserModel.user_id.in_(exclude))
+    return q
+
+
+class ReviewerSelector(ABC):
+    """
+    Стратегия выбора ревьюверов среди активных участников команды.
+    select() возвращает не больше limit user_id, не входящих в exclude.
+    sql_order задан, если стратегию можно выполнить внутри SQL-запроса
+    (ORDER BY по таблице users с алиасом u).
+    """
+
+    name = "base"
+    sql_order: Optional[str] = None
+
+    @abstractmethod
+    def select(
+        self, db: Session, team_name: str, exclude: Set[str], limit: int
+    ) -> List[str]:
+        ...
+
+    def select_batch(
+        self, db: Session, requests: List[Tuple[str, Set[str]]], limit: int
+    ) -> List[List[str]]:
+        """
+        Выбор для нескольких запросов подряд. Выбранные user_id добавляются
+        в exclude запроса, поэтому общий exclude у нескольких запросов
+        одного PR не даёт назначить одного человека дважды.
+        """
+        result = []
+        for team, exclude in requests:
+            picked = self.select(db, team, exclude, limit)
+            exclude.update(picked)
+            result.append(picked)
+        return result
+
+
+class RandomSelector(ReviewerSelector):
+    name = "random"
+
+    def select(
+        self, db: Session, team_name: str, exclude: Set[str], limit: int
+    ) -> List[str]:
+        pool = [
+            uid
+            for uid in roster_cache.active_member_ids(db, team_name)
+            if uid not in exclude
+        ]
+        if len(pool) <= limit:
+            random.shuffle(pool)
+            return pool
+        return random.sample(pool, limit)
+
+
+class LeastLoadedSelector(ReviewerSelector):
+    name = "least_loaded"
+    sql_order = "u.open_review_count, u.user_id"
+
+    def select(
+        self, db: Session, team_name: str, exclude: Set[str], limit: int
+    ) -> List[str]:
+        # порядок совпадает с idx_users_team_load, сортировки нет
+        rows = (
+            _candidates_query(db, team_name, exclude)
+            .order_by(UserModel.open_review_count, UserModel.user_id)
+            .limit(limit)
+            .all()
+        )
+        return [row[0] for row in rows]
+
+    def select_batch(
+        self, db: Session, requests: List[Tuple[str, Set[str]]], limit: int
+    ) -> List[List[str]]:
+        teams = {team for team, _ in requests}
+        if not teams:
+            return []
+        rows = (
+            db.query(UserModel.team_name, UserModel.user_id, UserModel.open_review_count)
+            .filter(UserModel.team_name.in_(teams), UserModel.is_active == True)
+            .all()
+        )
+        loads: Dict[str, Dict[str, int]] = {}
+        for team_name, user_id, count in rows:
+            loads.setdefault(team_name, {})[user_id] = count
+
+        # нагрузка учитывает назначения, сделанные ранее в этом же пакете
+        result = []
+        for team, exclude in requests:
+            pool = loads.get(team, {})
+            picked = heapq.nsmallest(
+                limit,
+                (uid for uid in pool if uid not in exclude),
+                key=lambda uid: (pool[uid], uid),
+            )
+            for uid in picked:
+                pool[uid] += 1
+            exclude.update(picked)
+            result.append(picked)
+        return result
+
+
+class RoundRobinSelector(ReviewerSelector):
+    name = "round_robin"
+
+    def __init__(self) -> None:
+        self._cursors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def select(
+        self, db: Session, team_name: str, exclude: Set[str], limit: int
+    ) -> List[str]:
+        members = roster_cache.active_member_ids(db, team_name)
+        with self._lock:
+            cursor = self._cursors.get(team_name)
+            start = bisect.bisect_right(members, cursor) if cursor is not None else 0
+            ordered = members[start:] + members[:start]
+            picked = [uid for uid in ordered if uid not in exclude][:limit]
+            if picked:
+                self._cursors[team_name] = picked[-1]
+        return picked
+
+
+SELECTORS: Dict[str, ReviewerSelector] = {
+    s.name: s
+    for s in (RandomSelector(), LeastLoadedSelector(), RoundRobinSelector())
+}
+
+
+def get_selector(name: Optional[str] = None) -> ReviewerSelector:
+    name = name or REVIEWER_STRATEGY
+    if name not in SELECTORS:
+        raise ValueError(f"unknown reviewer strategy: {name}")
+    return SELECTORS[name]
@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.db_models import UserModel
+
+ROSTER_CACHE_TEAMS = int(os.getenv("ROSTER_CACHE_TEAMS", "1024"))
+ROSTER_CACHE_USERS = int(os.getenv("ROSTER_CACHE_USERS", "65536"))
+# кэш локален для процесса: TTL ограничивает рассинхронизацию между воркерами
+ROSTER_CACHE_TTL = float(os.getenv("ROSTER_CACHE_TTL", "30"))
+
+
+class _LRU:
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, object]]" = OrderedDict()
+
+    def get(self, key: Hashable):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        stored_at, value = item
+        if self.ttl and time.monotonic() - stored_at > self.ttl:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: object) -> None:
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RosterCache:
+    """
+    team_name -> отсортированные user_id активных участников,
+    user_id -> team_name.
+    """
+
+    def __init__(self, max_teams: int, max_users: int, ttl: float) -> None:
+        self._teams = _LRU(max_teams, ttl)
+        self._users = _LRU(max_users, ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, lru: _LRU, key: str):
+        with self._lock:
+            value = lru.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def active_member_ids(self, db: Session, team_name: str) -> Tuple[str, ...]:
+        members = self._get(self._teams, team_name)
+        if members is not None:
+            return members
+
+        rows = (
+            db.query(UserModel.user_id)
+            .filter(UserModel.team_name == team_name, UserModel.is_active == True)
+            .order_by(UserModel.user_id)
+            .all()
+        )
+        members = tuple(row[0] for row in rows)
+        with self._lock:
+            self._teams.put(team_name, members)
+        return members
+
+    def user_team(self, db: Session, user_id: str) -> Optional[str]:
+        team_name = self._get(self._users, user_id)
+        if team_name is not None:
+            return team_name
+
+        row = db.query(UserModel.team_name).filter_by(user_id=user_id).first()
+        if not row:
+            return None
+        with self._lock:
+            self._users.put(user_id, row[0])
+        return row[0]
+
+    def invalidate_teams(self, team_names: Iterable[str]) -> None:
+        with self._lock:
+            for team_name in team_names:
+                self._teams.pop(team_name)
+
+    def invalidate_users(self, user_ids: Iterable[str]) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                self._users.pop(user_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._teams.clear()
+            self._users.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "teams": len(self._teams),
+                "users": len(self._users),
+            }
+
+
+roster_cache = RosterCache(ROSTER_CACHE_TEAMS, ROSTER_CACHE_USERS, ROSTER_CACHE_TTL)
@@ -0,0 +1,225 @@
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import Integer, Text, column, func, select, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db_models import (
+    PullRequestArchiveModel,
+    PullRequestModel,
+    PullRequestReviewerArchiveModel,
+    PullRequestReviewerModel,
+    TeamModel,
+    TeamStatsModel,
+    UserModel,
+)
+from app.models import TeamStats, UserStats
+
+COUNTERS = ("open_review_count", "review_count", "authored_pr_count", "merged_pr_count")
+# только у пользователей: версия списка ревью, растёт на каждое событие ревью
+USER_COUNTERS = COUNTERS + ("reviews_version",)
+
+
+class StatsDelta:
+    """
+    Накопитель изменений счётчиков пользователей за одну транзакцию.
+    Командные счётчики выводятся из него по текущей команде пользователя.
+    """
+
+    def __init__(self) -> None:
+        self._deltas: Dict[str, Counter] = defaultdict(Counter)
+
+    def reviews_assigned(self, user_ids: Iterable[str]) -> "StatsDelta":
+        for user_id in user_ids:
+            self._deltas[user_id]["open_review_count"] += 1
+            self._deltas[user_id]["review_count"] += 1
+            self._deltas[user_id]["reviews_version"] += 1
+        return self
+
+    def reviews_unassigned(self, user_ids: Iterable[str]) -> "StatsDelta":
+        for user_id in user_ids:
+            self._deltas[user_id]["open_review_count"] -= 1
+            self._deltas[user_id]["review_count"] -= 1
+            self._deltas[user_id]["reviews_version"] += 1
+        return self
+
+    def reviews_closed(self, user_ids: Iterable[str]) -> "StatsDelta":
+        for user_id in user_ids:
+            self._deltas[user_id]["open_review_count"] -= 1
+            self._deltas[user_id]["reviews_version"] += 1
+        return self
+
+    def pr_authored(self, author_id: str) -> "StatsDelta":
+        self._deltas[author_id]["authored_pr_count"] += 1
+        return self
+
+    def pr_merged(self, author_id: str) -> "StatsDelta":
+        self._deltas[author_id]["merged_pr_count"] += 1
+        return self
+
+    def rows(self) -> list:
+        return [
+            (user_id, *(deltas[name] for name in USER_COUNTERS))
+            for user_id, deltas in self._deltas.items()
+            if any(deltas[name] for name in USER_COUNTERS)
+        ]
+
+
+def apply(db: Session, delta: StatsDelta) -> None:
+    """
+    Три оператора на всю транзакцию: блокировка users, users и team_stats.
+    Строки блокируются в порядке ключа, чтобы параллельные записи
+    с пересекающимися пользователями не получали deadlock. FOR NO KEY UPDATE
+    совместим с блокировками проверок FK при вставке ревьюверов. Блокировка —
+    отдельным оператором: UPDATE видит уже заблокированные версии строк.
+    """
+    rows = sorted(delta.rows())
+    if not rows:
+        return
+
+    d = values(
+        column("user_id", Text),
+        *(column(name, Integer) for name in USER_COUNTERS),
+        name="d",
+    ).data(rows)
+
+    db.execute(
+        select(UserModel.user_id)
+        .where(UserModel.user_id.in_([row[0] for row in rows]))
+        .order_by(UserModel.user_id)
+        .with_for_update(key_share=True)
+    )
+    db.execute(
+        update(UserModel)
+        .where(UserModel.user_id == d.c.user_id)
+        .values(
+            {
+                getattr(UserModel, name): getattr(UserModel, name) + d.c[name]
+                for name in USER_COUNTERS
+            }
+        )
+    )
+
+    per_team = (
+        select(UserModel.team_name, *(func.sum(d.c[name]) for name in COUNTERS))
+        .join(d, d.c.user_id == UserModel.user_id)
+        .group_by(UserModel.team_name)
+        .order_by(UserModel.team_name)
+    )
+    stmt = pg_insert(TeamStatsModel).from_select(
+        ["team_name", *COUNTERS], per_team
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[TeamStatsModel.team_name],
+            set_={
+                name: getattr(TeamStatsModel, name) + getattr(stmt.excluded, name)
+                for name in COUNTERS
+            },
+        )
+    )
+
+
+def _counts_from(prs, reviewers):
+    reviews = (
+        select(func.count())
+        .select_from(reviewers)
+        .where(reviewers.reviewer_id == UserModel.user_id)
+    )
+    open_reviews = reviews.join(
+        prs, prs.pull_request_id == reviewers.pull_request_id
+    ).where(prs.status == "OPEN")
+    authored = (
+        select(func.count())
+        .select_from(prs)
+        .where(prs.author_id == UserModel.user_id)
+    )
+    merged = authored.where(prs.status == "MERGED")
+    return {
+        UserModel.open_review_count: open_reviews.scalar_subquery(),
+        UserModel.review_count: reviews.scalar_subquery(),
+        UserModel.authored_pr_count: authored.scalar_subquery(),
+        UserModel.merged_pr_count: merged.scalar_subquery(),
+    }
+
+
+def _user_counters_from_base():
+    # архивные PR входят в накопительные счётчики так же, как горячие
+    hot = _counts_from(PullRequestModel, PullRequestReviewerModel)
+    archived = _counts_from(PullRequestArchiveModel, PullRequestReviewerArchiveModel)
+    return {column: hot[column] + archived[column] for column in hot}
+
+
+def rebuild_team_stats(db: Session, team_names: Optional[Iterable[str]] = None) -> None:
+    """Сумма счётчиков текущих участников; нужна после переноса пользователей."""
+    per_team = (
+        select(
+            TeamModel.team_name,
+            *(func.coalesce(func.sum(getattr(UserModel, name)), 0) for name in COUNTERS),
+        )
+        .outerjoin(UserModel, UserModel.team_name == TeamModel.team_name)
+        .group_by(TeamModel.team_name)
+    )
+    if team_names is not None:
+        per_team = per_team.where(TeamModel.team_name.in_(list(team_names)))
+    stmt = pg_insert(TeamStatsModel).from_select(["team_name", *COUNTERS], per_team)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[TeamStatsModel.team_name],
+            set_={name: getattr(stmt.excluded, name) for name in COUNTERS},
+        )
+    )
+
+
+def rebuild(db: Session, user_ids: Optional[Iterable[str]] = None) -> None:
+    """
+    Пересчитывает счётчики пользователей по базовым таблицам и счётчики
+    их команд. Без user_ids — полный пересчёт. Коммит делает вызывающий.
+    """
+    q = update(UserModel).values(_user_counters_from_base())
+    team_names = None
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        q = q.where(UserModel.user_id.in_(user_ids))
+        team_names = {
+            row[0]
+            for row in db.query(UserModel.team_name)
+            .filter(UserModel.user_id.in_(user_ids))
+            .all()
+        }
+    db.execute(q)
+    rebuild_team_stats(db, team_names)
+
+
+def get_user_stats(db: Session, user_id: str) -> Optional[UserStats]:
+    user = db.query(UserModel).filter_by(user_id=user_id).first()
+    if not user:
+        return None
+    return UserStats(
+        user_id=user.user_id,
+        team_name=user.team_name,
+        open_reviews=user.open_review_count,
+        total_reviews=user.review_count,
+        authored_prs=user.authored_pr_count,
+        merged_prs=user.merged_pr_count,
+    )
+
+
+def get_team_stats(db: Session, team_name: str) -> Optional[TeamStats]:
+    row = (
+        db.query(TeamModel.team_name, TeamStatsModel)
+        .outerjoin(TeamStatsModel, TeamStatsModel.team_name == TeamModel.team_name)
+        .filter(TeamModel.team_name == team_name)
+        .first()
+    )
+    if not row:
+        return None
+    stats = row[1]
+    return TeamStats(
+        team_name=row[0],
+        open_reviews=stats.open_review_count if stats else 0,
+        total_reviews=stats.review_count if stats else 0,
+        authored_prs=stats.authored_pr_count if stats else 0,
+        merged_prs=stats.merged_pr_count if stats else 0,
+    )
@@ -1,8 +1,20 @@
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
+from app import profiling
 from app.db_models import TeamModel, UserModel
-from app.models import Team, TeamMember
+from app.models import (
+    Team,
+    TeamImportResponse,
+    TeamMember,
+    TeamMembersDelta,
+    TeamMembersPatchResponse,
+    TeamMembersResult,
+)
+from app.services import pr_service, stats_service, versions
+from app.services.roster_cache import roster_cache
 
 
 def _user_to_member_dto(user: UserModel) -> TeamMember:
@@ -13,6 +25,7 @@ def _user_to_member_dto(user: UserModel) -> TeamMember:
     )
 
 
+@profiling.timed_dto
 def _team_to_dto(team: TeamModel, users: list[UserModel]) -> Team:
     return Team(
         team_name=team.team_name,
@@ -20,6 +33,57 @@ def _team_to_dto(team: TeamModel, users: list[UserModel]) -> Team:
     )
 
 
+CHUNK_SIZE = 5000
+
+
+def _chunks(items: list, size: int = CHUNK_SIZE) -> Iterable[list]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def _upsert_members(db: Session, rows: List[dict]) -> Set[str]:
+    """
+    INSERT ... ON CONFLICT DO UPDATE пачками по CHUNK_SIZE.
+    Возвращает команды, в которых пользователи состояли до переноса.
+    """
+    previous_teams: Set[str] = set()
+    for chunk in _chunks(rows):
+        previous_teams.update(
+            row[0]
+            for row in db.query(UserModel.team_name)
+            .filter(UserModel.user_id.in_([r["user_id"] for r in chunk]))
+            .distinct()
+            .all()
+        )
+        stmt = pg_insert(UserModel).values(chunk)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[UserModel.user_id],
+                set_={
+                    "username": stmt.excluded.username,
+                    "team_name": stmt.excluded.team_name,
+                    "is_active": stmt.excluded.is_active,
+                },
+            )
+        )
+    return previous_teams
+
+
+def _member_rows(teams: List[Team]) -> List[dict]:
+    # повтор user_id: побеждает последнее вхождение, как при поштучном обновлении;
+    # порядок по user_id — одинаковый порядок блокировок у параллельных импортов
+    rows: Dict[str, dict] = {}
+    for team_data in teams:
+        for member in team_data.members:
+            rows[member.user_id] = {
+                "user_id": member.user_id,
+                "username": member.username,
+                "team_name": team_data.team_name,
+                "is_active": member.is_active,
+            }
+    return [rows[user_id] for user_id in sorted(rows)]
+
+
 def create_team(db: Session, team_data: Team) -> Optional[Team]:
     existing = db.query(TeamModel).filter_by(team_name=team_data.team_name).first()
     if existing:
@@ -27,24 +91,17 @@ def create_team(db: Session, team_data: Team) -> Optional[Team]:
 
     team = TeamModel(team_name=team_data.team_name)
     db.add(team)
+    db.flush()
 
-    for member in team_data.members:
-        user = db.query(UserModel).filter_by(user_id=member.user_id).first()
-        if user:
-            user.username = member.username
-            user.team_name = team_data.team_name
-            user.is_active = member.is_active
-        else:
-            db.add(
-                UserModel(
-                    user_id=member.user_id,
-                    username=member.username,
-                    team_name=team_data.team_name,
-                    is_active=member.is_active,
-                )
-            )
+    rows = _member_rows([team_data])
+    affected_teams = _upsert_members(db, rows)
+    affected_teams.add(team_data.team_name)
+    stats_service.rebuild_team_stats(db, affected_teams)
+    versions.bump_teams(db, affected_teams)
 
     db.commit()
+    roster_cache.invalidate_teams(affected_teams)
+    roster_cache.invalidate_users(r["user_id"] for r in rows)
 
     users = (
         db.query(UserModel)
@@ -56,6 +113,222 @@ def create_team(db: Session, team_data: Team) -> Optional[Team]:
     return _team_to_dto(team, users)
 
 
+def import_teams(db: Session, teams: List[Team]) -> TeamImportResponse:
+    """
+    Синхронизация множества команд: недостающие команды создаются,
+    участники всех команд upsert'ятся; существующая команда не ошибка.
+    """
+    names = list(dict.fromkeys(t.team_name for t in teams))
+    created: List[str] = []
+    for chunk in _chunks(names):
+        stmt = (
+            pg_insert(TeamModel)
+            .values([{"team_name": name} for name in chunk])
+            .on_conflict_do_nothing(index_elements=[TeamModel.team_name])
+            .returning(TeamModel.team_name)
+        )
+        created += [row[0] for row in db.execute(stmt).all()]
+
+    rows = _member_rows(teams)
+    affected_teams = _upsert_members(db, rows)
+    affected_teams.update(names)
+    stats_service.rebuild_team_stats(db, affected_teams)
+    versions.bump_teams(db, affected_teams)
+
+    db.commit()
+    roster_cache.invalidate_teams(affected_teams)
+    roster_cache.invalidate_users(r["user_id"] for r in rows)
+
+    created_set = set(created)
+    return TeamImportResponse(
+        teams_created=[n for n in names if n in created_set],
+        teams_updated=[n for n in names if n not in created_set],
+        members_upserted=len(rows),
+    )
+
+
+class MemberChanges:
+    """
+    Разбор дельт PATCH /team/members по текущему состоянию пользователей
+    (user_id -> (team_name, is_active)); общий для SQL и in-memory хранилищ.
+    """
+
+    def __init__(self, deltas: List[TeamMembersDelta]) -> None:
+        self.results = {
+            delta.team_name: TeamMembersResult(
+                team_name=delta.team_name,
+                added=[],
+                updated=[],
+                removed=[],
+                not_members=[],
+            )
+            for delta in deltas
+        }
+        self.removed: List[str] = []
+        # частичные обновления по первичному ключу; upsert в свою команду;
+        # переносы из других команд — после переназначения ревью ушедших
+        self.updates: List[dict] = []
+        self.upserts: List[dict] = []
+        self.moves: List[dict] = []
+
+    @property
+    def leaving(self) -> List[str]:
+        return sorted({*self.removed, *(row["user_id"] for row in self.moves)})
+
+    @property
+    def changed_teams(self) -> Set[str]:
+        return {
+            name
+            for name, result in self.results.items()
+            if result.added or result.updated or result.removed
+        }
+
+    def response(self, replaced: list, unreplaced: list) -> TeamMembersPatchResponse:
+        return TeamMembersPatchResponse(
+            teams=list(self.results.values()), replaced=replaced, unreplaced=unreplaced
+        )
+
+
+def plan_member_changes(
+    deltas: List[TeamMembersDelta], current: Dict[str, Tuple[str, bool]]
+) -> Optional[MemberChanges]:
+    """
+    None — add активного участника другой команды без remove из неё
+    в этом же запросе: молча переносить людей между командами нельзя.
+    """
+    changes = MemberChanges(deltas)
+    removed_from = {
+        user_id: delta.team_name for delta in deltas for user_id in delta.remove
+    }
+    for delta in deltas:
+        result = changes.results[delta.team_name]
+        for user_id in delta.remove:
+            if current.get(user_id, ("",))[0] == delta.team_name:
+                result.removed.append(user_id)
+                changes.removed.append(user_id)
+            else:
+                result.not_members.append(user_id)
+        for member in delta.update:
+            if current.get(member.user_id, ("",))[0] != delta.team_name:
+                result.not_members.append(member.user_id)
+                continue
+            row = member.model_dump(exclude_none=True)
+            if len(row) > 1:
+                changes.updates.append(row)
+            result.updated.append(member.user_id)
+        for member in delta.add:
+            row = {
+                "user_id": member.user_id,
+                "username": member.username,
+                "team_name": delta.team_name,
+                "is_active": member.is_active,
+            }
+            team_name, is_active = current.get(member.user_id, (None, False))
+            if team_name is None or team_name == delta.team_name:
+                changes.upserts.append(row)
+                (result.added if team_name is None else result.updated).append(
+                    member.user_id
+                )
+            elif is_active and removed_from.get(member.user_id) != team_name:
+                return None
+            else:
+                changes.moves.append(row)
+                result.added.append(member.user_id)
+    for rows in (changes.removed, changes.updates, changes.upserts, changes.moves):
+        rows.sort(key=lambda row: row if isinstance(row, str) else row["user_id"])
+    return changes
+
+
+def update_members(
+    db: Session, deltas: List[TeamMembersDelta], reassign_removed: bool = False
+) -> Tuple[str, Optional[TeamMembersPatchResponse]]:
+    """
+    add / update / remove для нескольких команд одной транзакцией.
+    remove деактивирует участника (без команды пользователь существовать
+    не может); remove в одной команде и add в другой — перенос.
+    Статусы: "ok", "team_not_found", "member_conflict". Версии, счётчики
+    и кэш составов сбрасываются только у затронутых команд.
+    """
+    names = [delta.team_name for delta in deltas]
+    existing = {
+        row[0]
+        for row in db.query(TeamModel.team_name).filter(TeamModel.team_name.in_(names))
+    }
+    if len(existing) != len(set(names)):
+        return "team_not_found", None
+
+    user_ids = {
+        user_id
+        for delta in deltas
+        for user_id in (
+            *delta.remove,
+            *(m.user_id for m in delta.update),
+            *(m.user_id for m in delta.add),
+        )
+    }
+    # строки пользователей блокируются в порядке ключа, как в stats_service.apply
+    current = {
+        user_id: (team_name, is_active)
+        for user_id, team_name, is_active in db.query(
+            UserModel.user_id, UserModel.team_name, UserModel.is_active
+        )
+        .filter(UserModel.user_id.in_(user_ids))
+        .order_by(UserModel.user_id)
+        .with_for_update(key_share=True)
+    }
+    changes = plan_member_changes(deltas, current)
+    if changes is None:
+        return "member_conflict", None
+
+    if changes.removed:
+        (
+            db.query(UserModel)
+            .filter(UserModel.user_id.in_(changes.removed))
+            .update({UserModel.is_active: False}, synchronize_session=False)
+        )
+    if changes.updates:
+        db.execute(update(UserModel), changes.updates)
+    affected = changes.changed_teams | _upsert_members(db, changes.upserts)
+
+    # ушедшие ещё числятся в старых командах: замена ищется там, а сами
+    # они кандидатами не считаются
+    replaced, unreplaced = [], []
+    if reassign_removed:
+        replaced, unreplaced = pr_service.reassign_open_reviews(db, changes.leaving)
+    affected |= _upsert_members(db, changes.moves)
+
+    stats_service.rebuild_team_stats(db, affected)
+    versions.bump_teams(db, affected)
+    db.commit()
+    roster_cache.invalidate_teams(affected)
+    roster_cache.invalidate_users(row["user_id"] for row in changes.moves)
+    return "ok", changes.response(replaced, unreplaced)
+
+
+def get_team_raw(db: Session, team_name: str) -> Optional[dict]:
+    """
+    Тело ответа /team/get из кортежей одного запроса (teams LEFT JOIN users),
+    ключи в порядке полей Team/TeamMember.
+    """
+    rows = (
+        db.query(TeamModel.team_name, UserModel.user_id, UserModel.username, UserModel.is_active)
+        .outerjoin(UserModel, UserModel.team_name == TeamModel.team_name)
+        .filter(TeamModel.team_name == team_name)
+        .order_by(UserModel.user_id)
+        .all()
+    )
+    if not rows:
+        return None
+    return {
+        "team_name": rows[0][0],
+        "members": [
+            {"user_id": user_id, "username": username, "is_active": is_active}
+            for _, user_id, username, is_active in rows
+            if user_id is not None
+        ],
+    }
+
+
 def get_team(db: Session, team_name: str) -> Optional[Team]:
     team = db.query(TeamModel).filter_by(team_name=team_name).first()
     if not team:
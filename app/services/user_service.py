@@ -1,10 +1,25 @@
-from typing import Optional, List
+import base64
+import json
+from datetime import datetime
+from typing import Optional, List, Tuple
+
+from sqlalchemy import select, tuple_, union_all
 from sqlalchemy.orm import Session
 
-from app.db_models import UserModel, PullRequestModel, PullRequestReviewerModel
-from app.models import User, PullRequestShort
+from app import profiling
+from app.db_models import (
+    PullRequestArchiveModel,
+    PullRequestModel,
+    PullRequestReviewerArchiveModel,
+    PullRequestReviewerModel,
+    UserModel,
+)
+from app.models import DeactivateBatchResponse, User, PullRequestShort
+from app.services import pr_service, versions
+from app.services.roster_cache import roster_cache
 
 
+@profiling.timed_dto
 def _user_to_dto(user: UserModel) -> User:
     return User(
         user_id=user.user_id,
@@ -20,29 +35,181 @@ def set_user_active(db: Session, user_id: str, is_active: bool) -> Optional[User
         return None
 
     user.is_active = is_active
+    versions.bump_teams(db, [user.team_name])
     db.commit()
+    roster_cache.invalidate_teams([user.team_name])
     db.refresh(user)
     return _user_to_dto(user)
 
 
-def get_user_reviews(db: Session, user_id: str) -> List[PullRequestShort]:
-    prs = (
-        db.query(PullRequestModel)
-        .join(
-            PullRequestReviewerModel,
-            PullRequestReviewerModel.pull_request_id
-            == PullRequestModel.pull_request_id,
-        )
-        .filter(PullRequestReviewerModel.reviewer_id == user_id)
+def deactivate_users(db: Session, user_ids: List[str]) -> DeactivateBatchResponse:
+    user_ids = list(dict.fromkeys(user_ids))
+    rows = (
+        db.query(UserModel.user_id, UserModel.team_name)
+        .filter(UserModel.user_id.in_(user_ids))
         .all()
     )
+    found = {user_id for user_id, _ in rows}
+    deactivated = [user_id for user_id in user_ids if user_id in found]
+
+    (
+        db.query(UserModel)
+        .filter(UserModel.user_id.in_(deactivated))
+        .update({UserModel.is_active: False}, synchronize_session=False)
+    )
+    replaced, unreplaced = pr_service.reassign_open_reviews(db, deactivated)
+    versions.bump_teams(db, {team_name for _, team_name in rows})
+    db.commit()
+    roster_cache.invalidate_teams({team_name for _, team_name in rows})
+
+    return DeactivateBatchResponse(
+        deactivated=deactivated,
+        not_found=[user_id for user_id in user_ids if user_id not in found],
+        replaced=replaced,
+        unreplaced=unreplaced,
+    )
+
 
-    return [
-        PullRequestShort(
-            pull_request_id=pr.pull_request_id,
-            pull_request_name=pr.pull_request_name,
-            author_id=pr.author_id,
-            status=pr.status,
+def encode_review_cursor(created_at: datetime, pr_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), pr_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_review_cursor(cursor: str) -> Optional[Tuple[datetime, str]]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, pr_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(pr_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def _review_select(prs, reviewers, user_id: str, status: Optional[str], after, limit):
+    # keyset по индексу ревьювера (reviewer_id, [status,] created_at, pull_request_id),
+    # PR присоединяются к уже отобранной странице
+    page = select(reviewers.pull_request_id, reviewers.created_at).where(
+        reviewers.reviewer_id == user_id
+    )
+    if status is not None:
+        page = page.where(reviewers.status == status)
+    if after is not None:
+        page = page.where(
+            tuple_(reviewers.created_at, reviewers.pull_request_id) < tuple_(*after)
         )
-        for pr in prs
-    ]
+    page = page.order_by(reviewers.created_at.desc(), reviewers.pull_request_id.desc())
+    if limit is not None:
+        page = page.limit(limit + 1)
+    page = page.subquery()
+    q = select(
+        prs.pull_request_id,
+        prs.pull_request_name,
+        prs.author_id,
+        prs.status,
+        page.c.created_at,
+    ).join(page, page.c.pull_request_id == prs.pull_request_id)
+    return q.order_by(page.c.created_at.desc(), page.c.pull_request_id.desc())
+
+
+def _review_rows(
+    db: Session,
+    user_id: str,
+    status: Optional[str],
+    limit: Optional[int],
+    cursor: Optional[str],
+    include_archived: bool = False,
+) -> Tuple[str, list, Optional[str]]:
+    after = None
+    if cursor is not None:
+        after = decode_review_cursor(cursor)
+        if after is None:
+            return "invalid_cursor", [], None
+
+    q = _review_select(
+        PullRequestModel, PullRequestReviewerModel, user_id, status, after, limit
+    )
+    # в архиве только MERGED, статуса у архивных ревьюверов нет
+    if include_archived and status != "OPEN":
+        archived = _review_select(
+            PullRequestArchiveModel,
+            PullRequestReviewerArchiveModel,
+            user_id,
+            None,
+            after,
+            limit,
+        )
+        both = union_all(q, archived).subquery()
+        q = select(both).order_by(
+            both.c.created_at.desc(), both.c.pull_request_id.desc()
+        )
+        if limit is not None:
+            q = q.limit(limit + 1)
+    rows = db.execute(q).all()
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_review_cursor(rows[-1].created_at, rows[-1].pull_request_id)
+
+    return "ok", rows, next_cursor
+
+
+def get_user_reviews(
+    db: Session,
+    user_id: str,
+    status: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_archived: bool = False,
+) -> Tuple[str, List[PullRequestShort], Optional[str]]:
+    """
+    Возвращает кортеж (status, prs, next_cursor), новые PR первыми.
+    Keyset-пагинация по (created_at, pull_request_id); архивные PR
+    только с include_archived. status:
+      - "ok"
+      - "invalid_cursor"
+    """
+    status_code, rows, next_cursor = _review_rows(
+        db, user_id, status, limit, cursor, include_archived
+    )
+    return (
+        status_code,
+        [
+            PullRequestShort(
+                pull_request_id=row.pull_request_id,
+                pull_request_name=row.pull_request_name,
+                author_id=row.author_id,
+                status=row.status,
+            )
+            for row in rows
+        ],
+        next_cursor,
+    )
+
+
+def get_user_reviews_raw(
+    db: Session,
+    user_id: str,
+    status: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_archived: bool = False,
+) -> Tuple[str, Optional[dict]]:
+    """То же, что get_user_reviews, готовым телом ответа UserReviewsResponse."""
+    status_code, rows, next_cursor = _review_rows(
+        db, user_id, status, limit, cursor, include_archived
+    )
+    if status_code != "ok":
+        return status_code, None
+    return "ok", {
+        "user_id": user_id,
+        "pull_requests": [
+            {
+                "pull_request_id": row.pull_request_id,
+                "pull_request_name": row.pull_request_name,
+                "author_id": row.author_id,
+                "status": row.status,
+            }
+            for row in rows
+        ],
+        "next_cursor": next_cursor,
+    }
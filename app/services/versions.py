@@ -0,0 +1,52 @@
+import hashlib
+from typing import Iterable, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.db_models import TeamModel, UserModel
+
+
+def bump_teams(db: Session, team_names: Iterable[str]) -> None:
+    """Новая версия команд; вызывается в транзакции изменения состава."""
+    names = sorted(set(team_names))
+    if not names:
+        return
+    db.execute(
+        update(TeamModel)
+        .where(TeamModel.team_name.in_(names))
+        .values(version=TeamModel.version + 1)
+    )
+
+
+def team_version(db: Session, team_name: str) -> Optional[int]:
+    return (
+        db.query(TeamModel.version).filter(TeamModel.team_name == team_name).scalar()
+    )
+
+
+def reviews_version(db: Session, user_id: str) -> Optional[int]:
+    """Версию ревью пользователя двигает stats_service.apply и create_pr."""
+    return (
+        db.query(UserModel.reviews_version)
+        .filter(UserModel.user_id == user_id)
+        .scalar()
+    )
+
+
+def make_etag(kind: str, key: str, version: int, *params: object) -> str:
+    # параметры запроса (фильтры, страница) входят в тег хэшем
+    digest = hashlib.blake2b(
+        "\x1f".join(map(str, (kind, key, *params))).encode(), digest_size=8
+    ).hexdigest()
+    return f'"{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match сравнивается слабо: W/"x" совпадает с "x"
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in tags)
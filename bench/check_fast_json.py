@@ -0,0 +1,108 @@
+"""
+Сверка быстрого пути FAST_JSON с обычным: для всех команд и пользователей
+из DATABASE_URL ответы /team/get и /users/getReview (со статусом и
+постранично) должны совпадать побайтно.
+
+    python -m bench.check_fast_json
+"""
+
+import sys
+from datetime import datetime, timedelta, timezone
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app import serialization
+from app.db import SessionLocal
+from app.db_models import PullRequestReviewerModel, TeamModel, UserModel
+from app.main import app
+from app.models import PullRequest
+
+
+def _fetch(client: TestClient, fast: bool, path: str, params: dict):
+    serialization.FAST_JSON = fast
+    return client.get(path, params=params)
+
+
+def _check_datetimes() -> list:
+    # createdAt/mergedAt: пограничные случаи форматирования
+    failures = []
+    moments = [
+        datetime(2025, 10, 24, 12, 34, 56, 789012, tzinfo=timezone.utc),
+        datetime(2025, 10, 24, 12, 34, 56, tzinfo=timezone.utc),
+        datetime(2025, 10, 24, 12, 34, 56, 1000, tzinfo=timezone(timedelta(hours=3))),
+        None,
+    ]
+    for created in moments[:3]:
+        for merged in moments:
+            pr = PullRequest(
+                pull_request_id="pr-1",
+                pull_request_name="Проверка",
+                author_id="u1",
+                status="MERGED" if merged else "OPEN",
+                assigned_reviewers=["u2"],
+                createdAt=created,
+                mergedAt=merged,
+            )
+            expected = JSONResponse(jsonable_encoder({"pr": pr})).body
+            actual = serialization.dumps(
+                {
+                    "pr": {
+                        "pull_request_id": "pr-1",
+                        "pull_request_name": "Проверка",
+                        "author_id": "u1",
+                        "status": "MERGED" if merged else "OPEN",
+                        "assigned_reviewers": ["u2"],
+                        "createdAt": created,
+                        "mergedAt": merged,
+                    }
+                }
+            )
+            if expected != actual:
+                failures.append(("datetime", expected, actual))
+    return failures
+
+
+def main() -> int:
+    with SessionLocal() as db:
+        teams = [row[0] for row in db.query(TeamModel.team_name).all()]
+        # все ревьюверы и немного пользователей без ревью
+        users = [
+            row[0]
+            for row in db.query(PullRequestReviewerModel.reviewer_id).distinct().all()
+        ]
+        users += [row[0] for row in db.query(UserModel.user_id).limit(50).all()]
+
+    requests = [("/team/get", {"team_name": name}) for name in teams + ["missing-team"]]
+    for user_id in users:
+        requests.append(("/users/getReview", {"user_id": user_id}))
+        for status in ("OPEN", "MERGED"):
+            requests.append(("/users/getReview", {"user_id": user_id, "status": status}))
+
+    failures = _check_datetimes()
+    checked = 0
+    with TestClient(app) as client:
+        while requests:
+            path, params = requests.pop()
+            slow = _fetch(client, False, path, params)
+            fast = _fetch(client, True, path, params)
+            checked += 1
+            if (slow.status_code, slow.content) != (fast.status_code, fast.content):
+                failures.append((path, params, slow.content, fast.content))
+            if path == "/users/getReview" and "limit" not in params:
+                # первая страница по 2 и продолжение по её курсору
+                requests.append((path, {**params, "limit": 2}))
+            elif path == "/users/getReview" and slow.status_code == 200:
+                next_cursor = slow.json().get("next_cursor")
+                if next_cursor:
+                    requests.append((path, {**params, "cursor": next_cursor}))
+
+    for failure in failures:
+        print("MISMATCH", *failure, sep="\n  ")
+    print(f"{checked} responses compared, {len(failures)} mismatches")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""
+Сверка хранилищ: один и тот же сценарий вызовов функций сервисов выполняется
+через DbRunner над DATABASE_URL и через MemoryRunner, результаты (статусы,
+DTO, версии, счётчики, события) должны совпадать.
+
+    python -m bench.check_storage
+
+Сценарий работает в своих командах с уникальным префиксом, стратегия выбора
+ревьюверов — least_loaded (детерминированная).
+"""
+
+import asyncio
+import sys
+import uuid
+from typing import Any, Callable, List
+
+from pydantic import BaseModel
+
+from app.db import session_runner
+from app.models import (
+    CreatePRRequest,
+    Team,
+    TeamMember,
+    TeamMembersDelta,
+    TeamMemberUpdate,
+)
+from app.services import (
+    events,
+    pr_service,
+    reviewer_selection,
+    stats_service,
+    team_service,
+    user_service,
+    versions,
+)
+from app.services.memory import MemoryRunner, MemoryStore
+
+
+def _normalize(value: Any) -> Any:
+    # время создания и курсоры (в них время) у хранилищ разные
+    if isinstance(value, BaseModel):
+        value = value.model_dump()
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            if key in ("createdAt", "created_at", "mergedAt"):
+                result[key] = item is not None
+            elif key == "next_cursor":
+                result[key] = item is not None
+            elif key in ("assigned_reviewers", "user_ids", "reviewers"):
+                result[key] = sorted(item)
+            else:
+                result[key] = _normalize(item)
+        return result
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def _team(name: str, *members: tuple) -> Team:
+    return Team(
+        team_name=name,
+        members=[
+            TeamMember(user_id=user_id, username=user_id.upper(), is_active=active)
+            for user_id, active in members
+        ],
+    )
+
+
+async def scenario(run: Callable, p: str) -> List[tuple]:
+    """Возвращает [(шаг, результат)]; run выполняет fn(db, ...) в своём хранилище."""
+    log: List[tuple] = []
+
+    async def step(name: str, fn: Callable, *args: Any) -> Any:
+        result = await run(fn, *args)
+        log.append((name, _normalize(result)))
+        return result
+
+    a, b, c = f"{p}-a", f"{p}-b", f"{p}-c"
+    u = [f"{p}-u{i}" for i in range(8)]
+    position = await run(events.horizon)
+
+    team_a = _team(a, *((user_id, True) for user_id in u[:4]), (u[4], False))
+    await step("create a", team_service.create_team, team_a)
+    await step("create a again", team_service.create_team, _team(a, (u[0], True)))
+    await step("create b", team_service.create_team, _team(b, (u[5], True), (u[6], True)))
+    # перенос u3 из a в b, новая пустая команда c, повтор u7 в пакете
+    await step(
+        "import",
+        team_service.import_teams,
+        [_team(b, (u[3], True), (u[7], True)), _team(c), _team(b, (u[7], False))],
+    )
+    for name in (a, b, c, f"{p}-missing"):
+        await step(f"get {name}", team_service.get_team, name)
+        await step(f"get raw {name}", team_service.get_team_raw, name)
+        await step(f"version {name}", versions.team_version, name)
+
+    for i in range(4):
+        await step(f"create pr{i}", pr_service.create_pr, f"{p}-pr{i}", f"PR {i}", u[0])
+    await step("create pr0 again", pr_service.create_pr, f"{p}-pr0", "dup", u[0])
+    await step("create unknown author", pr_service.create_pr, f"{p}-x", "x", f"{p}-nobody")
+    await step("create in b", pr_service.create_pr, f"{p}-prb", "b", u[5])
+    batch = [(10, u[1]), (11, u[2]), (10, u[1]), (0, u[0]), (12, f"{p}-nobody"), (13, u[6])]
+    await step(
+        "batch",
+        pr_service.create_prs_batch,
+        [
+            CreatePRRequest(
+                pull_request_id=f"{p}-pr{i}",
+                pull_request_name=f"batch {i}",
+                author_id=author,
+            )
+            for i, author in batch
+        ],
+    )
+
+    pr0 = await run(pr_service.get_pr_by_id, f"{p}-pr0")
+    reassign = pr_service.reassign_reviewer
+    await step("reassign", reassign, f"{p}-pr0", pr0.assigned_reviewers[0])
+    await step("reassign not assigned", reassign, f"{p}-pr0", u[0])
+    await step("reassign unknown pr", reassign, f"{p}-none", u[1])
+    await step("reassign unknown user", reassign, f"{p}-pr0", f"{p}-nobody")
+    await step("reassign no candidate", reassign, f"{p}-prb", u[6])
+    await step("merge", pr_service.merge_pr, f"{p}-pr1")
+    await step("merge again", pr_service.merge_pr, f"{p}-pr1")
+    await step("merge unknown", pr_service.merge_pr, f"{p}-none")
+    await step("reassign merged", reassign, f"{p}-pr1", u[1])
+    await step("get pr0", pr_service.get_pr_by_id, f"{p}-pr0")
+
+    await step("set inactive", user_service.set_user_active, u[2], False)
+    await step("set unknown", user_service.set_user_active, f"{p}-nobody", True)
+    await step("deactivate", user_service.deactivate_users, [u[1], f"{p}-nobody", u[1]])
+
+    patch = team_service.update_members
+    await step("patch missing team", patch, [TeamMembersDelta(team_name=f"{p}-missing")])
+    await step(
+        "patch conflict",
+        patch,
+        [
+            TeamMembersDelta(
+                team_name=a, add=[TeamMember(user_id=u[5], username="x", is_active=True)]
+            )
+        ],
+    )
+    # новый u8 в a, remove u0 (ревьювер открытых PR), перенос u6 из b в c
+    await step(
+        "patch",
+        patch,
+        [
+            TeamMembersDelta(
+                team_name=a,
+                add=[TeamMember(user_id=f"{p}-u8", username="U8", is_active=True)],
+                update=[TeamMemberUpdate(user_id=u[2], username="TWO")],
+                remove=[u[0], u[5]],
+            ),
+            TeamMembersDelta(team_name=b, remove=[u[6]]),
+            TeamMembersDelta(
+                team_name=c,
+                add=[TeamMember(user_id=u[6], username="U6", is_active=True)],
+            ),
+        ],
+        True,
+    )
+    for name in (a, b, c):
+        await step(f"patched {name}", team_service.get_team, name)
+
+    for user_id in u:
+        await step(f"reviews {user_id}", user_service.get_user_reviews, user_id)
+        await step(
+            f"reviews raw {user_id}", user_service.get_user_reviews_raw, user_id, "OPEN"
+        )
+        await step(f"reviews version {user_id}", versions.reviews_version, user_id)
+        await step(f"stats {user_id}", stats_service.get_user_stats, user_id)
+        cursor = None
+        for page in range(3):
+            status, prs, cursor = await run(
+                user_service.get_user_reviews, user_id, None, 1, cursor
+            )
+            log.append(
+                (f"reviews {user_id} page {page}", _normalize([status, prs, cursor is None]))
+            )
+            if cursor is None:
+                break
+    await step("invalid cursor", user_service.get_user_reviews, u[0], None, 1, "???")
+    for name in (a, b, c, f"{p}-missing"):
+        await step(f"team stats {name}", stats_service.get_team_stats, name)
+        await step(f"team version {name}", versions.team_version, name)
+
+    for name in (a, b):
+        tail = await run(events.read_after, position, None, name, 1000)
+        log.append((f"events {name}", _normalize([event for _, event in tail])))
+    return log
+
+
+async def _run_postgres(fn: Callable, *args: Any) -> Any:
+    async with session_runner() as run:
+        return await run(fn, *args)
+
+
+def _strip_ids(log: List[tuple]) -> List[tuple]:
+    # event_id у хранилищ свои
+    return [
+        (name, [{k: v for k, v in e.items() if k != "event_id"} for e in result])
+        if name.startswith("events ")
+        else (name, result)
+        for name, result in log
+    ]
+
+
+async def main() -> int:
+    reviewer_selection.REVIEWER_STRATEGY = "least_loaded"
+    prefix = f"conf-{uuid.uuid4().hex[:8]}"
+    expected = _strip_ids(await scenario(_run_postgres, prefix))
+    actual = _strip_ids(await scenario(MemoryRunner(MemoryStore()), prefix))
+
+    failures = [
+        (name, pg, memory)
+        for (name, pg), (_, memory) in zip(expected, actual)
+        if pg != memory
+    ]
+    if len(expected) != len(actual):
+        failures.append(("steps", len(expected), len(actual)))
+    for failure in failures:
+        print("MISMATCH", *failure, sep="\n  ")
+    print(f"{len(expected)} steps compared, {len(failures)} mismatches")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,393 @@
+"""
+Нагрузочный бенчмарк эндпоинтов сервиса.
+
+    python -m bench.run --teams 20 --users-per-team 25 --history 5000 \
+        --concurrency 1,8,32 --requests 2000 --output bench_results.json
+    python -m bench.run compare old.json new.json
+
+Без --base-url приложение запускается в процессе (httpx.ASGITransport) поверх
+DATABASE_URL; в этом режиме считаются SQL-запросы на запрос. С --base-url
+нагрузка идёт на уже запущенный сервис, число запросов к БД не измеряется.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import httpx
+
+ENDPOINTS = {
+    "create": ("POST", "/pullRequest/create"),
+    "reassign": ("POST", "/pullRequest/reassign"),
+    "merge": ("POST", "/pullRequest/merge"),
+    "team_add": ("POST", "/team/add"),
+    "get_review": ("GET", "/users/getReview"),
+}
+DEFAULT_MIX = "create=3,reassign=2,merge=2,team_add=1,get_review=10"
+
+_current_op: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar(
+    "bench_op", default=None
+)
+
+
+def _install_query_counter() -> None:
+    from sqlalchemy import event
+
+    from app import db
+
+    def count(*_args, **_kwargs):
+        counter = _current_op.get()
+        if counter is not None:
+            counter[0] += 1
+
+    engines = [db.engine]
+    if db.async_engine is not None:
+        engines.append(db.async_engine.sync_engine)
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", count)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+class State:
+    def __init__(self, run_id: str, teams: Dict[str, List[str]]) -> None:
+        self.run_id = run_id
+        self.teams = teams
+        self.users = [u for members in teams.values() for u in members]
+        self.open_prs: Dict[str, List[str]] = {}
+        self.seq = 0
+
+    def next_id(self, prefix: str) -> str:
+        self.seq += 1
+        return f"{self.run_id}-{prefix}-{self.seq}"
+
+
+async def seed(client: httpx.AsyncClient, args: argparse.Namespace, run_id: str) -> State:
+    teams = {
+        f"{run_id}-team-{t}": [
+            f"{run_id}-u-{t}-{i}" for i in range(args.users_per_team)
+        ]
+        for t in range(args.teams)
+    }
+    r = await client.post(
+        "/team/import",
+        json={
+            "teams": [
+                {
+                    "team_name": name,
+                    "members": [
+                        {"user_id": u, "username": u, "is_active": True}
+                        for u in members
+                    ],
+                }
+                for name, members in teams.items()
+            ]
+        },
+    )
+    r.raise_for_status()
+
+    state = State(run_id, teams)
+    batch = []
+    for _ in range(args.history):
+        team = random.choice(list(teams))
+        batch.append(
+            {
+                "pull_request_id": state.next_id("hist"),
+                "pull_request_name": "history",
+                "author_id": random.choice(teams[team]),
+            }
+        )
+        if len(batch) == 1000:
+            await _create_batch(client, state, batch)
+            batch = []
+    if batch:
+        await _create_batch(client, state, batch)
+
+    to_merge = random.sample(
+        list(state.open_prs), int(len(state.open_prs) * args.merged_fraction)
+    )
+    sem = asyncio.Semaphore(32)
+
+    async def merge(pr_id: str) -> None:
+        async with sem:
+            r = await client.post("/pullRequest/merge", json={"pull_request_id": pr_id})
+            r.raise_for_status()
+            state.open_prs.pop(pr_id, None)
+
+    await asyncio.gather(*(merge(pr_id) for pr_id in to_merge))
+    return state
+
+
+async def _create_batch(client: httpx.AsyncClient, state: State, batch: list) -> None:
+    r = await client.post("/pullRequest/createBatch", json={"pull_requests": batch})
+    r.raise_for_status()
+    for item in r.json()["results"]:
+        if item["pr"]:
+            state.open_prs[item["pull_request_id"]] = item["pr"]["assigned_reviewers"]
+
+
+def _request_for(op: str, state: State):
+    method, path = ENDPOINTS[op]
+    if op == "create":
+        team = random.choice(list(state.teams))
+        return method, path, {
+            "json": {
+                "pull_request_id": state.next_id("pr"),
+                "pull_request_name": "bench",
+                "author_id": random.choice(state.teams[team]),
+            }
+        }
+    if op == "reassign":
+        candidates = [pr for pr, reviewers in state.open_prs.items() if reviewers]
+        if not candidates:
+            return None
+        pr_id = random.choice(candidates)
+        return method, path, {
+            "json": {
+                "pull_request_id": pr_id,
+                "old_user_id": random.choice(state.open_prs[pr_id]),
+            }
+        }
+    if op == "merge":
+        if not state.open_prs:
+            return None
+        pr_id = random.choice(list(state.open_prs))
+        state.open_prs.pop(pr_id)
+        return method, path, {"json": {"pull_request_id": pr_id}}
+    if op == "team_add":
+        name = state.next_id("team")
+        return method, path, {
+            "json": {
+                "team_name": name,
+                "members": [
+                    {"user_id": f"{name}-{i}", "username": "bench", "is_active": True}
+                    for i in range(5)
+                ],
+            }
+        }
+    return method, path, {"params": {"user_id": random.choice(state.users)}}
+
+
+def _track(op: str, state: State, response: httpx.Response) -> None:
+    if response.status_code >= 300:
+        return
+    body = response.json()
+    if op == "create":
+        pr = body["pr"]
+        state.open_prs[pr["pull_request_id"]] = pr["assigned_reviewers"]
+    elif op == "reassign":
+        pr = body["pr"]
+        if pr["pull_request_id"] in state.open_prs:
+            state.open_prs[pr["pull_request_id"]] = pr["assigned_reviewers"]
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    state: State,
+    mix: Dict[str, int],
+    concurrency: int,
+    total: int,
+    count_queries: bool,
+) -> dict:
+    ops = list(mix)
+    weights = [mix[op] for op in ops]
+    samples: Dict[str, List[float]] = {op: [] for op in ops}
+    queries: Dict[str, int] = {op: 0 for op in ops}
+    errors: Dict[str, int] = {op: 0 for op in ops}
+    remaining = [total]
+
+    async def worker() -> None:
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            op = random.choices(ops, weights)[0]
+            req = _request_for(op, state)
+            if req is None:
+                continue
+            method, path, kwargs = req
+            counter = [0]
+            token = _current_op.set(counter)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+            finally:
+                _current_op.reset(token)
+            samples[op].append(time.perf_counter() - started)
+            queries[op] += counter[0]
+            if response.status_code >= 500:
+                errors[op] += 1
+            _track(op, state, response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for op in ops:
+        lat = samples[op]
+        endpoints[op] = {
+            "requests": len(lat),
+            "errors_5xx": errors[op],
+            "rps": len(lat) / elapsed if elapsed else 0.0,
+            "p50_ms": _percentile(lat, 0.50) * 1000,
+            "p95_ms": _percentile(lat, 0.95) * 1000,
+            "p99_ms": _percentile(lat, 0.99) * 1000,
+            "mean_ms": statistics.fmean(lat) * 1000 if lat else 0.0,
+            "db_queries_per_request": (
+                queries[op] / len(lat) if count_queries and lat else None
+            ),
+        }
+    done = sum(len(v) for v in samples.values())
+    return {
+        "concurrency": concurrency,
+        "requests": done,
+        "elapsed_s": elapsed,
+        "rps": done / elapsed if elapsed else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def bench(args: argparse.Namespace) -> dict:
+    random.seed(args.seed)
+    mix = {
+        name: int(weight)
+        for name, weight in (part.split("=") for part in args.mix.split(","))
+    }
+    unknown = set(mix) - set(ENDPOINTS)
+    if unknown:
+        raise SystemExit(f"unknown endpoints in --mix: {', '.join(sorted(unknown))}")
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout)
+        count_queries = False
+    else:
+        from app.main import app
+
+        _install_query_counter()
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app, raise_app_exceptions=False),
+            base_url="http://bench",
+            timeout=args.timeout,
+        )
+        count_queries = True
+
+    run_id = uuid.uuid4().hex[:8]
+    async with client:
+        seed_started = time.perf_counter()
+        state = await seed(client, args, run_id)
+        seed_elapsed = time.perf_counter() - seed_started
+
+        levels = []
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            levels.append(
+                await run_level(
+                    client, state, mix, concurrency, args.requests, count_queries
+                )
+            )
+            print(_format_level(levels[-1]), file=sys.stderr)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "target": args.base_url or "in-process",
+            "db_async": os.getenv("DB_ASYNC", "0"),
+            "reviewer_strategy": os.getenv("REVIEWER_STRATEGY", "least_loaded"),
+            "teams": args.teams,
+            "users_per_team": args.users_per_team,
+            "history": args.history,
+            "mix": mix,
+            "seed_s": seed_elapsed,
+        },
+        "levels": levels,
+    }
+
+
+def _format_level(level: dict) -> str:
+    lines = [f"concurrency={level['concurrency']} rps={level['rps']:.1f}"]
+    for op, e in level["endpoints"].items():
+        q = e["db_queries_per_request"]
+        lines.append(
+            f"  {op:<11} n={e['requests']:<6} p50={e['p50_ms']:7.2f}ms "
+            f"p95={e['p95_ms']:7.2f}ms p99={e['p99_ms']:7.2f}ms "
+            f"5xx={e['errors_5xx']} q/req={'-' if q is None else f'{q:.2f}'}"
+        )
+    return "\n".join(lines)
+
+
+def compare(old_path: str, new_path: str) -> None:
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    old_levels = {level["concurrency"]: level for level in old["levels"]}
+    for level in new["levels"]:
+        base = old_levels.get(level["concurrency"])
+        if base is None:
+            continue
+        print(f"concurrency={level['concurrency']}")
+        for op, e in level["endpoints"].items():
+            b = base["endpoints"].get(op)
+            if not b:
+                continue
+            parts = []
+            for key in ("p50_ms", "p95_ms", "p99_ms", "rps"):
+                delta = (e[key] - b[key]) / b[key] * 100 if b[key] else 0.0
+                parts.append(f"{key}={e[key]:.2f} ({delta:+.1f}%)")
+            print(f"  {op:<11} " + " ".join(parts))
+
+
+def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "compare":
+        parser = argparse.ArgumentParser(prog="python -m bench.run compare")
+        parser.add_argument("old")
+        parser.add_argument("new")
+        args = parser.parse_args(sys.argv[2:])
+        compare(args.old, args.new)
+        return
+
+    parser = argparse.ArgumentParser(prog="python -m bench.run")
+    parser.add_argument("--base-url", help="запущенный сервис; по умолчанию in-process")
+    parser.add_argument("--teams", type=int, default=10)
+    parser.add_argument("--users-per-team", type=int, default=20)
+    parser.add_argument("--history", type=int, default=2000, help="исторических PR")
+    parser.add_argument("--merged-fraction", type=float, default=0.8)
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--requests", type=int, default=1000, help="на уровень")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    result = asyncio.run(bench(args))
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,552 @@
+"""
+Офлайн-симулятор назначения ревьюверов: трасса create/reassign/merge/deactivate
+проигрывается для каждой стратегии выбора над состоянием в массивах NumPy,
+без БД и сервиса.
+
+    python -m bench.simulate --prs 1000000 --teams 50
+    python -m bench.simulate --prs 200000 --save-trace trace.npz
+    python -m bench.simulate --trace trace.ndjson --strategies least_loaded,round_robin
+
+Кандидаты — по правилам pr_service: участники той же команды (при create — команды
+автора, при reassign и деактивации — команды заменяемого ревьювера), активные,
+не автор и не уже назначенные на PR; не больше 2 при create, 1 при замене.
+Стратегии повторяют reviewer_selection: random, least_loaded (порядок
+open_review_count, user_id), round_robin (курсор по user_id внутри команды).
+Перед симуляцией выбор сверяется с reviewer_selection.SELECTORS на маленьком
+ростере (check_selectors); при расхождении симуляция не запускается:
+
+    python -m bench.simulate --check
+
+Трасса в NDJSON, по событию на строку, поля как в теле запросов API:
+
+    {"op": "user", "user_id": "u1", "team_name": "backend", "is_active": true}
+    {"op": "create", "pull_request_id": "pr-1", "author_id": "u1"}
+    {"op": "reassign", "pull_request_id": "pr-1", "old_user_id": "u2"}
+    {"op": "reassign", "pull_request_id": "pr-1", "slot": 0}
+    {"op": "merge", "pull_request_id": "pr-1"}
+    {"op": "deactivate", "user_id": "u3"}
+
+Записанный reassign называет конкретного ревьювера; если в симуляции другой
+стратегии он не назначен на этот PR, событие считается not_assigned. Синтетическая
+трасса использует "slot" — номер места ревьювера, от стратегии не зависящий.
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db_models import Base, TeamModel, UserModel
+from app.services import reviewer_selection
+from app.services.roster_cache import roster_cache
+
+CREATE, REASSIGN, MERGE, DEACTIVATE = range(4)
+OPS = {"create": CREATE, "reassign": REASSIGN, "merge": MERGE, "deactivate": DEACTIVATE}
+# те же имена, что в reviewer_selection.SELECTORS
+STRATEGIES = ("random", "least_loaded", "round_robin")
+# события из трассы переводятся в int Python кусками, чтобы не держать всю трассу списками
+REPLAY_CHUNK = 100_000
+# ростер сверки с reviewer_selection: команды по 1-6 человек, чтобы кандидатов
+# часто не хватало
+CHECK_ROSTER = argparse.Namespace(
+    teams=4,
+    team_size="1,6",
+    prs=400,
+    open_window=30.0,
+    merge_rate=0.9,
+    reassign_rate=0.3,
+    deactivations=4,
+)
+
+
+class Trace:
+    """
+    Пользователи отсортированы по (команда, user_id), поэтому участники команды
+    занимают непрерывный диапазон индексов, и порядок индексов — порядок user_id.
+    События: op, pr (индекс PR, -1 для deactivate), arg — автор для create,
+    пользователь для deactivate, ревьювер (>= 0) или -(slot + 1) для reassign.
+    """
+
+    def __init__(self, team_of, active, op, pr, arg) -> None:
+        self.team_of = np.asarray(team_of, dtype=np.int32)
+        self.active = np.asarray(active, dtype=bool)
+        self.op = np.asarray(op, dtype=np.int8)
+        self.pr = np.asarray(pr, dtype=np.int64)
+        self.arg = np.asarray(arg, dtype=np.int64)
+        self.n_prs = int(self.pr.max()) + 1 if len(self.pr) else 0
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            team_of=self.team_of,
+            active=self.active,
+            op=self.op,
+            pr=self.pr,
+            arg=self.arg,
+        )
+
+
+def load_npz(path: str) -> Trace:
+    data = np.load(path)
+    return Trace(data["team_of"], data["active"], data["op"], data["pr"], data["arg"])
+
+
+def load_ndjson(path: str) -> Trace:
+    with open(path, encoding="utf-8") as f:
+        records = [
+            (number, json.loads(line)) for number, line in enumerate(f, 1) if line.strip()
+        ]
+
+    roster: Dict[str, Tuple[str, bool]] = {}
+    for _, record in records:
+        if record["op"] == "user":
+            roster[record["user_id"]] = (
+                record["team_name"],
+                record.get("is_active", True),
+            )
+    user_ids = sorted(roster, key=lambda user_id: (roster[user_id][0], user_id))
+    users = {user_id: i for i, user_id in enumerate(user_ids)}
+    team_names = sorted({team for team, _ in roster.values()})
+    teams = {name: i for i, name in enumerate(team_names)}
+    team_of = [teams[roster[user_id][0]] for user_id in user_ids]
+
+    def user(number: int, user_id: str) -> int:
+        if user_id not in users:
+            raise ValueError(f"line {number}: unknown user {user_id!r}")
+        return users[user_id]
+
+    prs: Dict[str, int] = {}
+    op: List[int] = []
+    pr: List[int] = []
+    arg: List[int] = []
+    for number, record in records:
+        kind = record["op"]
+        if kind == "user":
+            continue
+        if kind not in OPS:
+            raise ValueError(f"line {number}: unknown op {kind!r}")
+        op.append(OPS[kind])
+        if kind == "deactivate":
+            pr.append(-1)
+            arg.append(user(number, record["user_id"]))
+            continue
+        pr.append(prs.setdefault(record["pull_request_id"], len(prs)))
+        if kind == "create":
+            arg.append(user(number, record["author_id"]))
+        elif kind == "reassign" and "slot" in record:
+            arg.append(-int(record["slot"]) - 1)
+        elif kind == "reassign":
+            arg.append(user(number, record["old_user_id"]))
+        else:
+            arg.append(0)
+    active = [roster[user_id][1] for user_id in user_ids]
+    return Trace(team_of, active, op, pr, arg)
+
+
+def synthetic_trace(args: argparse.Namespace) -> Trace:
+    """
+    PR создаются по одному на единицу времени авторами из всех пользователей
+    поровну; время жизни экспоненциальное со средним --open-window, merge
+    в конце жизни, reassign случайного места — в случайный момент внутри неё.
+    """
+    rng = np.random.default_rng(args.seed)
+    low, high = (int(x) for x in args.team_size.split(","))
+    team_of = np.repeat(
+        np.arange(args.teams, dtype=np.int32), rng.integers(low, high + 1, args.teams)
+    )
+    n_users = len(team_of)
+    n = args.prs
+
+    ids = np.arange(n, dtype=np.int64)
+    lifetime = rng.exponential(args.open_window, n)
+    merged = rng.random(n) < args.merge_rate
+    reassigned = rng.random(n) < args.reassign_rate
+    deactivations = (
+        args.deactivations if args.deactivations >= 0 else n_users // 20
+    )
+    deactivated = rng.choice(n_users, min(deactivations, n_users), replace=False)
+
+    times = np.concatenate(
+        (
+            ids.astype(np.float64),
+            ids[merged] + lifetime[merged],
+            ids[reassigned] + lifetime[reassigned] * rng.random(int(reassigned.sum())),
+            rng.uniform(0, n, len(deactivated)),
+        )
+    )
+    op = np.concatenate(
+        (
+            np.full(n, CREATE),
+            np.full(int(merged.sum()), MERGE),
+            np.full(int(reassigned.sum()), REASSIGN),
+            np.full(len(deactivated), DEACTIVATE),
+        )
+    )
+    pr = np.concatenate(
+        (ids, ids[merged], ids[reassigned], np.full(len(deactivated), -1))
+    )
+    arg = np.concatenate(
+        (
+            rng.integers(0, n_users, n),
+            np.zeros(int(merged.sum()), dtype=np.int64),
+            -rng.integers(1, 3, int(reassigned.sum())),
+            deactivated,
+        )
+    )
+    order = np.argsort(times, kind="stable")
+    return Trace(team_of, np.ones(n_users, dtype=bool), op[order], pr[order], arg[order])
+
+
+class Simulation:
+    """Состояние одной стратегии: нагрузка пользователей и ревьюверы PR в массивах."""
+
+    def __init__(self, trace: Trace, strategy: str, seed: int) -> None:
+        n_teams = int(trace.team_of.max()) + 1 if len(trace.team_of) else 0
+        teams = np.arange(n_teams)
+        self.team_start = np.searchsorted(trace.team_of, teams, "left")
+        self.team_end = np.searchsorted(trace.team_of, teams, "right")
+        self.team_of = trace.team_of
+        self.active = trace.active.copy()
+        self.ever_inactive = ~trace.active
+        # open_review_count и review_count, как в таблице users
+        self.load = np.zeros(len(trace.team_of), dtype=np.int64)
+        self.total = np.zeros(len(trace.team_of), dtype=np.int64)
+        self.author = np.full(trace.n_prs, -1, dtype=np.int64)
+        self.reviewers = np.full((trace.n_prs, 2), -1, dtype=np.int64)
+        self.open = np.zeros(trace.n_prs, dtype=bool)
+        self.cursors = np.full(n_teams, -1, dtype=np.int64)
+        self.rng = np.random.default_rng(seed)
+        self.pick = getattr(self, f"_pick_{strategy}")
+        self.counts: Counter = Counter()
+        self.peak = 0
+
+    # --- кандидаты и стратегии ---------------------------------------------------
+
+    def _allowed(self, team: int, exclude: Tuple[int, ...]) -> Tuple[int, np.ndarray]:
+        start, end = self.team_start[team], self.team_end[team]
+        mask = self.active[start:end].copy()
+        for user in exclude:
+            if start <= user < end:
+                mask[user - start] = False
+        return start, mask
+
+    def _pick_least_loaded(
+        self, team: int, exclude: Tuple[int, ...], limit: int
+    ) -> np.ndarray:
+        start, mask = self._allowed(team, exclude)
+        candidates = mask.nonzero()[0] + start
+        # стабильная сортировка по нагрузке: при равенстве меньший user_id
+        return candidates[self.load[candidates].argsort(kind="stable")[:limit]]
+
+    def _pick_random(
+        self, team: int, exclude: Tuple[int, ...], limit: int
+    ) -> np.ndarray:
+        start, mask = self._allowed(team, exclude)
+        candidates = mask.nonzero()[0] + start
+        if len(candidates) <= limit:
+            return candidates
+        return self.rng.choice(candidates, limit, replace=False)
+
+    def _pick_round_robin(
+        self, team: int, exclude: Tuple[int, ...], limit: int
+    ) -> np.ndarray:
+        start, mask = self._allowed(team, exclude)
+        members = self.active[start : self.team_end[team]].nonzero()[0] + start
+        at = np.searchsorted(members, self.cursors[team], "right")
+        ordered = np.concatenate((members[at:], members[:at]))
+        picked = ordered[mask[ordered - start]][:limit]
+        if len(picked):
+            self.cursors[team] = picked[-1]
+        return picked
+
+    # --- события ------------------------------------------------------------------
+
+    def _assigned(self, users: np.ndarray) -> None:
+        self.load[users] += 1
+        self.total[users] += 1
+        if len(users):
+            self.peak = max(self.peak, int(self.load[users].max()))
+
+    def _replace(self, pr: int, slot: int) -> bool:
+        reviewers = self.reviewers[pr]
+        old = int(reviewers[slot])
+        exclude = (*reviewers[reviewers >= 0].tolist(), int(self.author[pr]))
+        picked = self.pick(self.team_of[old], exclude, 1)
+        if not len(picked):
+            return False
+        reviewers[slot] = picked[0]
+        self.load[old] -= 1
+        self.total[old] -= 1
+        self._assigned(picked)
+        return True
+
+    def create(self, pr: int, author: int) -> None:
+        if self.author[pr] >= 0:
+            self.counts["pr_exists"] += 1
+            return
+        picked = self.pick(self.team_of[author], (author,), 2)
+        self.author[pr] = author
+        self.open[pr] = True
+        self.reviewers[pr, : len(picked)] = picked
+        self._assigned(picked)
+        self.counts["create"] += 1
+        if len(picked) < 2:
+            self.counts["understaffed"] += 1
+
+    def reassign(self, pr: int, arg: int) -> None:
+        if self.author[pr] < 0:
+            self.counts["pr_not_found"] += 1
+            return
+        if not self.open[pr]:
+            self.counts["merged"] += 1
+            return
+        reviewers = self.reviewers[pr]
+        slot = -arg - 1 if arg < 0 else int(np.argmax(reviewers == arg))
+        if reviewers[slot] < 0 or (arg >= 0 and reviewers[slot] != arg):
+            self.counts["not_assigned"] += 1
+            return
+        self.counts["reassign"] += 1
+        if not self._replace(pr, slot):
+            self.counts["no_candidate"] += 1
+
+    def merge(self, pr: int, _arg: int) -> None:
+        if self.author[pr] < 0:
+            self.counts["pr_not_found"] += 1
+            return
+        if self.open[pr]:
+            self.open[pr] = False
+            reviewers = self.reviewers[pr]
+            self.load[reviewers[reviewers >= 0]] -= 1
+        self.counts["merge"] += 1
+
+    def deactivate(self, _pr: int, user: int) -> None:
+        self.counts["deactivate"] += 1
+        # повторная деактивация тоже пробует заменить оставшиеся ревью
+        self.active[user] = False
+        self.ever_inactive[user] = True
+        # reassign_open_reviews: все OPEN-ревью пользователя по тем же правилам
+        prs, slots = np.nonzero((self.reviewers == user) & self.open[:, None])
+        for pr, slot in zip(prs.tolist(), slots.tolist()):
+            self.counts["handover"] += 1
+            if not self._replace(pr, slot):
+                self.counts["unreplaced"] += 1
+
+    def run(self, trace: Trace) -> dict:
+        handlers = (self.create, self.reassign, self.merge, self.deactivate)
+        started = time.perf_counter()
+        for begin in range(0, len(trace.op), REPLAY_CHUNK):
+            end = begin + REPLAY_CHUNK
+            for op, pr, arg in zip(
+                trace.op[begin:end].tolist(),
+                trace.pr[begin:end].tolist(),
+                trace.arg[begin:end].tolist(),
+            ):
+                handlers[op](pr, arg)
+        elapsed = time.perf_counter() - started
+        return self.report(len(trace.op), elapsed)
+
+    def report(self, events: int, elapsed: float) -> dict:
+        counts = self.counts
+        return {
+            "events": events,
+            "seconds": round(elapsed, 3),
+            "events_per_sec": round(events / elapsed) if elapsed else 0,
+            "creates": counts["create"],
+            "understaffed_rate": _rate(counts["understaffed"], counts["create"]),
+            "reassigns": counts["reassign"],
+            "no_candidate_rate": _rate(counts["no_candidate"], counts["reassign"]),
+            # открытые ревью деактивированных: замена или unreplaced в ответе
+            "handovers": counts["handover"],
+            "unreplaced_rate": _rate(counts["unreplaced"], counts["handover"]),
+            "skipped": {
+                name: counts[name]
+                for name in ("pr_exists", "pr_not_found", "merged", "not_assigned")
+                if counts[name]
+            },
+            # открытые ревью в конце — по активным, все ревью — по ни разу
+            # не деактивированным: иначе выбывшие занижают нижний хвост
+            "open_load": _spread(self.load[self.active]),
+            "total_reviews": _spread(self.total[~self.ever_inactive]),
+            "peak_open_load": self.peak,
+        }
+
+
+def check_selectors(strategies: List[str], seed: int) -> int:
+    """
+    Проигрывает синтетическую трассу на ростере CHECK_ROSTER и сверяет каждый
+    выбор Simulation с настоящим селектором: перед выбором активность и нагрузка
+    команды переносятся в таблицу users (SQLite в памяти), селектор получает ту же
+    команду, exclude и limit. random сверяется по множеству кандидатов.
+    Возвращает число расхождений.
+    """
+    trace = synthetic_trace(argparse.Namespace(**vars(CHECK_ROSTER), seed=seed))
+    # часть пользователей неактивна с самого начала
+    trace.active[::7] = False
+    user_ids = [f"u{i:04d}" for i in range(len(trace.team_of))]
+    team_names = [f"t{t:02d}" for t in range(int(trace.team_of.max()) + 1)]
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[TeamModel.__table__, UserModel.__table__])
+    mismatches = 0
+    with Session(engine) as db:
+        db.add_all(TeamModel(team_name=name) for name in team_names)
+        db.add_all(
+            UserModel(user_id=user_id, username=user_id, team_name=team_names[team])
+            for user_id, team in zip(user_ids, trace.team_of.tolist())
+        )
+        db.commit()
+        # порядок user_id совпадает с порядком индексов в Trace
+        rows = db.query(UserModel).order_by(UserModel.user_id).all()
+
+        for name in strategies:
+            sim = Simulation(trace, name, seed)
+            # свой экземпляр: курсоры round_robin не смешиваются с SELECTORS процесса
+            selector = type(reviewer_selection.SELECTORS[name])()
+            simulated = sim.pick
+            checked = 0
+            failed = 0
+
+            def pick(team: int, exclude: Tuple[int, ...], limit: int) -> np.ndarray:
+                nonlocal checked, failed
+                picked = simulated(team, exclude, limit)
+                for i in range(sim.team_start[team], sim.team_end[team]):
+                    rows[i].is_active = bool(sim.active[i])
+                    rows[i].open_review_count = int(sim.load[i])
+                db.flush()
+                roster_cache.clear()
+                team_name = team_names[team]
+                excluded = {user_ids[user] for user in exclude}
+                got = [user_ids[user] for user in picked.tolist()]
+                if name == "random":
+                    pool = selector.select(db, team_name, excluded, len(user_ids))
+                    ok = set(got) <= set(pool) and len(got) == min(limit, len(pool))
+                    expected = sorted(pool)
+                else:
+                    expected = selector.select(db, team_name, excluded, limit)
+                    ok = got == expected
+                checked += 1
+                if not ok:
+                    failed += 1
+                    print(
+                        f"{name}: team {team_name}, exclude {sorted(excluded)}, "
+                        f"limit {limit}: simulated {got}, selector {expected}",
+                        file=sys.stderr,
+                    )
+                return picked
+
+            sim.pick = pick
+            sim.run(trace)
+            db.rollback()
+            print(
+                f"{name}: {checked} picks checked against reviewer_selection, "
+                f"{failed} mismatches"
+            )
+            mismatches += failed
+    roster_cache.clear()
+    return mismatches
+
+
+def _rate(part: int, whole: int) -> float:
+    return round(part / whole, 6) if whole else 0.0
+
+
+def gini(values: np.ndarray) -> float:
+    x = np.sort(values.astype(np.float64))
+    n = len(x)
+    if n == 0 or x.sum() == 0:
+        return 0.0
+    return float(2 * np.arange(1, n + 1) @ x / (n * x.sum()) - (n + 1) / n)
+
+
+def _spread(values: np.ndarray) -> dict:
+    mean = float(values.mean()) if len(values) else 0.0
+    return {
+        "gini": round(gini(values), 4),
+        "max_mean": round(float(values.max()) / mean, 3) if mean else 0.0,
+        "mean": round(mean, 3),
+    }
+
+
+def _print_table(results: Dict[str, dict]) -> None:
+    header = (
+        f"{'strategy':<14}{'events/s':>10}{'understaffed':>14}{'no_cand':>10}"
+        f"{'unreplaced':>12}"
+        f"{'open gini':>11}{'open max/mean':>15}{'total gini':>12}{'total max/mean':>16}"
+        f"{'peak':>6}"
+    )
+    print(header)
+    for name, r in results.items():
+        print(
+            f"{name:<14}{r['events_per_sec']:>10}{r['understaffed_rate']:>14.4%}"
+            f"{r['no_candidate_rate']:>10.4%}{r['unreplaced_rate']:>12.4%}"
+            f"{r['open_load']['gini']:>11.4f}"
+            f"{r['open_load']['max_mean']:>15.3f}{r['total_reviews']['gini']:>12.4f}"
+            f"{r['total_reviews']['max_mean']:>16.3f}{r['peak_open_load']:>6}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.simulate")
+    parser.add_argument("--trace", help="записанная трасса (.ndjson или .npz)")
+    parser.add_argument("--save-trace", help="сохранить трассу в .npz")
+    parser.add_argument("--strategies", default=",".join(STRATEGIES))
+    parser.add_argument("--teams", type=int, default=50)
+    parser.add_argument("--team-size", default="3,30", help="min,max участников")
+    parser.add_argument("--prs", type=int, default=1_000_000)
+    parser.add_argument(
+        "--open-window", type=float, default=500.0, help="среднее время жизни PR в create"
+    )
+    parser.add_argument("--merge-rate", type=float, default=0.95)
+    parser.add_argument("--reassign-rate", type=float, default=0.1)
+    parser.add_argument(
+        "--deactivations", type=int, default=-1, help="-1 — 5%% пользователей"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="результаты в JSON")
+    parser.add_argument(
+        "--check", action="store_true", help="только сверка с reviewer_selection"
+    )
+    args = parser.parse_args()
+
+    strategies = [name for name in args.strategies.split(",") if name]
+    unknown = set(strategies) - set(STRATEGIES)
+    if unknown:
+        parser.error(f"unknown strategies: {', '.join(sorted(unknown))}")
+
+    if check_selectors(strategies, args.seed):
+        print("simulator diverges from reviewer_selection", file=sys.stderr)
+        return 1
+    if args.check:
+        return 0
+
+    if args.trace and args.trace.endswith(".npz"):
+        trace = load_npz(args.trace)
+    elif args.trace:
+        trace = load_ndjson(args.trace)
+    else:
+        trace = synthetic_trace(args)
+    if args.save_trace:
+        trace.save(args.save_trace)
+    print(
+        f"{len(trace.team_of)} users, {int(trace.team_of.max()) + 1} teams, "
+        f"{trace.n_prs} PRs, {len(trace.op)} events"
+    )
+
+    results = {
+        name: Simulation(trace, name, args.seed).run(trace) for name in strategies
+    }
+    _print_table(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Стресс конкурентных reassign/merge на небольшом числе PR.
+
+    python -m bench.stress_reassign --prs 5 --workers 64 --requests 2000
+
+Проверяет: нет ответов 5xx, у PR нет повторяющихся или лишних ревьюверов,
+автор не назначен ревьювером, счётчики users/team_stats сходятся с базовыми
+таблицами. Работает in-process поверх DATABASE_URL и создаёт свою команду.
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import uuid
+from collections import Counter
+
+import httpx
+from sqlalchemy import text
+
+from app.db import engine
+from app.main import app
+
+_COUNTER_CHECKS = {
+    "users.open_review_count": """
+        SELECT count(*) FROM users u
+        WHERE u.open_review_count <> (
+            SELECT count(*) FROM pull_request_reviewers r
+            JOIN pull_requests p ON p.pull_request_id = r.pull_request_id
+            WHERE r.reviewer_id = u.user_id AND p.status = 'OPEN')
+    """,
+    "users.review_count": """
+        SELECT count(*) FROM users u
+        WHERE u.review_count <> (
+            SELECT count(*) FROM pull_request_reviewers r WHERE r.reviewer_id = u.user_id)
+    """,
+    "users.merged_pr_count": """
+        SELECT count(*) FROM users u
+        WHERE u.merged_pr_count <> (
+            SELECT count(*) FROM pull_requests p
+            WHERE p.author_id = u.user_id AND p.status = 'MERGED')
+    """,
+    "team_stats": """
+        SELECT count(*) FROM team_stats t
+        WHERE (t.open_review_count, t.review_count, t.merged_pr_count) <> (
+            SELECT coalesce(sum(open_review_count), 0), coalesce(sum(review_count), 0),
+                   coalesce(sum(merged_pr_count), 0)
+            FROM users u WHERE u.team_name = t.team_name)
+    """,
+}
+
+
+async def run(args: argparse.Namespace) -> int:
+    rng = random.Random(args.seed)
+    prefix = uuid.uuid4().hex[:8]
+    team = f"stress-{prefix}"
+    users = [f"{prefix}-u{i}" for i in range(args.users)]
+    prs = [f"{prefix}-pr{i}" for i in range(args.prs)]
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://stress", timeout=60
+    ) as client:
+        r = await client.post(
+            "/team/add",
+            json={
+                "team_name": team,
+                "members": [
+                    {"user_id": u, "username": u, "is_active": True} for u in users
+                ],
+            },
+        )
+        r.raise_for_status()
+        for pr_id in prs:
+            r = await client.post(
+                "/pullRequest/create",
+                json={
+                    "pull_request_id": pr_id,
+                    "pull_request_name": pr_id,
+                    "author_id": users[0],
+                },
+            )
+            r.raise_for_status()
+
+        statuses: Counter = Counter()
+        errors = []
+        queue: asyncio.Queue = asyncio.Queue()
+        for _ in range(args.requests):
+            queue.put_nowait(None)
+
+        async def worker() -> None:
+            while not queue.empty():
+                queue.get_nowait()
+                pr_id = rng.choice(prs)
+                if rng.random() < args.merge_fraction:
+                    r = await client.post(
+                        "/pullRequest/merge", json={"pull_request_id": pr_id}
+                    )
+                    op = "merge"
+                else:
+                    # старый ревьювер угадывается: часть запросов получит NOT_ASSIGNED
+                    r = await client.post(
+                        "/pullRequest/reassign",
+                        json={"pull_request_id": pr_id, "old_user_id": rng.choice(users[1:])},
+                    )
+                    op = "reassign"
+                statuses[(op, r.status_code)] += 1
+                if r.status_code >= 500:
+                    errors.append((op, pr_id, r.text[:200]))
+
+        await asyncio.gather(*(worker() for _ in range(args.workers)))
+
+    with engine.connect() as conn:
+        duplicates = conn.execute(
+            text(
+                "SELECT count(*) FROM (SELECT pull_request_id FROM pull_request_reviewers "
+                "WHERE pull_request_id = ANY(:prs) "
+                "GROUP BY pull_request_id HAVING count(*) > 2) x"
+            ),
+            {"prs": prs},
+        ).scalar_one()
+        author_assigned = conn.execute(
+            text(
+                "SELECT count(*) FROM pull_request_reviewers r "
+                "JOIN pull_requests p ON p.pull_request_id = r.pull_request_id "
+                "WHERE r.pull_request_id = ANY(:prs) AND r.reviewer_id = p.author_id"
+            ),
+            {"prs": prs},
+        ).scalar_one()
+        counters = {
+            name: conn.execute(text(sql)).scalar_one()
+            for name, sql in _COUNTER_CHECKS.items()
+        }
+
+    for (op, status), n in sorted(statuses.items()):
+        print(f"{op:9} {status}: {n}")
+    for op, pr_id, body in errors[:10]:
+        print(f"5xx {op} {pr_id}: {body}")
+    print(f"PRs with more than 2 reviewers: {duplicates}")
+    print(f"author assigned as reviewer: {author_assigned}")
+    for name, mismatched in counters.items():
+        print(f"{name} mismatches: {mismatched}")
+
+    failed = errors or duplicates or author_assigned or any(counters.values())
+    print("FAIL" if failed else "OK")
+    return 1 if failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.stress_reassign")
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--prs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--merge-fraction", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,28 @@
 CREATE TABLE teams (
-    team_name TEXT PRIMARY KEY
+    team_name TEXT PRIMARY KEY,
+    -- растёт при любом изменении состава или активности участников (ETag /team/get)
+    version BIGINT NOT NULL DEFAULT 0
 );
 
 CREATE TABLE users (
     user_id TEXT PRIMARY KEY,
     username TEXT NOT NULL,
     team_name TEXT NOT NULL REFERENCES teams(team_name) ON DELETE CASCADE,
-    is_active BOOLEAN NOT NULL DEFAULT TRUE
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    open_review_count INTEGER NOT NULL DEFAULT 0,
+    review_count INTEGER NOT NULL DEFAULT 0,
+    authored_pr_count INTEGER NOT NULL DEFAULT 0,
+    merged_pr_count INTEGER NOT NULL DEFAULT 0,
+    -- растёт при изменении списка ревью пользователя (ETag /users/getReview)
+    reviews_version BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE team_stats (
+    team_name TEXT PRIMARY KEY REFERENCES teams(team_name) ON DELETE CASCADE,
+    open_review_count INTEGER NOT NULL DEFAULT 0,
+    review_count INTEGER NOT NULL DEFAULT 0,
+    authored_pr_count INTEGER NOT NULL DEFAULT 0,
+    merged_pr_count INTEGER NOT NULL DEFAULT 0
 );
 
 CREATE TABLE pull_requests (
@@ -21,9 +37,77 @@ CREATE TABLE pull_requests (
 CREATE TABLE pull_request_reviewers (
     pull_request_id TEXT NOT NULL REFERENCES pull_requests(pull_request_id) ON DELETE CASCADE,
     reviewer_id TEXT NOT NULL REFERENCES users(user_id),
+    -- копии pull_requests.created_at и status: keyset /users/getReview идёт
+    -- по индексу ревьювера и присоединяет PR только к готовой странице
+    created_at TIMESTAMPTZ NOT NULL,
+    status TEXT NOT NULL CHECK (status IN ('OPEN', 'MERGED')),
     PRIMARY KEY (pull_request_id, reviewer_id)
 );
 
+-- MERGED PR старше ARCHIVE_AFTER_DAYS переносятся сюда (python -m app.cli archive-prs),
+-- чтобы горячие таблицы и их индексы оставались маленькими
+CREATE TABLE pull_requests_archive (
+    pull_request_id TEXT PRIMARY KEY,
+    pull_request_name TEXT NOT NULL,
+    author_id TEXT NOT NULL REFERENCES users(user_id),
+    status TEXT NOT NULL CHECK (status = 'MERGED'),
+    created_at TIMESTAMPTZ NOT NULL,
+    merged_at TIMESTAMPTZ,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE pull_request_reviewers_archive (
+    pull_request_id TEXT NOT NULL REFERENCES pull_requests_archive(pull_request_id) ON DELETE CASCADE,
+    reviewer_id TEXT NOT NULL REFERENCES users(user_id),
+    created_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (pull_request_id, reviewer_id)
+);
+
+-- outbox событий назначения; пишется в транзакции изменения, читается SSE-потоком
+CREATE TABLE review_events (
+    event_id BIGSERIAL PRIMARY KEY,
+    -- читатели идут по (xid, event_id) только до горизонта завершённых
+    -- транзакций: событие, закоммиченное позже соседа с большим event_id,
+    -- не пропускается
+    xid XID8 NOT NULL DEFAULT pg_current_xact_id(),
+    event_type TEXT NOT NULL CHECK (event_type IN ('assigned', 'reassigned', 'merged')),
+    pull_request_id TEXT NOT NULL,
+    team_name TEXT,
+    user_ids TEXT[] NOT NULL,
+    data JSONB NOT NULL DEFAULT '{}',
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- сохранённые ответы для повторов с тем же Idempotency-Key; status_code IS NULL — запрос выполняется
+CREATE TABLE idempotency_keys (
+    endpoint TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL,
+    request_hash TEXT NOT NULL,
+    status_code INTEGER,
+    content_type TEXT,
+    body BYTEA,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (endpoint, idempotency_key)
+);
+
 CREATE INDEX idx_users_team ON users(team_name);
+CREATE INDEX idx_users_team_load ON users(team_name, is_active, open_review_count, user_id);
+CREATE INDEX idx_users_team_active ON users(team_name, is_active, user_id);
 CREATE INDEX idx_pr_status ON pull_requests(status);
-CREATE INDEX idx_reviewers_user ON pull_request_reviewers(reviewer_id);
+-- потоковая выгрузка /export/pullRequests
+CREATE INDEX idx_pr_created ON pull_requests(created_at, pull_request_id);
+CREATE INDEX idx_pr_status_created ON pull_requests(status, created_at, pull_request_id);
+CREATE INDEX idx_pr_merged ON pull_requests(merged_at, pull_request_id) WHERE status = 'MERGED';
+CREATE INDEX idx_reviewers_user
+    ON pull_request_reviewers(reviewer_id, created_at DESC, pull_request_id DESC);
+CREATE INDEX idx_reviewers_user_status
+    ON pull_request_reviewers(reviewer_id, status, created_at DESC, pull_request_id DESC);
+CREATE INDEX idx_pr_archive_author ON pull_requests_archive(author_id);
+CREATE INDEX idx_pr_archive_created ON pull_requests_archive(created_at, pull_request_id);
+CREATE INDEX idx_reviewers_archive_user
+    ON pull_request_reviewers_archive(reviewer_id, created_at DESC, pull_request_id DESC);
+CREATE INDEX idx_review_events_position ON review_events(xid, event_id);
+CREATE INDEX idx_review_events_team ON review_events(team_name, xid, event_id);
+CREATE INDEX idx_review_events_users ON review_events USING GIN (user_ids);
+CREATE INDEX idx_review_events_created ON review_events(created_at);
+CREATE INDEX idx_idempotency_keys_created ON idempotency_keys(created_at);